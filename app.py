@@ -4,6 +4,7 @@ Delegates to the packaged Flask app with login protection and routes.
 """
 
 from app import app  # use the package app configured in app/__init__.py
+from app.secuencias import reservar_numero
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -25,9 +26,8 @@ def nueva_propuesta():
             if not cliente:
                 return jsonify({'error': 'Cliente no encontrado'}), 404
             
-            # Generar número de propuesta
-            contador = Propuesta.query.count() + 1
-            numero_propuesta = f"PROP-{datetime.now().strftime('%Y%m')}-{contador:04d}"
+            # Generar número de propuesta (contador por período, sin colisiones)
+            numero_propuesta = reservar_numero()
             
             # Calcular precio final
             costo_directo = float(datos['costo_directo'])
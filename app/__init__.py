@@ -8,8 +8,19 @@ from flask import Flask, session, redirect, url_for, request
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 
+from .base_datos import REPLICA, SesionEnrutada, instalar_pragmas, opciones_motor, registrar_lectura_propia
+
 load_dotenv()
 
+
+def env_bool(nombre, defecto=False):
+	"""Lee una variable de entorno booleana (1/true/si/yes)"""
+	valor = os.getenv(nombre)
+	if valor is None:
+		return defecto
+	return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
 # Base directory (project root)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -29,29 +40,147 @@ db_path = os.path.join(DB_DIR, 'mgcp.db')
 # Convertir backslashes a forward slashes para SQLite
 sqlite_url = f'sqlite:///{db_path}'.replace('\\', '/')
 
-# Resolver DATABASE_URL si viene desde .env como ruta relativa
-env_url = os.getenv('DATABASE_URL')
-final_url = None
-if env_url and env_url.startswith('sqlite:///'):
-	# Extraer la parte de ruta después del prefijo
-	path_part = env_url.replace('sqlite:///', '')
-	# Detectar ruta absoluta en Windows (e.g., C:/...)
-	is_windows_abs = len(path_part) >= 2 and path_part[1] == ':'
-	if not os.path.isabs(path_part) and not is_windows_abs:
-		abs_path = os.path.join(BASE_DIR, path_part)
-	else:
-		abs_path = path_part
-	final_url = 'sqlite:///' + abs_path.replace('\\', '/')
-else:
-	final_url = env_url if env_url else sqlite_url
+def resolver_url(env_url):
+	"""Resolver una URL SQLite que viene desde .env como ruta relativa"""
+	if env_url and env_url.startswith('sqlite:///'):
+		# Extraer la parte de ruta después del prefijo
+		path_part = env_url.replace('sqlite:///', '')
+		# Detectar ruta absoluta en Windows (e.g., C:/...)
+		is_windows_abs = len(path_part) >= 2 and path_part[1] == ':'
+		if not os.path.isabs(path_part) and not is_windows_abs:
+			abs_path = os.path.join(BASE_DIR, path_part)
+		else:
+			abs_path = path_part
+		return 'sqlite:///' + abs_path.replace('\\', '/')
+	return env_url
+
+
+final_url = resolver_url(os.getenv('DATABASE_URL')) or sqlite_url
 
 app.config['SQLALCHEMY_DATABASE_URI'] = final_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Ajustes de SQLite por conexión (app/base_datos.py): WAL, espera de locks,
+# fsync y memoria. SQLITE_WAL=0 vuelve al rollback journal.
+app.config['SQLITE_WAL'] = env_bool('SQLITE_WAL', True)
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+app.config['SQLITE_MMAP_MB'] = int(os.getenv('SQLITE_MMAP_MB', '256'))
+app.config['SQLITE_CACHE_MB'] = int(os.getenv('SQLITE_CACHE_MB', '64'))
+# Pool de conexiones (cualquier motor); pre-ping descarta conexiones caídas
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', '10'))
+app.config['DB_POOL_MAX_OVERFLOW'] = int(os.getenv('DB_POOL_MAX_OVERFLOW', '20'))
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+app.config['DB_POOL_PRE_PING'] = env_bool('DB_POOL_PRE_PING', True)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_motor(final_url, app.config)
+# Réplica de lectura (PostgreSQL en streaming, p. ej.): las vistas @solo_lectura
+# consultan aquí. Tras un commit, el mismo navegador lee de la primaria durante
+# REPLICA_RETRASO_MAX segundos (el atraso máximo esperado de la réplica).
+app.config['DATABASE_REPLICA_URL'] = resolver_url(os.getenv('DATABASE_REPLICA_URL', ''))
+app.config['REPLICA_RETRASO_MAX'] = float(os.getenv('REPLICA_RETRASO_MAX', '5'))
+if app.config['DATABASE_REPLICA_URL']:
+	app.config['SQLALCHEMY_BINDS'] = {
+		REPLICA: {
+			'url': app.config['DATABASE_REPLICA_URL'],
+			**opciones_motor(app.config['DATABASE_REPLICA_URL'], app.config),
+		},
+	}
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-2025')
 app.config['ADMIN_USER'] = os.getenv('ADMIN_USER', 'admin')
 app.config['ADMIN_PASS'] = os.getenv('ADMIN_PASS', 'admin123')
+# Segundos que el dashboard reutiliza los conteos por estado
+app.config['ESTADISTICAS_TTL'] = float(os.getenv('ESTADISTICAS_TTL', '5'))
+# Cada cuántos segundos se compara la versión de la configuración en caché con la base
+app.config['CONFIGURACION_VERIFICACION'] = float(os.getenv('CONFIGURACION_VERIFICACION', '5'))
+# Caché token -> propuesta del portal del cliente (app/cache_tokens.py). Una
+# entrada dura TOKENS_CACHE_TTL segundos o hasta la expiración de la propuesta
+app.config['TOKENS_CACHE_MAX'] = int(os.getenv('TOKENS_CACHE_MAX', '10000'))
+app.config['TOKENS_CACHE_TTL'] = float(os.getenv('TOKENS_CACHE_TTL', '30'))
+# Tokens inexistentes recordados para no consultar la base en cada intento
+app.config['TOKENS_NEGATIVOS_MAX'] = int(os.getenv('TOKENS_NEGATIVOS_MAX', '10000'))
+app.config['TOKENS_NEGATIVOS_TTL'] = float(os.getenv('TOKENS_NEGATIVOS_TTL', '60'))
+# Caché de la página del portal por (propuesta, versión, estado): memoria acotada
+# en bytes y, si PORTAL_CACHE_DIR no está vacío, un nivel en disco compartido
+app.config['PORTAL_CACHE_BYTES'] = int(os.getenv('PORTAL_CACHE_BYTES', str(32 * 1024 * 1024)))
+app.config['PORTAL_CACHE_DIR'] = os.getenv('PORTAL_CACHE_DIR', '')
+app.config['PORTAL_CACHE_DISCO_MAX'] = int(os.getenv('PORTAL_CACHE_DISCO_MAX', '10000'))
+# Paginación del listado de propuestas
+app.config['PROPUESTAS_POR_PAGINA'] = int(os.getenv('PROPUESTAS_POR_PAGINA', '50'))
+app.config['PROPUESTAS_POR_PAGINA_MAX'] = int(os.getenv('PROPUESTAS_POR_PAGINA_MAX', '200'))
+# Carpeta de documentos generados (HTML/PDF)
+app.config['DOCUMENTOS_DIR'] = os.getenv('DOCUMENTOS_DIR', os.path.join(BASE_DIR, 'documentos_generados'))
+# Bytecode de las plantillas compiladas; persiste entre reinicios
+app.config['PLANTILLAS_CACHE_DIR'] = os.getenv('PLANTILLAS_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'plantillas'))
+# Detrás de nginx/Apache: delegar el envío de documentos con X-Sendfile
+app.config['USE_X_SENDFILE'] = env_bool('USE_X_SENDFILE')
+# Formatos en que se guardan los documentos (p. ej. "gzip,br"); vacío = HTML sin comprimir
+app.config['DOCUMENTOS_COMPRESION'] = [f.strip() for f in os.getenv('DOCUMENTOS_COMPRESION', '').split(',') if f.strip()]
+# Renderizado en segundo plano: la ruta encola y responde de inmediato.
+# RENDER_DESPACHADOR=proceso lo ejecuta dentro del servidor web;
+# 'externo' deja el trabajo a `python procesar_documentos.py`.
+app.config['RENDER_ASINCRONO'] = env_bool('RENDER_ASINCRONO')
+app.config['RENDER_DESPACHADOR'] = os.getenv('RENDER_DESPACHADOR', 'proceso')
+app.config['RENDER_WORKERS'] = int(os.getenv('RENDER_WORKERS', str(os.cpu_count() or 2)))
+app.config['RENDER_REINTENTO_BASE'] = float(os.getenv('RENDER_REINTENTO_BASE', '2'))
+# Barrido de propuestas vencidas: EXPIRACION_BARREDOR=proceso lo ejecuta en
+# un hilo del servidor (run.py); 'externo' lo deja a `python expirar_propuestas.py`.
+app.config['EXPIRACION_BARREDOR'] = os.getenv('EXPIRACION_BARREDOR', 'proceso')
+app.config['EXPIRACION_INTERVALO'] = float(os.getenv('EXPIRACION_INTERVALO', '60'))
+# Envío de notificaciones pendientes. NOTIFICACIONES_TRANSPORTE=smtp usa SMTP_*;
+# 'archivo' escribe cada mensaje como .eml en NOTIFICACIONES_DIR (desarrollo y pruebas).
+# Sin transporte no se despacha nada: las notificaciones quedan pendientes.
+# NOTIFICACIONES_DESPACHADOR=proceso envía desde run.py; 'externo' con `python enviar_notificaciones.py`.
+app.config['NOTIFICACIONES_TRANSPORTE'] = os.getenv('NOTIFICACIONES_TRANSPORTE', '')
+app.config['NOTIFICACIONES_DESPACHADOR'] = os.getenv('NOTIFICACIONES_DESPACHADOR', 'proceso')
+app.config['NOTIFICACIONES_DIR'] = os.getenv('NOTIFICACIONES_DIR', os.path.join(BASE_DIR, 'notificaciones_enviadas'))
+app.config['NOTIFICACIONES_REMITENTE'] = os.getenv('NOTIFICACIONES_REMITENTE', 'MGCP ACME TRANS <no-responder@acmetrans.cl>')
+app.config['NOTIFICACIONES_HILOS'] = int(os.getenv('NOTIFICACIONES_HILOS', '4'))
+app.config['NOTIFICACIONES_LOTE'] = int(os.getenv('NOTIFICACIONES_LOTE', '200'))
+app.config['NOTIFICACIONES_MAX_INTENTOS'] = int(os.getenv('NOTIFICACIONES_MAX_INTENTOS', '8'))
+app.config['NOTIFICACIONES_REINTENTO_BASE'] = float(os.getenv('NOTIFICACIONES_REINTENTO_BASE', '30'))
+app.config['SMTP_HOST'] = os.getenv('SMTP_HOST', 'localhost')
+app.config['SMTP_PORT'] = int(os.getenv('SMTP_PORT', '25'))
+app.config['SMTP_USUARIO'] = os.getenv('SMTP_USUARIO')
+app.config['SMTP_CLAVE'] = os.getenv('SMTP_CLAVE')
+app.config['SMTP_STARTTLS'] = env_bool('SMTP_STARTTLS')
+# Conexiones SMTP abiertas que se reutilizan entre lotes
+app.config['SMTP_CONEXIONES'] = int(os.getenv('SMTP_CONEXIONES', '4'))
+# Envío masivo (/propuestas/enviar-lote): hasta ENVIO_MASIVO_MAX propuestas por
+# llamada, render en bloques de ENVIO_MASIVO_BLOQUE repartidos en
+# ENVIO_MASIVO_WORKERS procesos y un commit cada ENVIO_MASIVO_LOTE propuestas
+app.config['ENVIO_MASIVO_MAX'] = int(os.getenv('ENVIO_MASIVO_MAX', '5000'))
+app.config['ENVIO_MASIVO_LOTE'] = int(os.getenv('ENVIO_MASIVO_LOTE', '500'))
+app.config['ENVIO_MASIVO_BLOQUE'] = int(os.getenv('ENVIO_MASIVO_BLOQUE', '50'))
+app.config['ENVIO_MASIVO_WORKERS'] = int(os.getenv('ENVIO_MASIVO_WORKERS', str(app.config['RENDER_WORKERS'])))
+# Eventos en vivo (/eventos, app/eventos.py). EVENTOS_DIFUSION=proceso publica al
+# confirmar, solo a los navegadores conectados a este proceso; 'tabla' hace que cada
+# proceso siga cambios_estado cada EVENTOS_INTERVALO segundos (varios workers).
+app.config['EVENTOS_DIFUSION'] = os.getenv('EVENTOS_DIFUSION', 'proceso')
+app.config['EVENTOS_INTERVALO'] = float(os.getenv('EVENTOS_INTERVALO', '1'))
+# Eventos pendientes por navegador; si se llena, el navegador recarga los conteos
+app.config['EVENTOS_COLA_MAX'] = int(os.getenv('EVENTOS_COLA_MAX', '100'))
+# Cada conexión ocupa un hilo del servidor: máximo por proceso y duración antes de
+# que el navegador reconecte (retoma desde Last-Event-ID)
+app.config['EVENTOS_MAX_CONEXIONES'] = int(os.getenv('EVENTOS_MAX_CONEXIONES', '50'))
+app.config['EVENTOS_DURACION_MAX'] = float(os.getenv('EVENTOS_DURACION_MAX', '300'))
+app.config['EVENTOS_LATIDO'] = float(os.getenv('EVENTOS_LATIDO', '15'))
+app.config['EVENTOS_REPETIR_MAX'] = int(os.getenv('EVENTOS_REPETIR_MAX', '500'))
+# Auditoría: los eventos se acumulan en memoria y se insertan por lotes
+# cada AUDITORIA_INTERVALO segundos o al llegar a AUDITORIA_LOTE
+app.config['AUDITORIA_INTERVALO'] = float(os.getenv('AUDITORIA_INTERVALO', '1'))
+app.config['AUDITORIA_LOTE'] = int(os.getenv('AUDITORIA_LOTE', '500'))
+
+db = SQLAlchemy(app, session_options={'class_': SesionEnrutada})
+with app.app_context():
+	for motor in db.engines.values():
+		instalar_pragmas(motor, app.config)
+
+
+@app.after_request
+def lectura_propia(response):
+	if REPLICA in db.engines:
+		registrar_lectura_propia(app.config['REPLICA_RETRASO_MAX'])
+	return response
 
-db = SQLAlchemy(app)
 
 # Importar modelos y registrar rutas
 from .models import Cliente, Propuesta, VersionPropuesta, RespuestaCliente, Notificacion, CostoIndirecto
@@ -0,0 +1,289 @@
+"""
+Almacén de documentos direccionado por contenido.
+
+Cada documento se guarda una sola vez en
+DOCUMENTOS_DIR/objetos/<h[0:2]>/<h[2:4]>/<hash>.html, donde hash es el
+SHA-256 que ya se registra en DocumentoGenerado.hash_documento. Renders
+idénticos comparten el mismo archivo y las filas solo lo referencian.
+La escritura va a un temporal en el mismo directorio y se publica con
+os.replace, por lo que nunca se ve un archivo a medio escribir.
+
+Con DOCUMENTOS_COMPRESION (gzip y/o br) el objeto se guarda solo en esas
+variantes (<hash>.html.gz, <hash>.html.br) en lugar del HTML plano;
+archivo_path conserva la ruta lógica <hash>.html. El servidor entrega la
+variante tal cual si el cliente la acepta y, si no, la descomprime por
+bloques mientras responde.
+
+Los objetos sin referencias (p. ej. el contrato sin firma tras firmarlo)
+se eliminan con recolectar_huerfanos(), respetando un periodo de gracia
+para no borrar renders cuyo registro aún no se ha confirmado.
+"""
+import os
+import gzip
+import time
+import zlib
+import hashlib
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se ofrece gzip
+    brotli = None
+
+from . import app, db
+from .models import DocumentoGenerado
+
+DIR_OBJETOS = 'objetos'
+EXTENSION = '.html'
+# Los PDF ya vienen comprimidos: se guardan siempre tal cual
+EXTENSIONES_COMPRIMIBLES = {'.html'}
+PREFIJO_TEMPORAL = '.tmp-'
+# Content-Encoding -> sufijo del archivo en disco ('identity' es el HTML plano)
+SUFIJOS = {'br': '.br', 'gzip': '.gz', 'identity': ''}
+NIVEL_GZIP = 9
+CALIDAD_BROTLI = 11
+TAMANO_BLOQUE = 64 * 1024
+# Objetos más nuevos que esto no se recolectan aunque no tengan referencias
+GRACIA_SEGUNDOS = 24 * 3600
+
+
+def directorio_objetos():
+    return os.path.join(app.config['DOCUMENTOS_DIR'], DIR_OBJETOS)
+
+
+def calcular_hash(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def ruta_objeto(hash_documento, extension=EXTENSION):
+    """Ruta del objeto, repartida en dos niveles para no saturar un directorio"""
+    return os.path.join(
+        directorio_objetos(), hash_documento[:2], hash_documento[2:4], hash_documento + extension
+    )
+
+
+def _ruta_logica(ruta_variante):
+    """<hash>.html.gz -> <hash>.html"""
+    for sufijo in SUFIJOS.values():
+        if sufijo and ruta_variante.endswith(sufijo):
+            return ruta_variante[:-len(sufijo)]
+    return ruta_variante
+
+
+def formatos_configurados():
+    """Codificaciones con que se guardan los documentos nuevos"""
+    formatos = [f for f in app.config['DOCUMENTOS_COMPRESION'] if f in SUFIJOS and f != 'identity']
+    if 'br' in formatos and brotli is None:
+        app.logger.warning('DOCUMENTOS_COMPRESION incluye br pero el paquete brotli no está instalado')
+        formatos.remove('br')
+    return formatos or ['identity']
+
+
+def variantes(ruta):
+    """Variantes presentes en disco de un objeto, en orden de preferencia"""
+    return {
+        codificacion: ruta + sufijo
+        for codificacion, sufijo in SUFIJOS.items()
+        if os.path.exists(ruta + sufijo)
+    }
+
+
+def existe_documento(ruta):
+    return bool(variantes(ruta))
+
+
+def comprimir(contenido, codificacion):
+    if codificacion == 'gzip':
+        # mtime=0: mismo contenido, mismos bytes
+        return gzip.compress(contenido, compresslevel=NIVEL_GZIP, mtime=0)
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=CALIDAD_BROTLI, mode=brotli.MODE_TEXT)
+    return contenido
+
+
+def _descompresor(codificacion):
+    if codificacion == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+    if codificacion == 'br':
+        return brotli.Decompressor().process
+    return lambda bloque: bloque
+
+
+def iterar_documento(ruta, codificacion='identity'):
+    """Entrega el HTML plano por bloques, descomprimiendo la variante indicada"""
+    descomprimir = _descompresor(codificacion)
+    with open(ruta + SUFIJOS[codificacion], 'rb') as f:
+        while True:
+            bloque = f.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            salida = descomprimir(bloque)
+            if salida:
+                yield salida
+
+
+def leer_documento(ruta):
+    """Contenido completo sin comprimir de un objeto"""
+    presentes = variantes(ruta)
+    if not presentes:
+        raise FileNotFoundError(ruta)
+    codificacion = 'identity' if 'identity' in presentes else next(iter(presentes))
+    return b''.join(iterar_documento(ruta, codificacion))
+
+
+def _publicar(ruta, contenido):
+    """Escribe a un temporal del mismo directorio y lo renombra de forma atómica"""
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(prefix=PREFIJO_TEMPORAL, dir=directorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        # Atómico; si otro proceso publicó el mismo hash, el contenido es idéntico
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _renovar(ruta):
+    """Marca como recién usado un objeto existente. False si falta alguna variante
+
+    Un objeto sin referencia (el contrato sin firmar, un envío masivo que no
+    se confirmó) puede volver a guardarse: sin renovar el mtime, el
+    recolector lo borraría bajo el registro nuevo.
+    """
+    presentes = variantes(ruta)
+    if not presentes:
+        return False
+    try:
+        for archivo in presentes.values():
+            os.utime(archivo)
+    except FileNotFoundError:
+        # El recolector lo está retirando: se vuelve a publicar
+        return False
+    return True
+
+
+def guardar_documento(contenido, extension=EXTENSION, creados=None):
+    """Guarda el contenido (str o bytes) si no existe. Devuelve (hash, ruta)
+
+    Si se pasa la lista `creados`, se le agregan los archivos publicados en
+    esta llamada (no los que ya existían), para deshacerlos si el registro
+    no llega a confirmarse.
+    """
+    if isinstance(contenido, str):
+        contenido = contenido.encode('utf-8')
+    hash_documento = calcular_hash(contenido)
+    ruta = ruta_objeto(hash_documento, extension)
+    if _renovar(ruta):
+        return hash_documento, ruta
+    formatos = formatos_configurados() if extension in EXTENSIONES_COMPRIMIBLES else ['identity']
+    for codificacion in formatos:
+        _publicar(ruta + SUFIJOS[codificacion], comprimir(contenido, codificacion))
+        if creados is not None:
+            creados.append(ruta + SUFIJOS[codificacion])
+    return hash_documento, ruta
+
+
+def _hashes_referenciados():
+    filas = db.session.query(DocumentoGenerado.hash_documento).distinct()
+    return {hash_documento for (hash_documento,) in filas if hash_documento}
+
+
+def recolectar_huerfanos(gracia_segundos=GRACIA_SEGUNDOS, simular=False):
+    """Elimina objetos sin referencia y temporales abandonados más antiguos que la gracia"""
+    referenciados = _hashes_referenciados()
+    limite = time.time() - gracia_segundos
+    resultado = {'revisados': 0, 'eliminados': 0, 'bytes_liberados': 0}
+
+    for raiz, _, archivos in os.walk(directorio_objetos()):
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            resultado['revisados'] += 1
+            if nombre.startswith(PREFIJO_TEMPORAL):
+                huerfano = True
+            else:
+                # <hash>.html, <hash>.html.gz, <hash>.html.br
+                huerfano = nombre.split('.', 1)[0] not in referenciados
+            if not huerfano:
+                continue
+            try:
+                # Justo antes de borrar: guardar_documento renueva el mtime al reutilizarlo
+                estado = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            if estado.st_mtime > limite:
+                continue
+            if not simular:
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    continue
+            resultado['eliminados'] += 1
+            resultado['bytes_liberados'] += estado.st_size
+    return resultado
+
+
+def importar_legados(tamano_lote=500):
+    """Mueve al almacén los documentos guardados como archivo plano por versión"""
+    prefijo = directorio_objetos() + os.sep
+    pendientes = [
+        documento for documento in DocumentoGenerado.query.all()
+        if not documento.archivo_path.startswith(prefijo)
+    ]
+    resultado = {'importados': 0, 'faltantes': 0, 'archivos_eliminados': 0}
+    antiguos = set()
+
+    for i, documento in enumerate(pendientes, 1):
+        if not os.path.exists(documento.archivo_path):
+            resultado['faltantes'] += 1
+            continue
+        with open(documento.archivo_path, 'rb') as f:
+            contenido = f.read()
+        antiguos.add(documento.archivo_path)
+        extension = os.path.splitext(documento.archivo_path)[1] or EXTENSION
+        documento.hash_documento, documento.archivo_path = guardar_documento(contenido, extension)
+        resultado['importados'] += 1
+        if i % tamano_lote == 0:
+            db.session.commit()
+    db.session.commit()
+
+    # Solo tras confirmar las nuevas rutas se borran los archivos planos
+    for ruta in antiguos:
+        if not DocumentoGenerado.query.filter_by(archivo_path=ruta).first():
+            os.remove(ruta)
+            resultado['archivos_eliminados'] += 1
+    return resultado
+
+
+def recomprimir_objetos():
+    """Lleva los objetos existentes a los formatos configurados y elimina los demás"""
+    resultado = {'objetos': 0, 'bytes_antes': 0, 'bytes_despues': 0}
+    rutas = set()
+    for raiz, _, archivos in os.walk(directorio_objetos()):
+        for nombre in archivos:
+            ruta = _ruta_logica(os.path.join(raiz, nombre))
+            if not nombre.startswith(PREFIJO_TEMPORAL) and os.path.splitext(ruta)[1] in EXTENSIONES_COMPRIMIBLES:
+                rutas.add(ruta)
+
+    formatos = formatos_configurados()
+    for ruta in sorted(rutas):
+        presentes = variantes(ruta)
+        if set(presentes) == set(formatos):
+            continue
+        resultado['objetos'] += 1
+        resultado['bytes_antes'] += sum(os.path.getsize(p) for p in presentes.values())
+        contenido = leer_documento(ruta)
+        for codificacion in formatos:
+            if codificacion not in presentes:
+                _publicar(ruta + SUFIJOS[codificacion], comprimir(contenido, codificacion))
+            resultado['bytes_despues'] += os.path.getsize(ruta + SUFIJOS[codificacion])
+        # Las variantes nuevas ya están publicadas antes de borrar las sobrantes
+        for codificacion, sobrante in presentes.items():
+            if codificacion not in formatos:
+                os.remove(sobrante)
+    return resultado
@@ -0,0 +1,213 @@
+"""
+Auditoría de acciones administrativas en una tabla append-only.
+
+Antes log_admin_action() guardaba cada acción como Notificacion de tipo
+AUDIT con un segundo commit por request, y esas filas engordaban la
+bandeja de salida que recorre el despachador. Ahora:
+- auditar() solo agrega el evento a un buffer en memoria; el request no
+  espera a la base;
+- un hilo escritor (EscritorAuditoria) inserta lo acumulado en un solo
+  executemany cada AUDITORIA_INTERVALO segundos, o antes si se juntan
+  AUDITORIA_LOTE eventos; al salir del proceso se vacía lo pendiente;
+- la tabla `auditoria` solo admite INSERT (en SQLite, triggers abortan
+  UPDATE y DELETE);
+- consultar_auditoria() filtra por propuesta, acción y rango de fechas
+  sobre los índices (propuesta_id, fecha), (accion, fecha) y (fecha).
+Dentro de una unidad de trabajo (app/unidad_trabajo.py) el evento se
+inserta en la misma transacción que el cambio que registra.
+"""
+import os
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import has_request_context, request, session
+from sqlalchemy import DDL, delete, event, insert, select
+
+from . import app, db
+from .models import EventoAuditoria, Notificacion
+from .paginacion import codificar_cursor
+
+_tabla = EventoAuditoria.__table__
+_notificaciones = Notificacion.__table__
+
+# Solo inserciones: la tabla es la evidencia, no se corrige ni se poda desde la app
+for _operacion in ('UPDATE', 'DELETE'):
+    event.listen(_tabla, 'after_create', DDL(
+        f"CREATE TRIGGER IF NOT EXISTS auditoria_sin_{_operacion.lower()} "
+        f"BEFORE {_operacion} ON auditoria "
+        "BEGIN SELECT RAISE(ABORT, 'auditoria es append-only'); END"
+    ).execute_if(dialect='sqlite'))
+
+# Eventos aún no escritos. append/popleft de deque son atómicos entre hilos
+_pendientes = deque()
+_vaciar_lock = threading.Lock()
+
+
+def evento_auditoria(accion, propuesta_id=None, detalle=None, usuario=None):
+    """Fila de `auditoria` con la fecha, la IP y el usuario de la petición actual"""
+    evento = {
+        'fecha': datetime.utcnow(),
+        'accion': accion,
+        'propuesta_id': propuesta_id,
+        'usuario': usuario,
+        'ip': None,
+        'detalle': detalle,
+    }
+    if has_request_context():
+        evento['ip'] = request.remote_addr
+        if usuario is None and session.get('admin_logged_in'):
+            evento['usuario'] = app.config.get('ADMIN_USER')
+    return evento
+
+
+def auditar(accion, propuesta_id=None, detalle=None, usuario=None):
+    """Registra una acción administrativa. No toca la base: la escribe el hilo escritor"""
+    evento = evento_auditoria(accion, propuesta_id, detalle, usuario)
+    escritor = iniciar_escritor()
+    _pendientes.append(evento)
+    if len(_pendientes) >= escritor.lote:
+        escritor.despertar()
+
+
+def pendientes():
+    """Eventos registrados que aún no están en la base"""
+    return len(_pendientes)
+
+
+def vaciar():
+    """Escribe lo pendiente en lotes de AUDITORIA_LOTE. Devuelve cuántos eventos insertó"""
+    tamano = app.config['AUDITORIA_LOTE']
+    total = 0
+    with _vaciar_lock, app.app_context():
+        while _pendientes:
+            lote = []
+            while _pendientes and len(lote) < tamano:
+                lote.append(_pendientes.popleft())
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(_tabla), lote)
+            except Exception:
+                # Vuelven al frente en su orden; se reintentan en la próxima pasada
+                _pendientes.extendleft(reversed(lote))
+                raise
+            total += len(lote)
+    return total
+
+
+def consultar_auditoria(propuesta_id=None, accion=None, desde=None, hasta=None, cursor=None, limite=100):
+    """Eventos más recientes primero, filtrados. Devuelve (eventos, cursor_siguiente)
+
+    `desde` es inclusivo y `hasta` exclusivo. `cursor` es (fecha, id) como
+    lo entrega paginacion.decodificar_cursor.
+    """
+    # Lo registrado por este proceso se ve en la consulta
+    vaciar()
+    consulta = select(_tabla)
+    if propuesta_id:
+        consulta = consulta.where(_tabla.c.propuesta_id == propuesta_id)
+    if accion:
+        consulta = consulta.where(_tabla.c.accion == accion)
+    if desde:
+        consulta = consulta.where(_tabla.c.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(_tabla.c.fecha < hasta)
+    if cursor:
+        fecha, evento_id = cursor
+        consulta = consulta.where(
+            (_tabla.c.fecha < fecha) | ((_tabla.c.fecha == fecha) & (_tabla.c.id < int(evento_id)))
+        )
+    # id es el rowid: los índices (x, fecha) ya lo traen y ordenan sin paso extra
+    filas = db.session.execute(
+        consulta.order_by(_tabla.c.fecha.desc(), _tabla.c.id.desc()).limit(limite + 1)
+    ).all()
+    if len(filas) <= limite:
+        return filas, None
+    filas = filas[:limite]
+    return filas, codificar_cursor(filas[-1].fecha, filas[-1].id)
+
+
+def trasladar_auditoria_antigua():
+    """Mueve las Notificacion AUDIT de versiones anteriores a `auditoria`. Devuelve cuántas movió"""
+    with db.engine.begin() as conn:
+        antiguas = conn.execute(
+            select(
+                _notificaciones.c.id, _notificaciones.c.propuesta_id, _notificaciones.c.asunto,
+                _notificaciones.c.mensaje, _notificaciones.c.fecha_creacion,
+            ).where(_notificaciones.c.tipo == 'AUDIT')
+        ).all()
+        if not antiguas:
+            return 0
+        conn.execute(insert(_tabla), [
+            {
+                'fecha': fila.fecha_creacion or datetime.utcnow(),
+                # asunto = 'AUDIT <accion>: <propuesta_id>'
+                'accion': (fila.asunto or 'AUDIT').removeprefix('AUDIT ').split(':', 1)[0] or 'AUDIT',
+                'propuesta_id': fila.propuesta_id,
+                'usuario': None,
+                'ip': None,
+                'detalle': fila.mensaje,
+            }
+            for fila in antiguas
+        ])
+        conn.execute(delete(_notificaciones).where(_notificaciones.c.tipo == 'AUDIT'))
+    return len(antiguas)
+
+
+class EscritorAuditoria:
+    """Hilo que inserta los eventos pendientes por lotes"""
+
+    def __init__(self, intervalo, lote):
+        self.intervalo = intervalo
+        self.lote = max(1, lote)
+        self.pid = os.getpid()
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name='escritor-auditoria', daemon=True)
+        self._hilo.start()
+        return self
+
+    def despertar(self):
+        self._evento.set()
+
+    def detener(self):
+        self._detener.set()
+        self._evento.set()
+        if self._hilo:
+            self._hilo.join(timeout=10)
+        try:
+            vaciar()
+        except Exception as e:
+            app.logger.error('Auditoría: %d eventos sin escribir al detener: %s', len(_pendientes), e)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            try:
+                vaciar()
+            except Exception as e:
+                app.logger.warning('Escritor de auditoría: %s', e)
+
+
+_escritor = None
+_escritor_lock = threading.Lock()
+
+
+def iniciar_escritor():
+    """Escritor del proceso actual; se crea al primer evento y de nuevo tras un fork"""
+    global _escritor
+    if _escritor is not None and _escritor.pid == os.getpid():
+        return _escritor
+    with _escritor_lock:
+        if _escritor is None or _escritor.pid != os.getpid():
+            if _escritor is not None:
+                # Tras un fork los eventos copiados del padre son del padre
+                _pendientes.clear()
+            _escritor = EscritorAuditoria(app.config['AUDITORIA_INTERVALO'], app.config['AUDITORIA_LOTE']).iniciar()
+            atexit.register(_escritor.detener)
+    return _escritor
@@ -0,0 +1,148 @@
+"""
+Arranque del motor de base de datos: pool y PRAGMAs de SQLite.
+
+Con las opciones por defecto SQLite usa rollback journal: un lector
+bloquea el commit de un escritor y las escrituras concurrentes del portal
+y de la administración terminan en "database is locked". Cada conexión
+nueva de SQLite (a archivo) recibe ahora:
+- journal_mode=WAL: los lectores no bloquean al escritor ni al revés;
+- busy_timeout: un escritor espera el lock en vez de fallar de inmediato;
+- synchronous=NORMAL: en WAL sigue siendo seguro ante caídas del proceso
+  y evita un fsync por commit;
+- mmap_size y cache_size: lecturas desde memoria compartida.
+El pool (tamaño, desborde, pre-ping) vale para cualquier motor. Todo se
+configura con variables de entorno junto a DATABASE_URL (SQLITE_*, DB_POOL_*,
+leídas en app/__init__.py).
+
+Réplica de lectura: con DATABASE_REPLICA_URL el motor 'replica' queda en
+db.engines y SesionEnrutada envía a él las consultas de las vistas marcadas
+con @solo_lectura (panel, listados, portal, API de consulta). Todo lo demás
+va a la primaria: las vistas sin marcar, los flush e INSERT/UPDATE/DELETE,
+la sesión que ya escribió y, durante REPLICA_RETRASO_MAX segundos después
+de un commit, las peticiones del mismo navegador (lee lo que escribió
+aunque la réplica vaya atrasada). pasar_a_primaria() saca el resto de una
+vista de solo lectura de la réplica.
+
+No importa `app`: __init__.py lo usa antes de crear SQLAlchemy(app).
+"""
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA = 'replica'
+# Clave de la sesión del navegador: hasta cuándo leer de la primaria
+_CLAVE_PRIMARIA = 'lectura_primaria_hasta'
+
+
+def es_sqlite_archivo(url):
+    """SQLite sobre un archivo (las bases en memoria no admiten WAL ni mmap)"""
+    url = str(url)
+    return url.startswith('sqlite') and ':memory:' not in url and url.rstrip('/') not in ('sqlite:', 'sqlite+pysqlite:')
+
+
+def opciones_motor(url, config):
+    """Argumentos para create_engine (SQLALCHEMY_ENGINE_OPTIONS)"""
+    opciones = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_POOL_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if str(url).startswith('sqlite'):
+        if not es_sqlite_archivo(url):
+            # La base en memoria vive en una sola conexión (StaticPool): sin tamaño de pool
+            return {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+        opciones['connect_args'] = {
+            # Espera del driver; igual a busy_timeout para que no corte antes
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+            # El pool entrega la conexión a distintos hilos, nunca a dos a la vez
+            'check_same_thread': False,
+        }
+    return opciones
+
+
+def pragmas(config):
+    """Sentencias PRAGMA que se aplican a cada conexión SQLite a archivo"""
+    sentencias = [f"PRAGMA busy_timeout = {config['SQLITE_BUSY_TIMEOUT_MS']}"]
+    if config['SQLITE_WAL']:
+        sentencias.append('PRAGMA journal_mode = WAL')
+    sentencias += [
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {config['SQLITE_MMAP_MB'] * 1024 * 1024}",
+        # Negativo: tamaño en KiB en vez de páginas
+        f"PRAGMA cache_size = {-config['SQLITE_CACHE_MB'] * 1024}",
+    ]
+    return sentencias
+
+
+def instalar_pragmas(engine, config):
+    """Aplica pragmas(config) en cada conexión nueva del motor si es SQLite a archivo"""
+    if not es_sqlite_archivo(engine.url):
+        return False
+    sentencias = pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _al_conectar(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def solo_lectura(vista):
+    """Marca una vista cuyas consultas pueden ir a la réplica"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        g.solo_lectura = True
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+def pasar_a_primaria():
+    """El resto de la petición lee de la primaria (la réplica no tiene lo que se busca)"""
+    g.solo_lectura = False
+
+
+def usa_replica():
+    """True si las próximas consultas de esta petición irían a la réplica"""
+    if not has_request_context() or not g.get('solo_lectura'):
+        return False
+    if REPLICA not in current_app.extensions['sqlalchemy'].engines:
+        return False
+    # Lee lo que escribió: el navegador que confirmó algo hace poco va a la primaria
+    return session.get(_CLAVE_PRIMARIA, 0) <= time.time()
+
+
+class SesionEnrutada(Session):
+    """Session de Flask-SQLAlchemy que separa lecturas (réplica) y escrituras (primaria)"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('escribio'):
+            if not getattr(clause, 'is_dml', False) and usa_replica():
+                return self._db.engines[REPLICA]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _marcar_escritura(sesion, contexto):
+    # Desde aquí esta sesión lee de la primaria: la réplica no tiene lo que acaba de escribir
+    sesion.info['escribio'] = True
+
+
+@event.listens_for(SesionEnrutada, 'after_commit')
+def _registrar_commit(sesion):
+    if sesion.info.get('escribio') and has_request_context():
+        g.escritura_confirmada = True
+
+
+def registrar_lectura_propia(retraso_max):
+    """Al cerrar una petición con commit: el navegador lee de la primaria `retraso_max` segundos"""
+    if g.get('escritura_confirmada'):
+        session[_CLAVE_PRIMARIA] = time.time() + retraso_max
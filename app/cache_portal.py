@@ -0,0 +1,190 @@
+"""
+Caché de la página del portal del cliente.
+
+portal_cliente.html solo cambia cuando cambia la versión o el estado de la
+propuesta, pero se renderizaba completo en cada visita, y un enlace
+reenviado a todo un equipo de compras llega en ráfagas. La página se
+guarda por clave_pagina() = hash de (plantilla, propuesta_id, versión,
+estado), que además es el ETag:
+- un GET con If-None-Match igual responde 304 sin renderizar;
+- nivel en memoria: LRU acotado a PORTAL_CACHE_BYTES;
+- nivel en disco opcional (PORTAL_CACHE_DIR): compartido entre procesos y
+  reinicios, con a lo sumo PORTAL_CACHE_DISCO_MAX archivos;
+- varias visitas simultáneas a una página sin caché esperan un único
+  render.
+Como la versión y el estado son parte de la clave, nada se invalida: una
+propuesta modificada o respondida simplemente usa otra clave.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from . import app
+
+# Cada cuántas escrituras en disco se revisa el máximo de archivos
+PODA_CADA = 100
+
+_lock = threading.Lock()
+_paginas = OrderedDict()  # clave -> bytes
+_en_curso = {}            # clave -> Event del render que otros esperan
+_estado = {'bytes': 0, 'huella': None, 'escrituras': 0}
+_metricas = {'memoria': 0, 'disco': 0, 'renders': 0, 'no_modificadas': 0, 'desalojos': 0}
+
+
+def _huella_plantilla():
+    """Hash del fuente de la plantilla: un despliegue con otra plantilla cambia todas las claves"""
+    if _estado['huella'] is None:
+        fuente, _, _ = app.jinja_env.loader.get_source(app.jinja_env, 'portal_cliente.html')
+        _estado['huella'] = hashlib.sha1(fuente.encode('utf-8')).hexdigest()[:12]
+    return _estado['huella']
+
+
+def clave_pagina(propuesta_id, version, estado):
+    """Clave de caché y ETag de la página de una propuesta"""
+    crudo = f'{_huella_plantilla()}|{propuesta_id}|{version}|{estado}'
+    return hashlib.sha1(crudo.encode('utf-8')).hexdigest()
+
+
+def registrar_no_modificada():
+    with _lock:
+        _metricas['no_modificadas'] += 1
+
+
+def _guardar_memoria(clave, cuerpo):
+    maximo = app.config['PORTAL_CACHE_BYTES']
+    if len(cuerpo) > maximo:
+        return
+    with _lock:
+        anterior = _paginas.pop(clave, None)
+        if anterior is not None:
+            _estado['bytes'] -= len(anterior)
+        _paginas[clave] = cuerpo
+        _estado['bytes'] += len(cuerpo)
+        while _estado['bytes'] > maximo:
+            _, desalojada = _paginas.popitem(last=False)
+            _estado['bytes'] -= len(desalojada)
+            _metricas['desalojos'] += 1
+
+
+def _ruta_disco(clave):
+    directorio = app.config['PORTAL_CACHE_DIR']
+    return os.path.join(directorio, f'{clave}.html') if directorio else None
+
+
+def _leer_disco(clave):
+    ruta = _ruta_disco(clave)
+    if not ruta:
+        return None
+    try:
+        with open(ruta, 'rb') as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+
+def _escribir_disco(clave, cuerpo):
+    ruta = _ruta_disco(clave)
+    if not ruta:
+        return
+    directorio = os.path.dirname(ruta)
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        # Escritura atómica: otro proceso nunca lee una página a medias
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(cuerpo)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        app.logger.warning('Caché del portal en disco: %s', e)
+        return
+    with _lock:
+        _estado['escrituras'] += 1
+        podar = _estado['escrituras'] % PODA_CADA == 0
+    if podar:
+        podar_disco()
+
+
+def podar_disco(maximo=None):
+    """Borra las páginas en disco más antiguas por encima del máximo. Devuelve cuántas borró"""
+    directorio = app.config['PORTAL_CACHE_DIR']
+    maximo = app.config['PORTAL_CACHE_DISCO_MAX'] if maximo is None else maximo
+    if not directorio or not os.path.isdir(directorio):
+        return 0
+    with os.scandir(directorio) as entradas:
+        paginas = [(e.stat().st_mtime, e.path) for e in entradas if e.name.endswith('.html')]
+    if len(paginas) <= maximo:
+        return 0
+    paginas.sort()
+    borradas = 0
+    for _, ruta in paginas[:len(paginas) - maximo]:
+        try:
+            os.remove(ruta)
+            borradas += 1
+        except OSError:
+            pass
+    return borradas
+
+
+def obtener_pagina(clave, generar):
+    """Página cacheada con esa clave; si no existe la renderiza una vez con generar().
+
+    generar() devuelve el HTML como str, o None si la propuesta ya no existe
+    (no se cachea).
+    """
+    while True:
+        with _lock:
+            cuerpo = _paginas.get(clave)
+            if cuerpo is not None:
+                _paginas.move_to_end(clave)
+                _metricas['memoria'] += 1
+                return cuerpo
+            espera = _en_curso.get(clave)
+            if espera is None:
+                espera = _en_curso[clave] = threading.Event()
+                break
+        # Otro hilo la está generando: al terminar estará en memoria (o, si
+        # falló, esta vuelta la genera)
+        espera.wait()
+
+    try:
+        cuerpo = _leer_disco(clave)
+        if cuerpo is not None:
+            with _lock:
+                _metricas['disco'] += 1
+        else:
+            html = generar()
+            if html is None:
+                return None
+            cuerpo = html.encode('utf-8')
+            with _lock:
+                _metricas['renders'] += 1
+            _escribir_disco(clave, cuerpo)
+        _guardar_memoria(clave, cuerpo)
+        return cuerpo
+    finally:
+        with _lock:
+            _en_curso.pop(clave, None)
+        espera.set()
+
+
+def invalidar_paginas(disco=False):
+    """Vacía el nivel en memoria (y el de disco si se pide) y reinicia los contadores"""
+    with _lock:
+        _paginas.clear()
+        _estado['bytes'] = 0
+        _estado['huella'] = None
+        for clave in _metricas:
+            _metricas[clave] = 0
+    if disco:
+        podar_disco(maximo=0)
+
+
+def metricas_portal():
+    """Aciertos por nivel, renders, 304 y ocupación de la caché de páginas"""
+    with _lock:
+        datos = dict(_metricas)
+        datos['paginas'] = len(_paginas)
+        datos['bytes'] = _estado['bytes']
+    return datos
@@ -0,0 +1,145 @@
+"""
+Caché en proceso de token de acceso -> propuesta para el portal del cliente.
+
+Las rutas /cliente/... resolvían el token con Propuesta.query.filter_by(
+token_acceso=...) y cargaban la fila completa en cada request. Ahora
+resolver_token() devuelve una EntradaToken (id, número, estado, versión y
+fecha de expiración) desde un LRU acotado:
+- una entrada vive TOKENS_CACHE_TTL segundos, o menos si la propuesta
+  expira antes: al pasar fecha_expiracion la próxima lectura va a la base;
+- los cambios de estado de este proceso la descartan al instante
+  (invalidar_propuestas); los de otros procesos se ven al vencer el TTL;
+- los tokens inexistentes se recuerdan TOKENS_NEGATIVOS_TTL segundos en un
+  LRU propio, para que un barrido de tokens no vaya a la base ni desaloje
+  las entradas válidas; los que no tienen forma de token ni se consultan.
+metricas_tokens() informa aciertos, fallos y desalojos.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import select
+
+from . import app, db
+from .base_datos import pasar_a_primaria, usa_replica
+from .models import Propuesta
+
+EntradaToken = namedtuple('EntradaToken', ['id', 'numero_propuesta', 'estado', 'version', 'fecha_expiracion'])
+
+# secrets.token_urlsafe() y los tokens de prueba; la columna es String(64)
+_FORMATO_TOKEN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+_tabla = Propuesta.__table__
+_lock = threading.Lock()
+_entradas = OrderedDict()   # token -> (EntradaToken, vence)
+_negativos = OrderedDict()  # token -> vence
+_por_id = {}                # propuesta_id -> token, para invalidar por id
+_generacion = [0]           # sube con cada invalidación
+_metricas = {'aciertos': 0, 'fallos': 0, 'aciertos_negativos': 0, 'rechazados': 0, 'desalojos': 0, 'invalidaciones': 0}
+
+
+def _vencimiento(entrada, ahora):
+    """Instante (monotonic) en que la entrada deja de servirse"""
+    ttl = app.config['TOKENS_CACHE_TTL']
+    if entrada.fecha_expiracion is not None:
+        restante = (entrada.fecha_expiracion - datetime.utcnow()).total_seconds()
+        if restante > 0:
+            ttl = min(ttl, restante)
+    return ahora + ttl
+
+
+def _guardar(token, entrada, ahora, generacion):
+    with _lock:
+        if generacion != _generacion[0]:
+            # Se invalidó mientras se leía: el valor leído puede ser anterior al cambio
+            return
+        if entrada is None:
+            _negativos[token] = ahora + app.config['TOKENS_NEGATIVOS_TTL']
+            _negativos.move_to_end(token)
+            while len(_negativos) > app.config['TOKENS_NEGATIVOS_MAX']:
+                _negativos.popitem(last=False)
+                _metricas['desalojos'] += 1
+            return
+        _entradas[token] = (entrada, _vencimiento(entrada, ahora))
+        _entradas.move_to_end(token)
+        _por_id[entrada.id] = token
+        while len(_entradas) > app.config['TOKENS_CACHE_MAX']:
+            _, (desalojada, _) = _entradas.popitem(last=False)
+            _por_id.pop(desalojada.id, None)
+            _metricas['desalojos'] += 1
+
+
+def resolver_token(token):
+    """EntradaToken de la propuesta con ese token, o None si no existe"""
+    if not _FORMATO_TOKEN.fullmatch(token or ''):
+        with _lock:
+            _metricas['rechazados'] += 1
+        return None
+
+    ahora = time.monotonic()
+    with _lock:
+        guardada = _entradas.get(token)
+        if guardada is not None:
+            if ahora < guardada[1]:
+                _entradas.move_to_end(token)
+                _metricas['aciertos'] += 1
+                return guardada[0]
+            del _entradas[token]
+            _por_id.pop(guardada[0].id, None)
+        vence = _negativos.get(token)
+        if vence is not None:
+            if ahora < vence:
+                _metricas['aciertos_negativos'] += 1
+                return None
+            del _negativos[token]
+        _metricas['fallos'] += 1
+        generacion = _generacion[0]
+
+    consulta = select(
+        _tabla.c.id, _tabla.c.numero_propuesta, _tabla.c.estado, _tabla.c.version, _tabla.c.fecha_expiracion,
+    ).where(_tabla.c.token_acceso == token)
+    fila = db.session.execute(consulta).first()
+    if fila is None and usa_replica():
+        # Un enlace recién enviado puede no haber llegado a la réplica: no recordarlo
+        # como inexistente, y la página de la propuesta también se lee de la primaria
+        pasar_a_primaria()
+        fila = db.session.execute(consulta).first()
+    entrada = EntradaToken(*fila) if fila else None
+    _guardar(token, entrada, ahora, generacion)
+    return entrada
+
+
+def invalidar_propuestas(*propuesta_ids):
+    """Descarta las entradas de esas propuestas; llamar tras cambiar su estado o expiración"""
+    if not propuesta_ids:
+        return
+    with _lock:
+        _generacion[0] += 1
+        for propuesta_id in propuesta_ids:
+            token = _por_id.pop(propuesta_id, None)
+            if token is not None and _entradas.pop(token, None) is not None:
+                _metricas['invalidaciones'] += 1
+
+
+def invalidar_tokens():
+    """Vacía la caché completa y reinicia los contadores (pruebas, cargas masivas)"""
+    with _lock:
+        _entradas.clear()
+        _negativos.clear()
+        _por_id.clear()
+        _generacion[0] += 1
+        for clave in _metricas:
+            _metricas[clave] = 0
+
+
+def metricas_tokens():
+    """Contadores de la caché y tasa de aciertos"""
+    with _lock:
+        datos = dict(_metricas)
+        datos['entradas'] = len(_entradas)
+        datos['negativos'] = len(_negativos)
+    consultas = datos['aciertos'] + datos['aciertos_negativos'] + datos['fallos']
+    datos['tasa_aciertos'] = (datos['aciertos'] + datos['aciertos_negativos']) / consultas if consultas else 0.0
+    return datos
@@ -0,0 +1,216 @@
+"""
+Cola persistente de renderizado de documentos con pool de procesos.
+
+enviar_propuesta encola un TrabajoRender en la misma transacción que el
+cambio de estado y responde de inmediato con el id del trabajo. Un
+despachador reclama trabajos de la tabla trabajos_render (sin broker
+externo: basta la propia base SQLite) y los ejecuta en un
+ProcessPoolExecutor. Los fallos se reintentan con backoff exponencial
+hasta max_intentos; un worker caído libera sus trabajos al vencer el lease.
+"""
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+from . import app, db
+from .models import TrabajoRender
+
+# Tiempo que un worker retiene un trabajo antes de que otro pueda reclamarlo
+LEASE_SEGUNDOS = 300
+# Tope de espera entre reintentos
+REINTENTO_MAXIMO_SEGUNDOS = 300
+
+_tabla = TrabajoRender.__table__
+
+
+def _renderizadores():
+    """Funciones de renderizado por tipo de trabajo"""
+    # Import diferido: routes importa este módulo
+    from .routes import generar_propuesta_html
+    return {'PROPUESTA': generar_propuesta_html}
+
+
+def encolar_render(propuesta_id, tipo='PROPUESTA'):
+    """Agrega el trabajo a la sesión actual; se persiste con el commit del llamador"""
+    trabajo = TrabajoRender(propuesta_id=propuesta_id, tipo=tipo)
+    db.session.add(trabajo)
+    return trabajo
+
+
+def _disponible(ahora):
+    return or_(
+        and_(_tabla.c.estado == 'PENDIENTE', _tabla.c.proximo_intento <= ahora),
+        # Worker caído: el lease venció sin que terminara
+        and_(_tabla.c.estado == 'EN_PROCESO', _tabla.c.bloqueado_hasta < ahora),
+    )
+
+
+def reclamar_trabajos(limite):
+    """Marca hasta `limite` trabajos como EN_PROCESO y devuelve sus ids"""
+    ahora = datetime.utcnow()
+    reclamados = []
+    with db.engine.begin() as conn:
+        candidatos = conn.execute(
+            select(_tabla.c.id).where(_disponible(ahora)).order_by(_tabla.c.proximo_intento).limit(limite)
+        ).scalars().all()
+        for trabajo_id in candidatos:
+            # UPDATE condicional: si otro despachador lo tomó, no afecta filas
+            resultado = conn.execute(
+                update(_tabla)
+                .where(_tabla.c.id == trabajo_id, _disponible(ahora))
+                .values(
+                    estado='EN_PROCESO',
+                    intentos=_tabla.c.intentos + 1,
+                    bloqueado_hasta=ahora + timedelta(seconds=LEASE_SEGUNDOS),
+                    fecha_actualizacion=ahora,
+                )
+            )
+            if resultado.rowcount:
+                reclamados.append(trabajo_id)
+    return reclamados
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial: base, 2*base, 4*base... con tope"""
+    base = app.config['RENDER_REINTENTO_BASE']
+    return min(base * 2 ** max(intentos - 1, 0), REINTENTO_MAXIMO_SEGUNDOS)
+
+
+def _registrar_resultado(trabajo_id, documento_id=None, error=None):
+    ahora = datetime.utcnow()
+    with db.engine.begin() as conn:
+        if error is None:
+            valores = {'estado': 'COMPLETADO', 'documento_id': documento_id, 'error': None}
+        else:
+            intentos, max_intentos = conn.execute(
+                select(_tabla.c.intentos, _tabla.c.max_intentos).where(_tabla.c.id == trabajo_id)
+            ).one()
+            valores = {'error': error}
+            if intentos >= max_intentos:
+                valores['estado'] = 'FALLIDO'
+            else:
+                valores['estado'] = 'PENDIENTE'
+                valores['proximo_intento'] = ahora + timedelta(seconds=espera_reintento(intentos))
+        conn.execute(
+            update(_tabla)
+            .where(_tabla.c.id == trabajo_id)
+            .values(bloqueado_hasta=None, fecha_actualizacion=ahora, **valores)
+        )
+
+
+def ejecutar_trabajo(trabajo_id):
+    """Renderiza un trabajo reclamado. Se ejecuta dentro de los procesos del pool"""
+    with app.app_context():
+        try:
+            trabajo = TrabajoRender.query.get(trabajo_id)
+            renderizar = _renderizadores()[trabajo.tipo]
+            _, documento_id = renderizar(trabajo.propuesta_id)
+        except Exception as e:
+            db.session.rollback()
+            _registrar_resultado(trabajo_id, error=f'{type(e).__name__}: {e}')
+            return False
+        finally:
+            db.session.remove()
+        _registrar_resultado(trabajo_id, documento_id=documento_id)
+        return True
+
+
+def procesar_pendientes(limite=100):
+    """Procesa en este mismo proceso los trabajos disponibles (CLI --una-vez y pruebas)"""
+    with app.app_context():
+        ids = reclamar_trabajos(limite)
+    return sum(1 for trabajo_id in ids if ejecutar_trabajo(trabajo_id))
+
+
+class Despachador:
+    """Hilo que reclama trabajos y los reparte en un pool de procesos"""
+
+    def __init__(self, workers, intervalo=1.0):
+        self.workers = max(1, workers)
+        self.intervalo = intervalo
+        self.pid = os.getpid()
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._en_curso = set()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._hilo = None
+
+    def iniciar(self):
+        # spawn: los hijos no heredan hilos ni conexiones abiertas del servidor
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self._hilo = threading.Thread(target=self._bucle, name='despachador-render', daemon=True)
+        self._hilo.start()
+        return self
+
+    def despertar(self):
+        self._evento.set()
+
+    def detener(self, esperar=True):
+        self._detener.set()
+        self._evento.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+        if self._pool:
+            self._pool.shutdown(wait=esperar)
+
+    def _terminado(self, futuro):
+        with self._lock:
+            self._en_curso.discard(futuro)
+        self._evento.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            with self._lock:
+                libres = self.workers - len(self._en_curso)
+            if libres > 0:
+                try:
+                    with app.app_context():
+                        ids = reclamar_trabajos(libres)
+                except Exception as e:
+                    app.logger.warning('Despachador de render: %s', e)
+                    ids = []
+                for trabajo_id in ids:
+                    futuro = self._pool.submit(ejecutar_trabajo, trabajo_id)
+                    with self._lock:
+                        self._en_curso.add(futuro)
+                    futuro.add_done_callback(self._terminado)
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+
+
+_despachador = None
+_despachador_lock = threading.Lock()
+
+
+def obtener_despachador():
+    """Despachador del proceso actual; se crea de nuevo tras un fork"""
+    global _despachador
+    with _despachador_lock:
+        if _despachador is None or _despachador.pid != os.getpid():
+            _despachador = Despachador(app.config['RENDER_WORKERS']).iniciar()
+            atexit.register(_despachador.detener, False)
+    return _despachador
+
+
+def iniciar_despachador_render():
+    """Despachador al arrancar si RENDER_ASINCRONO y RENDER_DESPACHADOR=proceso.
+
+    Con el render síncrono (por omisión) no hay cola: no se crea hilo ni
+    pool. Sin esto los trabajos pendientes, con reintento programado o con el
+    lease vencido de un worker caído esperarían al próximo encolado.
+    """
+    if not app.config['RENDER_ASINCRONO'] or app.config['RENDER_DESPACHADOR'] != 'proceso':
+        return None
+    return obtener_despachador()
+
+
+def notificar_encolado():
+    """Llamar tras el commit que encoló trabajos"""
+    if app.config['RENDER_DESPACHADOR'] == 'proceso':
+        obtener_despachador().despertar()
@@ -0,0 +1,113 @@
+"""
+Configuración de costos cacheada en proceso con invalidación por versión.
+
+La fila de configuracion_costos se carga una vez y se guarda como una
+instantánea inmutable. Cada CONFIGURACION_VERIFICACION segundos se
+consulta solo la columna `version` (una lectura de una fila); si otro
+proceso cambió la configuración la versión habrá subido y se recarga, de
+modo que todos los workers ven el cambio en pocos segundos. Los cambios
+pasan por actualizar_configuracion(), que incrementa la versión.
+
+La fila por defecto se crea al iniciar (sembrar_configuracion) y no en
+las rutas de lectura.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from . import app, db
+from .models import ConfiguracionCostos
+
+VALORES_POR_DEFECTO = {
+    'utilidad_minima': 25.0,
+    'utilidad_maxima': 35.0,
+    'vigencia_propuesta_horas': 24,
+    'terminos_condiciones': """1. Esta propuesta es válida solo para el servicio descrito.
+2. Los precios están sujetos a cambios en caso de modificación del servicio.
+3. ACME TRANS se reserva el derecho de rechazar carga peligrosa sin previo aviso.
+4. El cliente debe proporcionar toda la documentación necesaria para el transporte.
+5. Los tiempos de entrega son estimados y pueden variar según condiciones climáticas y de tráfico.""",
+    'condiciones_pago': "50% al inicio del servicio, 50% al completar la entrega",
+}
+
+Configuracion = namedtuple('Configuracion', [
+    'id', 'utilidad_minima', 'utilidad_maxima', 'vigencia_propuesta_horas', 'terminos_condiciones',
+    'condiciones_pago', 'fecha_actualizacion', 'usuario_actualizacion', 'version',
+])
+
+_tabla = ConfiguracionCostos.__table__
+_lock = threading.Lock()
+_cache = {'valor': None, 'verificado': 0.0, 'generacion': 0}
+
+
+def sembrar_configuracion():
+    """Crea la fila por defecto si no existe. Llamar al iniciar la aplicación"""
+    if db.session.query(ConfiguracionCostos.id).first():
+        return False
+    db.session.add(ConfiguracionCostos(usuario_actualizacion="Sistema", **VALORES_POR_DEFECTO))
+    db.session.commit()
+    invalidar_configuracion()
+    return True
+
+
+def _cargar():
+    fila = db.session.execute(select(*[_tabla.c[campo] for campo in Configuracion._fields]).limit(1)).first()
+    if fila is None:
+        # Sin sembrar: valores por defecto en memoria, sin escribir desde una lectura
+        app.logger.warning('configuracion_costos vacía; ejecute la inicialización (run.py / configurar_sistema.py)')
+        return Configuracion(
+            id=None, fecha_actualizacion=None, usuario_actualizacion=None, version=0, **VALORES_POR_DEFECTO
+        )
+    return Configuracion(*fila)
+
+
+def _version_actual():
+    return db.session.execute(select(_tabla.c.version).limit(1)).scalar() or 0
+
+
+def obtener_configuracion():
+    """Instantánea de la configuración; consulta la base solo al verificar la versión"""
+    ahora = time.monotonic()
+    with _lock:
+        valor = _cache['valor']
+        if valor is not None and ahora - _cache['verificado'] < app.config['CONFIGURACION_VERIFICACION']:
+            return valor
+        generacion = _cache['generacion']
+
+    if valor is None or _version_actual() != valor.version:
+        valor = _cargar()
+    with _lock:
+        # No guardar un valor leído antes de una invalidación concurrente
+        if generacion == _cache['generacion']:
+            _cache['valor'] = valor
+            _cache['verificado'] = time.monotonic()
+    return valor
+
+
+def actualizar_configuracion(usuario, **campos):
+    """Aplica cambios e incrementa la versión para que los demás procesos recarguen"""
+    desconocidos = set(campos) - set(VALORES_POR_DEFECTO)
+    if desconocidos:
+        raise ValueError(f"Campos de configuración desconocidos: {', '.join(sorted(desconocidos))}")
+    db.session.execute(
+        update(_tabla).values(
+            version=_tabla.c.version + 1,
+            fecha_actualizacion=datetime.utcnow(),
+            usuario_actualizacion=usuario,
+            **campos,
+        )
+    )
+    db.session.commit()
+    invalidar_configuracion()
+    return obtener_configuracion()
+
+
+def invalidar_configuracion():
+    """Descarta la copia local; la próxima lectura recarga desde la base"""
+    with _lock:
+        _cache['valor'] = None
+        _cache['verificado'] = 0.0
+        _cache['generacion'] += 1
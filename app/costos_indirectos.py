@@ -0,0 +1,170 @@
+"""
+Agregados materializados de costos indirectos.
+
+obtener_costo_indirecto_promedio() cargaba todas las filas de los últimos
+30 días y las promediaba en Python en cada creación de propuesta. Ahora
+agregados_costos_indirectos guarda suma y cantidad por período:
+- MES: período contable (año, mes) del costo; consultar_ventana() suma
+  los meses pedidos sin recorrer costos_indirectos.
+- DIA: fecha de registro; costo_indirecto_promedio() obtiene la ventana
+  móvil (30 días por defecto, con resolución diaria) en una sola fila.
+
+Cada INSERT de CostoIndirecto por el ORM actualiza los agregados en la
+misma transacción (evento after_insert). Las cargas masivas con Core
+(importacion_costos.py) llaman a acumular() con la misma conexión.
+reconstruir_agregados() los recalcula desde cero.
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert, select, update
+
+from . import db
+from .models import AgregadoCostoIndirecto, CostoIndirecto
+
+MES = 'MES'
+DIA = 'DIA'
+VENTANA_PROMEDIO_DIAS = 30
+
+Ventana = namedtuple('Ventana', 'suma cantidad promedio')
+
+_tabla = AgregadoCostoIndirecto.__table__
+_costos = CostoIndirecto.__table__
+
+
+def periodo_mes(año, mes):
+    return date(int(año), int(mes), 1)
+
+
+def _buckets(costos, signo=1):
+    """{(granularidad, periodo): [suma, cantidad]} de (año, mes, monto, fecha_registro)"""
+    meses, dias = {}, {}
+    for año, mes, monto, fecha_registro in costos:
+        bucket = meses.get((año, mes))
+        if bucket is None:
+            bucket = meses[(año, mes)] = [0.0, 0]
+        bucket[0] += monto
+        bucket[1] += 1
+        if fecha_registro is not None:
+            # Las cargas masivas comparten fecha_registro: agrupar por el datetime antes de .date()
+            bucket = dias.get(fecha_registro)
+            if bucket is None:
+                bucket = dias[fecha_registro] = [0.0, 0]
+            bucket[0] += monto
+            bucket[1] += 1
+
+    acumulado = {}
+    for (año, mes), (suma, cantidad) in meses.items():
+        acumulado[(MES, periodo_mes(año, mes))] = [signo * suma, signo * cantidad]
+    for fecha_registro, (suma, cantidad) in dias.items():
+        bucket = acumulado.setdefault((DIA, fecha_registro.date()), [0.0, 0])
+        bucket[0] += signo * suma
+        bucket[1] += signo * cantidad
+    return acumulado
+
+
+def _sumar(conn, filas):
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        if conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        sentencia = insert_dialecto(_tabla)
+        conn.execute(
+            sentencia.on_conflict_do_update(
+                index_elements=[_tabla.c.granularidad, _tabla.c.periodo],
+                set_={
+                    'suma': _tabla.c.suma + sentencia.excluded.suma,
+                    'cantidad': _tabla.c.cantidad + sentencia.excluded.cantidad,
+                    'fecha_actualizacion': sentencia.excluded.fecha_actualizacion,
+                },
+            ),
+            filas,
+        )
+        return
+    for fila in filas:
+        resultado = conn.execute(
+            update(_tabla)
+            .where(_tabla.c.granularidad == fila['granularidad'], _tabla.c.periodo == fila['periodo'])
+            .values(
+                suma=_tabla.c.suma + fila['suma'],
+                cantidad=_tabla.c.cantidad + fila['cantidad'],
+                fecha_actualizacion=fila['fecha_actualizacion'],
+            )
+        )
+        if resultado.rowcount == 0:
+            conn.execute(insert(_tabla).values(**fila))
+
+
+def acumular(conn, costos, signo=1):
+    """Suma costos (año, mes, monto, fecha_registro) a sus buckets, en la transacción de `conn`.
+
+    Con signo=-1 los descuenta (costo modificado o eliminado).
+    """
+    ahora = datetime.utcnow()
+    filas = [
+        {'granularidad': granularidad, 'periodo': periodo, 'suma': suma, 'cantidad': cantidad, 'fecha_actualizacion': ahora}
+        for (granularidad, periodo), (suma, cantidad) in sorted(_buckets(costos, signo).items())
+    ]
+    if filas:
+        _sumar(conn, filas)
+    return len(filas)
+
+
+@event.listens_for(CostoIndirecto, 'after_insert')
+def _acumular_insertado(mapper, connection, costo):
+    acumular(connection, [(costo.año, costo.mes, costo.monto, costo.fecha_registro)])
+
+
+def reconstruir_agregados(conn=None):
+    """Recalcula todos los buckets desde costos_indirectos. Devuelve la cantidad de buckets"""
+    def _reconstruir(conn):
+        conn.execute(delete(_tabla))
+        filas = conn.execute(select(_costos.c.año, _costos.c.mes, _costos.c.monto, _costos.c.fecha_registro))
+        return acumular(conn, filas)
+
+    if conn is not None:
+        return _reconstruir(conn)
+    with db.engine.begin() as conn:
+        return _reconstruir(conn)
+
+
+def sembrar_agregados():
+    """Reconstruye los agregados si están vacíos y hay costos (bases anteriores a la tabla)"""
+    with db.engine.begin() as conn:
+        if conn.execute(select(_tabla.c.periodo).limit(1)).first() is not None:
+            return False
+        if conn.execute(select(_costos.c.id).limit(1)).first() is None:
+            return False
+        reconstruir_agregados(conn)
+    return True
+
+
+def _ventana(granularidad, desde, hasta):
+    fila = db.session.execute(
+        select(func.coalesce(func.sum(_tabla.c.suma), 0.0), func.coalesce(func.sum(_tabla.c.cantidad), 0))
+        .where(_tabla.c.granularidad == granularidad, _tabla.c.periodo >= desde, _tabla.c.periodo <= hasta)
+    ).one()
+    suma, cantidad = float(fila[0]), int(fila[1])
+    return Ventana(suma, cantidad, suma / cantidad if cantidad else 0.0)
+
+
+def consultar_ventana(desde, hasta):
+    """Suma, cantidad y promedio de los meses contables entre `desde` y `hasta` (inclusive).
+
+    Acepta fechas o tuplas (año, mes); de una fecha solo se usa el mes.
+    """
+    desde = periodo_mes(*desde) if isinstance(desde, tuple) else periodo_mes(desde.year, desde.month)
+    hasta = periodo_mes(*hasta) if isinstance(hasta, tuple) else periodo_mes(hasta.year, hasta.month)
+    return _ventana(MES, desde, hasta)
+
+
+def ventana_movil(dias=VENTANA_PROMEDIO_DIAS, ahora=None):
+    """Costos registrados en los últimos `dias` días, por día de registro"""
+    ahora = ahora or datetime.utcnow()
+    return _ventana(DIA, (ahora - timedelta(days=dias)).date(), ahora.date())
+
+
+def costo_indirecto_promedio(dias=VENTANA_PROMEDIO_DIAS, ahora=None):
+    """Reemplazo de obtener_costo_indirecto_promedio(): una lectura de los agregados"""
+    return ventana_movil(dias, ahora).promedio
@@ -0,0 +1,233 @@
+"""
+Envío masivo de propuestas (POST /propuestas/enviar-lote).
+
+Al empezar el día el director liberaba decenas de propuestas PREGENERADA
+con un clic por propuesta: un render, sus commits y una notificación
+cada una. enviar_masivo() recibe una lista de ids (o un filtro) y:
+- renderiza y guarda los documentos en paralelo, en bloques de
+  ENVIO_MASIVO_BLOQUE propuestas repartidos en un pool de
+  ENVIO_MASIVO_WORKERS procesos (con 1, en este mismo proceso);
+- confirma cada ENVIO_MASIVO_LOTE propuestas en una unidad de trabajo: un
+  UPDATE ... RETURNING cambia el estado de todo el lote (solo las que
+  siguen PREGENERADA o REVISION), y documentos, notificaciones y auditoría
+  entran con un INSERT masivo cada uno;
+- entrega el avance como eventos (una línea JSON por propuesta) a medida
+  que cada lote queda confirmado, para mostrarlo en el navegador.
+Un lote que falla se deshace completo (sin dejar archivos nuevos) y el
+envío sigue con el siguiente.
+"""
+import os
+import atexit
+import time
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import url_for
+from sqlalchemy import insert, select, update
+
+from . import app, db
+from .almacen_documentos import guardar_documento
+from .cache_tokens import invalidar_propuestas
+from .estadisticas import invalidar_estadisticas
+from .models import Cliente, DocumentoGenerado, Notificacion, Propuesta
+from .renderizado import TAMANO_BLOQUE_IDS, render_many
+from .unidad_trabajo import unidad_de_trabajo
+
+ENVIABLES = ('PREGENERADA', 'REVISION')
+VIGENCIA = timedelta(hours=24)
+
+_propuestas = Propuesta.__table__
+_clientes = Cliente.__table__
+_documentos = DocumentoGenerado.__table__
+_notificaciones = Notificacion.__table__
+
+
+def seleccionar_enviables(estado=None, cliente_id=None, limite=None):
+    """Ids de las propuestas PREGENERADA/REVISION que cumplen el filtro, las más antiguas primero"""
+    consulta = select(_propuestas.c.id).where(_propuestas.c.estado.in_(ENVIABLES))
+    if estado:
+        consulta = consulta.where(_propuestas.c.estado == estado)
+    if cliente_id:
+        consulta = consulta.where(_propuestas.c.cliente_id == cliente_id)
+    consulta = consulta.order_by(_propuestas.c.fecha_creacion, _propuestas.c.id)
+    if limite:
+        consulta = consulta.limit(limite)
+    return db.session.execute(consulta).scalars().all()
+
+
+def _estados(ids):
+    """{id: (numero_propuesta, estado)} de los ids que existen"""
+    estados = {}
+    for inicio in range(0, len(ids), TAMANO_BLOQUE_IDS):
+        filas = db.session.execute(
+            select(_propuestas.c.id, _propuestas.c.numero_propuesta, _propuestas.c.estado)
+            .where(_propuestas.c.id.in_(ids[inicio:inicio + TAMANO_BLOQUE_IDS]))
+        )
+        estados.update((fila.id, (fila.numero_propuesta, fila.estado)) for fila in filas)
+    return estados
+
+
+def guardar_bloque(ids):
+    """Renderiza y guarda los documentos de un bloque. Se ejecuta dentro de los procesos del pool
+
+    Devuelve {propuesta_id: (hash, ruta, archivos_creados)} o {propuesta_id: 'error'}.
+    """
+    resultados = {}
+    with app.app_context():
+        try:
+            documentos = render_many(ids)
+        finally:
+            db.session.remove()
+    for propuesta_id in ids:
+        if propuesta_id not in documentos:
+            resultados[propuesta_id] = 'Propuesta no encontrada'
+            continue
+        creados = []
+        try:
+            hash_documento, ruta = guardar_documento(documentos[propuesta_id], creados=creados)
+        except Exception as e:
+            resultados[propuesta_id] = f'{type(e).__name__}: {e}'
+            continue
+        resultados[propuesta_id] = (hash_documento, ruta, creados)
+    return resultados
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool(workers):
+    """Pool de procesos del proceso actual; se crea de nuevo tras un fork"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: los hijos no heredan hilos ni conexiones abiertas del servidor
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+            atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def _documentos_por_bloque(ids):
+    """Resultados de guardar_bloque por bloque, en el orden de `ids`"""
+    tamano = app.config['ENVIO_MASIVO_BLOQUE']
+    bloques = [ids[i:i + tamano] for i in range(0, len(ids), tamano)]
+    workers = app.config['ENVIO_MASIVO_WORKERS']
+    if workers <= 1 or len(bloques) == 1:
+        return map(guardar_bloque, bloques)
+    return _obtener_pool(workers).map(guardar_bloque, bloques)
+
+
+def _confirmar_lote(documentos, ahora):
+    """Estado, documentos, notificaciones y auditoría de un lote en un commit. Devuelve {id: documento_id}"""
+    listos = [pid for pid, resultado in documentos.items() if isinstance(resultado, tuple)]
+    with unidad_de_trabajo() as unidad:
+        for pid in listos:
+            unidad.archivos.extend(documentos[pid][2])
+        if not listos:
+            return {}
+        # El UPDATE va primero: en SQLite la transacción arranca escribiendo. Las que
+        # otro envío o la respuesta de un cliente cambiaron mientras tanto no vuelven
+        enviadas = set(db.session.execute(
+            update(_propuestas)
+            .where(_propuestas.c.id.in_(listos), _propuestas.c.estado.in_(ENVIABLES))
+            .values(estado='ENVIADA', fecha_envio=ahora, fecha_expiracion=ahora + VIGENCIA)
+            .returning(_propuestas.c.id)
+        ).scalars())
+        if not enviadas:
+            # Sus documentos quedan sin referencia: los retira recolectar_huerfanos()
+            return {}
+        filas = db.session.execute(
+            select(_propuestas.c.id, _propuestas.c.numero_propuesta, _propuestas.c.version,
+                   _propuestas.c.token_acceso, _clientes.c.email)
+            .join(_clientes, _clientes.c.id == _propuestas.c.cliente_id)
+            .where(_propuestas.c.id.in_(enviadas))
+        ).all()
+        documento_ids = {fila.id: str(uuid.uuid4()) for fila in filas}
+        db.session.execute(insert(_documentos), [
+            {
+                'id': documento_ids[fila.id],
+                'propuesta_id': fila.id,
+                'tipo': 'PROPUESTA',
+                'version': fila.version,
+                'archivo_path': documentos[fila.id][1],
+                'hash_documento': documentos[fila.id][0],
+                'fecha_generacion': ahora,
+            }
+            for fila in filas
+        ])
+        db.session.execute(insert(_notificaciones), [
+            {
+                'propuesta_id': fila.id,
+                'tipo': 'ENVIO',
+                'destinatario': fila.email,
+                'asunto': f'Propuesta de Transporte: {fila.numero_propuesta}',
+                'mensaje': f'Su propuesta {fila.numero_propuesta} está disponible. Válida por 24 horas.',
+                'enviada': False,
+                'fecha_creacion': ahora,
+            }
+            for fila in filas
+        ])
+        for fila in filas:
+            enlace = url_for('portal_cliente', token=fila.token_acceso, _external=True)
+            unidad.auditar('ENVIO_PROPUESTA', fila.id, f'Envío masivo. Enlace: {enlace}')
+        unidad.al_confirmar(invalidar_estadisticas)
+        unidad.al_confirmar(invalidar_propuestas, *enviadas)
+    return documento_ids
+
+
+def enviar_masivo(ids):
+    """Envía las propuestas `ids`. Genera eventos de avance (dicts) para transmitir al navegador"""
+    inicio = time.perf_counter()
+    pedidos = list(dict.fromkeys(ids))
+    estados = _estados(pedidos)
+    numeros = {pid: numero for pid, (numero, _) in estados.items()}
+    enviables = {pid for pid, (_, estado) in estados.items() if estado in ENVIABLES}
+    # La lectura no debe retener la transacción mientras se renderiza
+    db.session.commit()
+    totales = {'enviadas': 0, 'omitidas': 0, 'errores': 0}
+    yield {'evento': 'inicio', 'total': len(pedidos), 'enviables': len(enviables)}
+
+    for propuesta_id in pedidos:
+        if propuesta_id not in enviables:
+            totales['omitidas'] += 1
+            yield {'evento': 'propuesta', 'id': propuesta_id, 'numero_propuesta': numeros.get(propuesta_id),
+                   'resultado': 'OMITIDA', 'error': 'No existe o ya fue enviada'}
+
+    orden = [pid for pid in pedidos if pid in enviables]
+    tamano_lote = app.config['ENVIO_MASIVO_LOTE']
+    pendientes = {}
+
+    def confirmar():
+        try:
+            documento_ids = _confirmar_lote(pendientes, datetime.utcnow())
+            error_lote = None
+        except Exception as e:
+            app.logger.warning('Envío masivo: lote de %s propuestas deshecho: %s', len(pendientes), e)
+            documento_ids, error_lote = {}, f'{type(e).__name__}: {e}'
+        for pid, resultado in pendientes.items():
+            evento = {'evento': 'propuesta', 'id': pid, 'numero_propuesta': numeros.get(pid)}
+            if pid in documento_ids:
+                totales['enviadas'] += 1
+                evento.update(resultado='ENVIADA', documento_id=documento_ids[pid])
+            elif not isinstance(resultado, tuple) or error_lote:
+                totales['errores'] += 1
+                evento.update(resultado='ERROR', error=error_lote or resultado)
+            else:
+                totales['omitidas'] += 1
+                evento.update(resultado='OMITIDA', error='Cambió de estado durante el envío')
+            yield evento
+        pendientes.clear()
+
+    for resultados in _documentos_por_bloque(orden):
+        pendientes.update(resultados)
+        if len(pendientes) >= tamano_lote:
+            yield from confirmar()
+    if pendientes:
+        yield from confirmar()
+
+    yield {'evento': 'fin', **totales, 'segundos': round(time.perf_counter() - inicio, 3)}
@@ -0,0 +1,89 @@
+"""
+Servicio de estadísticas del dashboard con caché en proceso (TTL corto)
+"""
+import threading
+import time
+
+from sqlalchemy import func
+
+from . import app, db
+from .models import CambioEstado, Propuesta, DocumentoGenerado
+
+# Estados que se informan siempre, aunque no tengan propuestas
+ESTADOS = {
+    'PREGENERADA': 'pregeneradas',
+    'ENVIADA': 'enviadas',
+    'ACEPTADA': 'aceptadas',
+    'RECHAZADA': 'rechazadas',
+    'REVISION': 'revision',
+}
+
+_lock = threading.Lock()
+_cache = {'valor': None, 'expira': 0.0, 'generacion': 0}
+
+
+def calcular_estadisticas():
+    """Calcula todos los conteos por estado con un único GROUP BY"""
+    stats = {clave: 0 for clave in ESTADOS.values()}
+    # Último cambio en vivo (app/eventos.py) que ya reflejan los conteos
+    stats['ultimo_cambio'] = db.session.query(func.coalesce(func.max(CambioEstado.id), 0)).scalar()
+    total = 0
+    filas = db.session.query(Propuesta.estado, func.count(Propuesta.id)).group_by(Propuesta.estado).all()
+    for estado, cantidad in filas:
+        total += cantidad
+        clave = ESTADOS.get(estado)
+        if clave:
+            stats[clave] = cantidad
+    stats['total'] = total
+
+    # Contratos firmados
+    stats['contratos_firmados'] = db.session.query(func.count(DocumentoGenerado.id)).filter(
+        DocumentoGenerado.tipo == 'CONTRATO',
+        DocumentoGenerado.firmado.is_(True),
+    ).scalar()
+    return stats
+
+
+def obtener_estadisticas():
+    """Devuelve las estadísticas cacheadas; recalcula al vencer el TTL"""
+    ahora = time.monotonic()
+    with _lock:
+        if _cache['valor'] is not None and ahora < _cache['expira']:
+            return dict(_cache['valor'])
+        generacion = _cache['generacion']
+
+    stats = calcular_estadisticas()
+    with _lock:
+        # No guardar un valor calculado antes de una invalidación concurrente
+        if generacion == _cache['generacion']:
+            _cache['valor'] = stats
+            _cache['expira'] = time.monotonic() + app.config['ESTADISTICAS_TTL']
+    return dict(stats)
+
+
+def aplicar_cambio(cambio_id, anterior, estado, firma=False):
+    """Ajusta los conteos cacheados por un cambio de estado sin volver a contar"""
+    with _lock:
+        # Un cálculo en curso pudo leer antes del cambio: que no se guarde
+        _cache['generacion'] += 1
+        stats = _cache['valor']
+        if stats is None or cambio_id <= stats['ultimo_cambio']:
+            # Sin valor cacheado, o el conteo ya incluye el cambio
+            return
+        stats['ultimo_cambio'] = cambio_id
+        if firma:
+            stats['contratos_firmados'] += 1
+        if anterior == estado:
+            return
+        if ESTADOS.get(anterior) in stats:
+            stats[ESTADOS[anterior]] -= 1
+        if ESTADOS.get(estado) in stats:
+            stats[ESTADOS[estado]] += 1
+
+
+def invalidar_estadisticas():
+    """Descarta el valor cacheado; llamar tras cambiar Propuesta.estado"""
+    with _lock:
+        _cache['valor'] = None
+        _cache['expira'] = 0.0
+        _cache['generacion'] += 1
@@ -0,0 +1,275 @@
+"""
+Eventos en vivo de las propuestas (Server-Sent Events, GET /eventos).
+
+El dashboard y el detalle de una propuesta solo se enteraban de la
+respuesta del cliente (ACEPTADA, RECHAZADA, REVISION) o de la firma del
+contrato al recargar, y el director recargaba index() una y otra vez.
+Ahora:
+- respuesta_cliente y firmar_contrato llaman registrar_cambio(), que
+  agrega una fila a cambios_estado en la misma transacción;
+- al confirmar, el cambio se publica a los navegadores conectados a este
+  proceso. Cada uno tiene una cola acotada (EVENTOS_COLA_MAX): si no da
+  abasto se descartan sus pendientes y recibe `resincronizar` para releer
+  los conteos, sin frenar a los demás ni crecer en memoria;
+- con varios workers (EVENTOS_DIFUSION=tabla) no se publica al confirmar:
+  un hilo por proceso (Seguidor) lee cambios_estado por id y publica lo
+  que confirmó cualquier proceso;
+- cada cambio publicado ajusta los conteos cacheados del dashboard
+  (estadisticas.aplicar_cambio) en vez de invalidarlos.
+El id de la fila es el id del evento: al reconectar, el navegador manda
+Last-Event-ID y recibe los cambios que se perdió.
+"""
+import os
+import json
+import queue
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+
+from . import app, db
+from .base_datos import SesionEnrutada
+from .estadisticas import aplicar_cambio
+from .models import CambioEstado
+
+RESINCRONIZAR = {'evento': 'resincronizar'}
+# Milisegundos que espera el navegador antes de reconectar
+RECONEXION_MS = 3000
+TAMANO_LOTE = 500
+
+_cambios = CambioEstado.__table__
+
+
+def _como_evento(cambio):
+    return {
+        'evento': 'firma' if cambio.tipo == 'FIRMA' else 'estado',
+        'id': cambio.id,
+        'propuesta_id': cambio.propuesta_id,
+        'numero_propuesta': cambio.numero_propuesta,
+        'anterior': cambio.estado_anterior,
+        'estado': cambio.estado,
+        'fecha': cambio.fecha.isoformat(),
+    }
+
+
+def registrar_cambio(propuesta, anterior, tipo='ESTADO'):
+    """Agrega el cambio a la transacción de db.session; se publica al confirmar"""
+    cambio = CambioEstado(
+        tipo=tipo,
+        propuesta_id=propuesta.id,
+        numero_propuesta=propuesta.numero_propuesta,
+        estado_anterior=anterior,
+        estado=propuesta.estado,
+        fecha=datetime.utcnow(),
+    )
+    db.session.add(cambio)
+    db.session.info.setdefault('cambios', []).append(cambio)
+    return cambio
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _capturar_cambios(sesion, contexto):
+    # El id existe desde el flush; tras el commit los atributos expiran
+    cambios = sesion.info.pop('cambios', None)
+    if cambios:
+        sesion.info.setdefault('cambios_confirmar', []).extend(_como_evento(c) for c in cambios)
+
+
+@event.listens_for(SesionEnrutada, 'after_commit')
+def _publicar_confirmados(sesion):
+    eventos = sesion.info.pop('cambios_confirmar', None)
+    if eventos and app.config['EVENTOS_DIFUSION'] == 'proceso':
+        publicar(eventos)
+
+
+@event.listens_for(SesionEnrutada, 'after_rollback')
+def _descartar_cambios(sesion):
+    sesion.info.pop('cambios', None)
+    sesion.info.pop('cambios_confirmar', None)
+
+
+def ultimo_cambio():
+    """Id del último cambio confirmado (0 si no hay): punto de partida de una página recién renderizada"""
+    return db.session.execute(select(func.coalesce(func.max(_cambios.c.id), 0))).scalar()
+
+
+class Suscripcion:
+    """Cola acotada de eventos de un navegador conectado"""
+
+    def __init__(self, maximo, propuesta_id=None):
+        self.propuesta_id = propuesta_id
+        self._cola = queue.Queue(maxsize=maximo)
+        self._desbordada = False
+
+    def entregar(self, evento):
+        if self.propuesta_id and evento['propuesta_id'] != self.propuesta_id:
+            return
+        try:
+            self._cola.put_nowait(evento)
+        except queue.Full:
+            # El navegador no lee al ritmo de los cambios: no se le acumula más
+            self._desbordada = True
+
+    def siguiente(self, espera):
+        """Próximo evento, RESINCRONIZAR si se perdieron eventos, o None tras `espera` segundos"""
+        if self._desbordada:
+            self._desbordada = False
+            while True:
+                try:
+                    self._cola.get_nowait()
+                except queue.Empty:
+                    break
+            return RESINCRONIZAR
+        try:
+            return self._cola.get(timeout=espera)
+        except queue.Empty:
+            return None
+
+
+_lock = threading.Lock()
+_suscripciones = set()
+
+
+def suscribir(propuesta_id=None):
+    """Registra un navegador; None si el proceso ya tiene EVENTOS_MAX_CONEXIONES"""
+    with _lock:
+        if len(_suscripciones) >= app.config['EVENTOS_MAX_CONEXIONES']:
+            return None
+        suscripcion = Suscripcion(app.config['EVENTOS_COLA_MAX'], propuesta_id)
+        _suscripciones.add(suscripcion)
+    iniciar_seguidor()
+    return suscripcion
+
+
+def cancelar(suscripcion):
+    with _lock:
+        _suscripciones.discard(suscripcion)
+
+
+def conexiones():
+    """Navegadores conectados a este proceso"""
+    with _lock:
+        return len(_suscripciones)
+
+
+def publicar(eventos):
+    """Ajusta los conteos del dashboard y entrega los eventos a los navegadores de este proceso"""
+    for evento in eventos:
+        aplicar_cambio(evento['id'], evento['anterior'], evento['estado'], firma=evento['evento'] == 'firma')
+    with _lock:
+        suscripciones = list(_suscripciones)
+    for suscripcion in suscripciones:
+        for evento in eventos:
+            suscripcion.entregar(evento)
+
+
+class Seguidor:
+    """Hilo que publica en este proceso los cambios que confirma cualquier worker (EVENTOS_DIFUSION=tabla)"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pid = os.getpid()
+        self.ultimo = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name='seguidor-eventos', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def revisar(self):
+        """Publica las filas nuevas de cambios_estado. Devuelve cuántas publicó"""
+        with db.engine.connect() as conn:
+            if self.ultimo is None:
+                # Lo anterior al arranque lo recuperan los navegadores con Last-Event-ID
+                self.ultimo = conn.execute(select(func.coalesce(func.max(_cambios.c.id), 0))).scalar()
+                return 0
+            filas = conn.execute(
+                select(_cambios).where(_cambios.c.id > self.ultimo).order_by(_cambios.c.id).limit(TAMANO_LOTE)
+            ).all()
+        if filas:
+            self.ultimo = filas[-1].id
+            publicar([_como_evento(fila) for fila in filas])
+        return len(filas)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                with app.app_context():
+                    while self.revisar() == TAMANO_LOTE:
+                        pass
+            except Exception as e:
+                app.logger.warning('Seguidor de eventos: %s', e)
+            self._detener.wait(self.intervalo)
+
+
+_seguidor = None
+_seguidor_lock = threading.Lock()
+
+
+def iniciar_seguidor():
+    """Seguidor del proceso actual si EVENTOS_DIFUSION=tabla; se crea de nuevo tras un fork"""
+    global _seguidor
+    if app.config['EVENTOS_DIFUSION'] != 'tabla':
+        return None
+    with _seguidor_lock:
+        if _seguidor is None or _seguidor.pid != os.getpid():
+            _seguidor = Seguidor(app.config['EVENTOS_INTERVALO']).iniciar()
+            atexit.register(_seguidor.detener)
+    return _seguidor
+
+
+def _formatear(evento):
+    """Un evento en formato text/event-stream"""
+    lineas = [f"id: {evento['id']}"] if 'id' in evento else []
+    lineas.append(f"event: {evento['evento']}")
+    lineas.append('data: ' + json.dumps(evento, ensure_ascii=False))
+    return '\n'.join(lineas) + '\n\n'
+
+
+def transmitir(suscripcion, desde=None):
+    """Genera el text/event-stream de una suscripción ya registrada y la cancela al terminar.
+
+    Con `desde` repite primero los cambios posteriores a ese id (Last-Event-ID).
+    """
+    try:
+        yield f'retry: {RECONEXION_MS}\n\n'
+        enviado = desde or 0
+        if desde is not None:
+            limite = app.config['EVENTOS_REPETIR_MAX']
+            consulta = select(_cambios).where(_cambios.c.id > desde)
+            if suscripcion.propuesta_id:
+                consulta = consulta.where(_cambios.c.propuesta_id == suscripcion.propuesta_id)
+            filas = db.session.execute(consulta.order_by(_cambios.c.id).limit(limite + 1)).all()
+            if len(filas) > limite:
+                # Demasiado atrasado: más barato releer los conteos que repetir todo
+                filas = []
+                yield _formatear(RESINCRONIZAR)
+            for fila in filas:
+                enviado = fila.id
+                yield _formatear(_como_evento(fila))
+        # La conexión a la base no queda tomada mientras el navegador escucha
+        db.session.remove()
+
+        fin = time.monotonic() + app.config['EVENTOS_DURACION_MAX']
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                # El navegador reconecta con Last-Event-ID y libera este hilo
+                break
+            evento = suscripcion.siguiente(min(app.config['EVENTOS_LATIDO'], restante))
+            if evento is None:
+                # Comentario SSE: mantiene abiertos los proxies y detecta navegadores que se fueron
+                yield ': latido\n\n'
+            elif evento is RESINCRONIZAR or evento['id'] > enviado:
+                yield _formatear(evento)
+    finally:
+        cancelar(suscripcion)
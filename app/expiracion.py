@@ -0,0 +1,137 @@
+"""
+Barrido de propuestas vencidas.
+
+Antes una propuesta expiraba solo cuando el cliente abría el portal, y el
+GET anónimo escribía en la base. Ahora expirar_vencidas() recorre el
+índice (estado, fecha_expiracion) y por lote, en una transacción:
+- devuelve a PREGENERADA las ENVIADA cuya fecha_expiracion pasó (UPDATE
+  condicional con RETURNING: una respuesta concurrente del cliente gana);
+- inserta de una vez las notificaciones EXPIRACION de esas propuestas.
+
+Se ejecuta en un hilo del servidor (Barredor, EXPIRACION_BARREDOR=proceso)
+o con `python expirar_propuestas.py`, sin cron.
+"""
+import os
+import atexit
+import threading
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from . import app, db
+from .cache_tokens import invalidar_propuestas
+from .estadisticas import invalidar_estadisticas
+from .models import Cliente, Notificacion, Propuesta
+
+TAMANO_LOTE = 500
+
+_propuestas = Propuesta.__table__
+_clientes = Cliente.__table__
+_notificaciones = Notificacion.__table__
+
+
+def _vencidas(ahora, limite):
+    return (
+        select(_propuestas.c.id)
+        .where(_propuestas.c.estado == 'ENVIADA', _propuestas.c.fecha_expiracion < ahora)
+        .order_by(_propuestas.c.fecha_expiracion)
+        .limit(limite)
+    )
+
+
+def _expirar_lote(conn, ahora, limite):
+    # El UPDATE va primero: en SQLite la transacción arranca escribiendo
+    ids = conn.execute(
+        update(_propuestas)
+        .where(_propuestas.c.id.in_(_vencidas(ahora, limite)), _propuestas.c.estado == 'ENVIADA')
+        .values(estado='PREGENERADA')
+        .returning(_propuestas.c.id)
+    ).scalars().all()
+    if not ids:
+        return ids
+    filas = conn.execute(
+        select(_propuestas.c.id, _propuestas.c.numero_propuesta, _clientes.c.email)
+        .join(_clientes, _clientes.c.id == _propuestas.c.cliente_id)
+        .where(_propuestas.c.id.in_(ids))
+    )
+    conn.execute(_notificaciones.insert(), [
+        {
+            'propuesta_id': fila.id,
+            'tipo': 'EXPIRACION',
+            'destinatario': fila.email,
+            'asunto': f'Propuesta expirada: {fila.numero_propuesta}',
+            'mensaje': f'Su propuesta {fila.numero_propuesta} expiró sin respuesta. Contáctenos para una nueva cotización.',
+            'enviada': False,
+            'fecha_creacion': ahora,
+        }
+        for fila in filas
+    ])
+    return ids
+
+
+def expirar_vencidas(ahora=None, tamano_lote=TAMANO_LOTE):
+    """Expira todas las propuestas ENVIADA vencidas, en lotes. Devuelve cuántas expiró"""
+    ahora = ahora or datetime.utcnow()
+    total = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = _expirar_lote(conn, ahora, tamano_lote)
+        invalidar_propuestas(*ids)
+        total += len(ids)
+        if len(ids) < tamano_lote:
+            break
+    if total:
+        invalidar_estadisticas()
+    return total
+
+
+class Barredor:
+    """Hilo que ejecuta expirar_vencidas() cada `intervalo` segundos"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pid = os.getpid()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name='barredor-expiracion', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                with app.app_context():
+                    expiradas = expirar_vencidas()
+                if expiradas:
+                    app.logger.info('Barredor de expiración: %d propuestas expiradas', expiradas)
+            except Exception as e:
+                app.logger.warning('Barredor de expiración: %s', e)
+            self._detener.wait(self.intervalo)
+
+
+_barredor = None
+_barredor_lock = threading.Lock()
+
+
+def iniciar_barredor():
+    """Barredor del proceso actual si EXPIRACION_BARREDOR=proceso; se crea de nuevo tras un fork"""
+    global _barredor
+    if app.config['EXPIRACION_BARREDOR'] != 'proceso':
+        return None
+    with _barredor_lock:
+        if _barredor is None or _barredor.pid != os.getpid():
+            _barredor = Barredor(app.config['EXPIRACION_INTERVALO']).iniciar()
+            atexit.register(_barredor.detener)
+    return _barredor
+
+
+def propuesta_vencida(propuesta, ahora=None):
+    """True si la fecha de expiración pasó (aunque el barrido aún no la procese)"""
+    return bool(propuesta.fecha_expiracion and (ahora or datetime.utcnow()) > propuesta.fecha_expiracion)
@@ -0,0 +1,255 @@
+"""
+Importación masiva de costos indirectos desde CSV o JSON Lines.
+
+El archivo se lee por streaming y se procesa en lotes de TAMANO_LOTE filas:
+- mes/año/monto se convierten y validan por lote con numpy;
+- cada lote es una transacción: INSERT de las filas nuevas, UPDATE de las
+  que traen un `id` ya existente (upsert) y los agregados de
+  costos_indirectos.py ajustados en la misma transacción;
+- las filas rechazadas se informan a `al_rechazar(linea, fila, motivo)`
+  sin acumularlas, de modo que la memoria no depende del tamaño del archivo.
+
+Columnas: mes, año (o anio), monto, y opcionales descripcion, usuario e id.
+"""
+import csv
+import io
+import os
+import json
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+
+from . import db
+from .costos_indirectos import acumular
+from .models import CostoIndirecto
+
+TAMANO_LOTE = 5000
+# Ids por consulta: bajo el límite de variables de SQLite
+TAMANO_BLOQUE_IDS = 500
+AÑO_MINIMO = 1990
+AÑO_MAXIMO = 2100
+
+FORMATOS = ('csv', 'jsonl')
+ALIAS_COLUMNAS = {'anio': 'año', 'ano': 'año', 'year': 'año', 'month': 'mes', 'amount': 'monto'}
+
+_tabla = CostoIndirecto.__table__
+
+
+def detectar_formato(nombre):
+    """csv o jsonl según la extensión del archivo"""
+    nombre = (nombre or '').lower()
+    if nombre.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if nombre.endswith(('.csv', '.txt')):
+        return 'csv'
+    raise ValueError(f"No se reconoce el formato de '{nombre}'; use .csv o .jsonl")
+
+
+def _columna(nombre):
+    nombre = nombre.strip().lower()
+    return ALIAS_COLUMNAS.get(nombre, nombre)
+
+
+def _normalizar(fila):
+    return {_columna(clave): valor for clave, valor in fila.items() if clave}
+
+
+def leer_csv(texto):
+    """(línea, fila) de un CSV con encabezado; separador , ; o tabulador"""
+    encabezado = texto.readline()
+    if not encabezado:
+        return
+    try:
+        dialecto = csv.Sniffer().sniff(encabezado, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    columnas = [_columna(nombre) for nombre in next(csv.reader([encabezado], dialecto))]
+    lector = csv.reader(texto, dialecto)
+    for valores in lector:
+        if valores:
+            yield lector.line_num + 1, dict(zip(columnas, valores))
+
+
+def leer_jsonl(texto):
+    """(línea, fila) de JSON Lines; una línea inválida se entrega como None"""
+    for linea, contenido in enumerate(texto, start=1):
+        if not contenido.strip():
+            continue
+        try:
+            fila = json.loads(contenido)
+        except ValueError:
+            fila = None
+        yield linea, _normalizar(fila) if isinstance(fila, dict) else None
+
+
+def leer_filas(archivo, formato):
+    """Itera (línea, fila) desde un archivo binario o de texto sin cargarlo completo"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    if isinstance(archivo, io.TextIOBase):
+        texto = archivo
+    else:
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    return leer_csv(texto) if formato == 'csv' else leer_jsonl(texto)
+
+
+def _numeros(valores):
+    """float64 por lote; solo si hay valores no numéricos se convierte uno a uno"""
+    arreglo = np.asarray(valores, dtype=object)
+    try:
+        return arreglo.astype(np.float64)
+    except (TypeError, ValueError):
+        return np.array([_numero(valor) for valor in valores], dtype=np.float64)
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _entero_en_rango(valores, minimo, maximo):
+    with np.errstate(invalid='ignore'):
+        return np.isfinite(valores) & (valores == np.floor(valores)) & (valores >= minimo) & (valores <= maximo)
+
+
+def validar_lote(filas):
+    """Valida un lote de filas (dict o None). Devuelve (mes, año, monto, motivos); motivo None = válida"""
+    vacia = {}
+    mes = _numeros([(fila or vacia).get('mes') for fila in filas])
+    año = _numeros([(fila or vacia).get('año') for fila in filas])
+    monto = _numeros([(fila or vacia).get('monto') for fila in filas])
+
+    with np.errstate(invalid='ignore'):
+        monto_valido = np.isfinite(monto) & (monto >= 0)
+    # El primer motivo que aplica, en orden de prioridad
+    motivos = np.select(
+        [
+            np.array([fila is None for fila in filas], dtype=bool),
+            ~_entero_en_rango(mes, 1, 12),
+            ~_entero_en_rango(año, AÑO_MINIMO, AÑO_MAXIMO),
+            ~monto_valido,
+        ],
+        ['fila ilegible', 'mes inválido', 'año inválido', 'monto inválido'],
+        default='',
+    )
+    return mes, año, monto, [motivo or None for motivo in motivos.tolist()]
+
+
+def nuevo_id():
+    """UUID con el milisegundo al inicio (distribución de UUIDv7).
+
+    Las filas de una carga quedan casi en orden en el índice de la clave
+    primaria; con uuid4 cada INSERT cae en una página distinta del B-tree.
+    """
+    valor = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    valor = valor & ~(0xF << 76) | 0x7 << 76  # versión 7
+    valor = valor & ~(0x3 << 62) | 0x2 << 62  # variante RFC 4122
+    return str(uuid.UUID(int=valor))
+
+
+def _existentes(conn, ids):
+    """{id: (año, mes, monto, fecha_registro)} de los ids que ya están en la base"""
+    existentes = {}
+    for inicio in range(0, len(ids), TAMANO_BLOQUE_IDS):
+        bloque = ids[inicio:inicio + TAMANO_BLOQUE_IDS]
+        filas = conn.execute(
+            select(_tabla.c.id, _tabla.c.año, _tabla.c.mes, _tabla.c.monto, _tabla.c.fecha_registro)
+            .where(_tabla.c.id.in_(bloque))
+        )
+        for fila in filas:
+            existentes[fila.id] = (fila.año, fila.mes, fila.monto, fila.fecha_registro)
+    return existentes
+
+
+def _guardar_lote(conn, registros):
+    """INSERT/UPDATE de un lote validado y ajuste de los agregados. Devuelve (insertadas, actualizadas)"""
+    con_id = [registro['id'] for registro in registros if registro['id']]
+    existentes = _existentes(conn, con_id) if con_id else {}
+    nuevas, cambios = [], []
+    for registro in registros:
+        if registro['id'] in existentes:
+            registro['fecha_registro'] = existentes[registro['id']][3]
+            cambios.append(registro)
+        else:
+            registro['id'] = registro['id'] or nuevo_id()
+            nuevas.append(registro)
+
+    if nuevas:
+        conn.execute(_tabla.insert(), nuevas)
+    if cambios:
+        conn.execute(
+            update(_tabla).where(_tabla.c.id == bindparam('b_id')).values(
+                mes=bindparam('mes'), año=bindparam('año'), monto=bindparam('monto'),
+                descripcion=bindparam('descripcion'), usuario=bindparam('usuario'),
+            ),
+            [dict(registro, b_id=registro['id']) for registro in cambios],
+        )
+        # Quitar lo que aportaban las versiones anteriores antes de sumar las nuevas
+        acumular(conn, [existentes[registro['id']] for registro in cambios], signo=-1)
+    acumular(conn, [(r['año'], r['mes'], r['monto'], r['fecha_registro']) for r in nuevas + cambios])
+    return len(nuevas), len(cambios)
+
+
+def importar_costos(filas, usuario='Importación', tamano_lote=None, al_rechazar=None, al_avanzar=None):
+    """Importa (línea, fila) en transacciones de `tamano_lote` filas.
+
+    `al_rechazar(linea, fila, motivo)` recibe cada fila descartada y
+    `al_avanzar(resumen)` se llama después de cada lote confirmado.
+    Devuelve {'leidas', 'insertadas', 'actualizadas', 'rechazadas'}.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    resumen = {'leidas': 0, 'insertadas': 0, 'actualizadas': 0, 'rechazadas': 0}
+    lote = []
+    for linea_fila in filas:
+        lote.append(linea_fila)
+        if len(lote) >= tamano_lote:
+            _procesar_lote(lote, usuario, resumen, al_rechazar)
+            lote = []
+            if al_avanzar:
+                al_avanzar(resumen)
+    if lote:
+        _procesar_lote(lote, usuario, resumen, al_rechazar)
+        if al_avanzar:
+            al_avanzar(resumen)
+    return resumen
+
+
+def _procesar_lote(lote, usuario, resumen, al_rechazar):
+    filas = [fila for _, fila in lote]
+    mes, año, monto, motivos = validar_lote(filas)
+    ahora = datetime.utcnow()
+    registros, vistos = [], set()
+    for i, (linea, fila) in enumerate(lote):
+        motivo = motivos[i]
+        identificador = str(fila.get('id') or '').strip() if fila else ''
+        if motivo is None and identificador:
+            if identificador in vistos:
+                motivo = 'id repetido en el lote'
+            vistos.add(identificador)
+        if motivo is not None:
+            resumen['rechazadas'] += 1
+            if al_rechazar:
+                al_rechazar(linea, fila, motivo)
+            continue
+        registros.append({
+            'id': identificador or None,
+            'mes': int(mes[i]),
+            'año': int(año[i]),
+            'monto': float(monto[i]),
+            'descripcion': fila.get('descripcion') or '',
+            'usuario': fila.get('usuario') or usuario,
+            'fecha_registro': ahora,
+        })
+
+    resumen['leidas'] += len(lote)
+    if not registros:
+        return
+    with db.engine.begin() as conn:
+        insertadas, actualizadas = _guardar_lote(conn, registros)
+    resumen['insertadas'] += insertadas
+    resumen['actualizadas'] += actualizadas
@@ -0,0 +1,72 @@
+"""
+Migración incremental del esquema sobre una base de datos existente.
+
+db.create_all() solo crea las tablas que faltan; no agrega columnas ni
+índices a tablas ya creadas. migrar_esquema() compara los modelos con la
+base real y aplica únicamente operaciones no destructivas (CREATE TABLE,
+ALTER TABLE ADD COLUMN, CREATE INDEX), por lo que puede ejecutarse sobre
+database/mgcp.db sin perder datos y es idempotente.
+"""
+from sqlalchemy import inspect, literal, text
+
+from . import db
+
+
+def _default_literal(columna, dialect):
+    """SQL del DEFAULT para rellenar filas existentes, si el modelo lo permite"""
+    if columna.server_default is not None:
+        return str(columna.server_default.arg)
+    default = columna.default
+    if default is None or not default.is_scalar:
+        return None
+    return str(literal(default.arg).compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _agregar_columna(conn, tabla, columna):
+    preparer = conn.dialect.identifier_preparer
+    tipo = columna.type.compile(dialect=conn.dialect)
+    sql = f'ALTER TABLE {preparer.format_table(tabla)} ADD COLUMN {preparer.quote(columna.name)} {tipo}'
+    default = _default_literal(columna, conn.dialect)
+    if default is not None:
+        sql += f' DEFAULT {default}'
+        if not columna.nullable:
+            sql += ' NOT NULL'
+    conn.execute(text(sql))
+
+
+def migrar_esquema(engine=None):
+    """Lleva el esquema de la base al de los modelos. Devuelve la lista de cambios aplicados"""
+    engine = engine or db.engine
+    cambios = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existentes = set(inspector.get_table_names())
+
+        for tabla in db.metadata.sorted_tables:
+            if tabla.name not in existentes:
+                tabla.create(conn)  # crea también sus índices
+                cambios.append(f'tabla {tabla.name} creada')
+                continue
+
+            columnas = {c['name'] for c in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name not in columnas:
+                    _agregar_columna(conn, tabla, columna)
+                    cambios.append(f'columna {tabla.name}.{columna.name} agregada')
+
+            indices = {ix['name']: ix['column_names'] for ix in inspector.get_indexes(tabla.name)}
+            for indice in sorted(tabla.indexes, key=lambda ix: ix.name):
+                esperadas = [c.name for c in indice.columns]
+                actuales = indices.get(indice.name)
+                if actuales == esperadas:
+                    continue
+                if actuales is not None:
+                    # Mismo nombre con otras columnas: reconstruir
+                    indice.drop(conn)
+                indice.create(conn)
+                cambios.append(f'índice {indice.name} ({", ".join(esperadas)}) creado')
+
+        if cambios and conn.dialect.name == 'sqlite':
+            # Estadísticas para que el planificador elija los índices nuevos
+            conn.execute(text('ANALYZE'))
+    return cambios
@@ -41,9 +41,32 @@ class CostoIndirecto(db.Model):
         return f'<CostoIndirecto {self.mes}/{self.año}: ${self.monto}>'
 
 
+class AgregadoCostoIndirecto(db.Model):
+    """Sumas y conteos materializados de costos_indirectos por período"""
+    __tablename__ = 'agregados_costos_indirectos'
+    
+    # MES: período contable (año, mes) del costo; DIA: fecha de registro
+    granularidad = db.Column(db.String(3), primary_key=True)
+    periodo = db.Column(db.Date, primary_key=True)  # primer día del mes para MES
+    suma = db.Column(db.Float, nullable=False, default=0.0)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AgregadoCostoIndirecto {self.granularidad} {self.periodo}: {self.cantidad}>'
+
+
 class Propuesta(db.Model):
     """Modelo para gestionar propuestas económicas pregeneradas"""
     __tablename__ = 'propuestas'
+    __table_args__ = (
+        # Listado filtrado por estado / cliente y paginado por (fecha_creacion, id)
+        db.Index('ix_propuestas_estado_fecha_creacion', 'estado', 'fecha_creacion', 'id'),
+        db.Index('ix_propuestas_cliente_fecha_creacion', 'cliente_id', 'fecha_creacion', 'id'),
+        db.Index('ix_propuestas_fecha_creacion', 'fecha_creacion', 'id'),
+        # Barrido de vencimientos: ENVIADA con fecha_expiracion pasada
+        db.Index('ix_propuestas_estado_fecha_expiracion', 'estado', 'fecha_expiracion'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     cliente_id = db.Column(db.String(36), db.ForeignKey('clientes.id'), nullable=False)
@@ -112,6 +135,9 @@ class Propuesta(db.Model):
 class VersionPropuesta(db.Model):
     """Modelo para mantener historial de versiones"""
     __tablename__ = 'versiones_propuesta'
+    __table_args__ = (
+        db.Index('ix_versiones_propuesta_propuesta_version', 'propuesta_id', 'numero_version'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     propuesta_id = db.Column(db.String(36), db.ForeignKey('propuestas.id'), nullable=False)
@@ -134,6 +160,9 @@ class VersionPropuesta(db.Model):
 class RespuestaCliente(db.Model):
     """Modelo para registrar respuestas del cliente"""
     __tablename__ = 'respuestas_cliente'
+    __table_args__ = (
+        db.Index('ix_respuestas_cliente_propuesta_fecha', 'propuesta_id', 'fecha_respuesta'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     propuesta_id = db.Column(db.String(36), db.ForeignKey('propuestas.id'), nullable=False)
@@ -149,6 +178,9 @@ class RespuestaCliente(db.Model):
 class DocumentoGenerado(db.Model):
     """Modelo para registrar PDFs generados"""
     __tablename__ = 'documentos_generados'
+    __table_args__ = (
+        db.Index('ix_documentos_generados_propuesta_fecha', 'propuesta_id', 'fecha_generacion'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     propuesta_id = db.Column(db.String(36), db.ForeignKey('propuestas.id'), nullable=False)
@@ -176,14 +208,57 @@ class ConfiguracionCostos(db.Model):
     condiciones_pago = db.Column(db.Text)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
     usuario_actualizacion = db.Column(db.String(150))
+    # Se incrementa en cada cambio; los procesos comparan contra su copia en caché
+    version = db.Column(db.Integer, nullable=False, default=1)
     
     def __repr__(self):
         return f'<Configuracion - Utilidad {self.utilidad_minima}-{self.utilidad_maxima}%>'
 
 
+class TrabajoRender(db.Model):
+    """Cola persistente de renderizado de documentos en segundo plano"""
+    __tablename__ = 'trabajos_render'
+    __table_args__ = (
+        db.Index('ix_trabajos_render_estado_proximo', 'estado', 'proximo_intento'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    propuesta_id = db.Column(db.String(36), db.ForeignKey('propuestas.id'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False, default='PROPUESTA')
+    
+    estado = db.Column(db.String(20), nullable=False, default='PENDIENTE')  # PENDIENTE, EN_PROCESO, COMPLETADO, FALLIDO
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=5)
+    proximo_intento = db.Column(db.DateTime, default=datetime.utcnow)
+    bloqueado_hasta = db.Column(db.DateTime)  # lease del worker que lo procesa
+    
+    documento_id = db.Column(db.String(36))
+    error = db.Column(db.Text)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TrabajoRender {self.tipo} {self.propuesta_id} - {self.estado}>'
+
+
+class SecuenciaPropuesta(db.Model):
+    """Contador de numero_propuesta por período (YYYYMM)"""
+    __tablename__ = 'secuencias_propuesta'
+    
+    periodo = db.Column(db.String(6), primary_key=True)
+    ultimo = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SecuenciaPropuesta {self.periodo}: {self.ultimo}>'
+
+
 class Notificacion(db.Model):
     """Modelo para gestionar notificaciones"""
     __tablename__ = 'notificaciones'
+    __table_args__ = (
+        # Bandeja de salida: pendientes por próximo intento
+        db.Index('ix_notificaciones_enviada_proximo', 'enviada', 'proximo_intento'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     propuesta_id = db.Column(db.String(36), db.ForeignKey('propuestas.id'), nullable=False)
@@ -197,5 +272,53 @@ class Notificacion(db.Model):
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_envio = db.Column(db.DateTime)
     
+    # Despacho (app/notificaciones.py): reintentos y lease del worker que la envía
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, default=datetime.utcnow)
+    bloqueado_hasta = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    
     def __repr__(self):
         return f'<Notificacion {self.tipo} - {self.destinatario}>'
+
+
+class EventoAuditoria(db.Model):
+    """Registro append-only de acciones administrativas (app/auditoria.py)"""
+    __tablename__ = 'auditoria'
+    __table_args__ = (
+        db.Index('ix_auditoria_propuesta_fecha', 'propuesta_id', 'fecha'),
+        db.Index('ix_auditoria_accion_fecha', 'accion', 'fecha'),
+        db.Index('ix_auditoria_fecha', 'fecha'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    accion = db.Column(db.String(50), nullable=False)  # ENVIO_PROPUESTA, MODIFICACION_PROPUESTA...
+    # Sin FK: el registro sobrevive aunque la propuesta se elimine
+    propuesta_id = db.Column(db.String(36))
+    usuario = db.Column(db.String(150))
+    ip = db.Column(db.String(45))
+    detalle = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<EventoAuditoria {self.accion} - {self.propuesta_id}>'
+
+
+class CambioEstado(db.Model):
+    """Cambios de estado y firmas que se transmiten en vivo (app/eventos.py)"""
+    __tablename__ = 'cambios_estado'
+    __table_args__ = (
+        db.Index('ix_cambios_estado_fecha', 'fecha'),
+    )
+    
+    # Creciente: es el id del evento SSE y el cursor de los procesos que siguen la tabla
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    tipo = db.Column(db.String(20), nullable=False, default='ESTADO')  # ESTADO, FIRMA
+    propuesta_id = db.Column(db.String(36), nullable=False)
+    numero_propuesta = db.Column(db.String(20))
+    estado_anterior = db.Column(db.String(50))
+    estado = db.Column(db.String(50), nullable=False)
+    
+    def __repr__(self):
+        return f'<CambioEstado {self.id} {self.estado_anterior} -> {self.estado}>'
@@ -0,0 +1,109 @@
+"""
+Motor de precios vectorizado para propuestas pregeneradas.
+
+Calcula todas las columnas de costo de un lote de propuestas con NumPy a
+partir de arreglos de ruta, carga y camión. Las fórmulas y el orden de las
+operaciones son los mismos que el cálculo fila a fila original, por lo que
+los resultados son idénticos en punto flotante (incluido el redondeo a
+miles del precio final).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# Costos base por km
+COSTO_COMBUSTIBLE_KM = 400  # CLP por km
+COSTO_PEAJE_KM = 50  # CLP por km
+TARIFA_BASE_GC = 350000  # CLP
+TARIFA_BASE_MC = 285000  # CLP
+
+# Rangos de los montos variables (inclusive, como random.randint)
+VIATICO_DIARIO = (15000, 25000)
+VIATICO_CORTO = (8000, 15000)
+HOSPEDAJE_NOCHE = (30000, 50000)
+FACTOR_INDIRECTO = (0.15, 0.20)
+UTILIDAD = (25, 35)
+
+
+@dataclass
+class EntradasPrecio:
+    """Arreglos de entrada de un lote; todos con el mismo largo"""
+    distancia_km: np.ndarray
+    tiempo_horas: np.ndarray
+    peso_kg: np.ndarray
+    volumen_m3: np.ndarray
+    es_gc: np.ndarray  # bool: camión GC (si no, MC)
+    duracion_dias: np.ndarray
+    viatico_diario: np.ndarray  # se usa en rutas de más de 4 horas
+    viatico_corto: np.ndarray  # se usa en rutas de hasta 4 horas
+    hospedaje_noche: np.ndarray
+    factor_indirecto: np.ndarray
+    utilidad_porcentaje: np.ndarray
+
+    def __len__(self):
+        return len(self.distancia_km)
+
+
+def sortear_variables(rng, n):
+    """Sortea en bloque los montos aleatorios de n propuestas"""
+    return {
+        'viatico_diario': rng.integers(VIATICO_DIARIO[0], VIATICO_DIARIO[1] + 1, n),
+        'viatico_corto': rng.integers(VIATICO_CORTO[0], VIATICO_CORTO[1] + 1, n),
+        'hospedaje_noche': rng.integers(HOSPEDAJE_NOCHE[0], HOSPEDAJE_NOCHE[1] + 1, n),
+        'factor_indirecto': rng.uniform(FACTOR_INDIRECTO[0], FACTOR_INDIRECTO[1], n),
+        'utilidad_porcentaje': rng.uniform(UTILIDAD[0], UTILIDAD[1], n),
+    }
+
+
+def calcular_costos(entradas):
+    """Calcula todas las columnas de costo del lote. Devuelve un dict de arreglos"""
+    distancia = np.asarray(entradas.distancia_km, dtype=np.float64)
+    tiempo = np.asarray(entradas.tiempo_horas, dtype=np.float64)
+    duracion = np.asarray(entradas.duracion_dias, dtype=np.int64)
+
+    # Cantidad de camiones necesarios
+    cantidad_camiones = np.where(
+        (np.asarray(entradas.volumen_m3) > 45) | (np.asarray(entradas.peso_kg) > 10000), 2, 1
+    ).astype(np.int64)
+
+    costo_combustible = distancia * COSTO_COMBUSTIBLE_KM * cantidad_camiones
+    costo_peajes = distancia * COSTO_PEAJE_KM * cantidad_camiones
+
+    # Viáticos y hospedaje según duración
+    ruta_larga = tiempo > 4
+    costo_viaticos = np.where(
+        ruta_larga,
+        np.asarray(entradas.viatico_diario, dtype=np.int64) * duracion,
+        np.asarray(entradas.viatico_corto, dtype=np.int64),
+    )
+    costo_hospedaje = np.where(
+        ruta_larga,
+        np.asarray(entradas.hospedaje_noche, dtype=np.int64) * (duracion - 1),
+        0,
+    )
+
+    # Tarifa base según tipo de camión
+    tarifa_base = np.where(entradas.es_gc, TARIFA_BASE_GC, TARIFA_BASE_MC) * cantidad_camiones
+
+    # Mismo orden de sumas que el cálculo escalar
+    costo_directo = costo_combustible + costo_peajes + costo_viaticos + costo_hospedaje + tarifa_base
+    costo_indirecto = costo_directo * np.asarray(entradas.factor_indirecto, dtype=np.float64)
+
+    utilidad = np.asarray(entradas.utilidad_porcentaje, dtype=np.float64)
+    precio_final = costo_directo + costo_indirecto + (costo_directo * utilidad / 100)
+    # Redondear a miles (np.rint redondea al par más cercano, igual que round())
+    precio_final = np.rint(precio_final / 1000) * 1000
+
+    return {
+        'cantidad_camiones': cantidad_camiones,
+        'costo_combustible': costo_combustible,
+        'costo_peajes': costo_peajes,
+        'costo_viaticos': costo_viaticos,
+        'costo_hospedaje': costo_hospedaje,
+        'tarifa_base': tarifa_base,
+        'costo_directo': costo_directo,
+        'costo_indirecto_aplicado': costo_indirecto,
+        # round() de Python redondea sobre el decimal exacto; np.round no siempre coincide
+        'utilidad_porcentaje': np.array([round(u, 2) for u in utilidad.tolist()], dtype=np.float64),
+        'precio_final': precio_final,
+    }
@@ -0,0 +1,356 @@
+"""
+Despacho de la bandeja de salida (tabla notificaciones).
+
+Las rutas crean Notificacion con enviada=False en la misma transacción que
+el cambio que las origina. Un despachador las reclama por lotes con un
+lease (bloqueado_hasta): un UPDATE ... RETURNING marca el lote y devuelve
+sus datos, así que varios workers pueden correr a la vez sin repartir dos
+veces la misma fila, y un worker caído libera las suyas al vencer el lease.
+El lote se reparte entre hilos que entregan por un transporte enchufable:
+- TransporteSMTP: pool de conexiones SMTP reutilizadas entre lotes;
+- TransporteArchivo: un .eml por mensaje en NOTIFICACIONES_DIR.
+Los fallos se reintentan con backoff exponencial hasta
+NOTIFICACIONES_MAX_INTENTOS; las entregadas quedan con enviada/fecha_envio.
+"""
+import os
+import queue
+import atexit
+import smtplib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.charset import QP, Charset
+from email.header import Header
+from email.mime.text import MIMEText
+from email.utils import format_datetime, parseaddr
+
+from sqlalchemy import and_, bindparam, false, or_, select, true, update
+
+from . import app, db
+from .models import Notificacion
+
+# Tiempo que un worker retiene un lote antes de que otro pueda reclamarlo
+LEASE_SEGUNDOS = 120
+# Tope de espera entre reintentos
+REINTENTO_MAXIMO_SEGUNDOS = 3600
+
+_tabla = Notificacion.__table__
+
+
+_UTF8 = Charset('utf-8')
+_UTF8.body_encoding = QP
+
+
+def construir_mensaje(notificacion, remitente):
+    """Bytes RFC 5322 de una fila reclamada; el Message-ID es el id, estable entre reintentos.
+
+    Usa la API compat32 de email (MIMEText/Header): EmailMessage con la
+    política por defecto cuesta ~1 ms por mensaje y limita el despacho.
+    """
+    mensaje = MIMEText(notificacion.mensaje or '', 'plain', _UTF8)
+    mensaje['From'] = remitente
+    mensaje['To'] = notificacion.destinatario
+    asunto = notificacion.asunto or notificacion.tipo
+    mensaje['Subject'] = asunto if asunto.isascii() else Header(asunto, 'utf-8')
+    mensaje['Date'] = format_datetime(notificacion.fecha_creacion or datetime.utcnow())
+    mensaje['Message-ID'] = f'<{notificacion.id}@mgcp.acmetrans.cl>'
+    mensaje['X-MGCP-Tipo'] = notificacion.tipo
+    return mensaje.as_bytes()
+
+
+class TransporteArchivo:
+    """Escribe cada mensaje como <id>.eml; sustituto local de SMTP"""
+
+    def __init__(self, directorio, remitente):
+        self.directorio = directorio
+        self.remitente = remitente
+        os.makedirs(directorio, exist_ok=True)
+
+    def enviar(self, notificaciones):
+        errores = {}
+        for notificacion in notificaciones:
+            try:
+                contenido = construir_mensaje(notificacion, self.remitente)
+                descriptor, temporal = tempfile.mkstemp(dir=self.directorio, prefix='.tmp-')
+                with os.fdopen(descriptor, 'wb') as archivo:
+                    archivo.write(contenido)
+                os.replace(temporal, os.path.join(self.directorio, f'{notificacion.id}.eml'))
+            except OSError as e:
+                errores[notificacion.id] = f'{type(e).__name__}: {e}'
+        return errores
+
+    def cerrar(self):
+        pass
+
+
+class TransporteSMTP:
+    """Entrega por SMTP con hasta `conexiones` sesiones abiertas y reutilizadas"""
+
+    def __init__(self, host, puerto, remitente, usuario=None, clave=None, starttls=False, conexiones=4, timeout=30):
+        self.host = host
+        self.puerto = puerto
+        self.remitente = remitente
+        self.direccion_remitente = parseaddr(remitente)[1]
+        self.usuario = usuario
+        self.clave = clave
+        self.starttls = starttls
+        self.timeout = timeout
+        self.conexiones_abiertas = 0  # total de conexiones creadas (métrica)
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max(1, conexiones))
+
+    def _conectar(self):
+        conexion = smtplib.SMTP(self.host, self.puerto, timeout=self.timeout)
+        if self.starttls:
+            conexion.starttls()
+        if self.usuario:
+            conexion.login(self.usuario, self.clave or '')
+        self.conexiones_abiertas += 1
+        return conexion
+
+    def _obtener(self):
+        self._cupos.acquire()
+        try:
+            while True:
+                try:
+                    conexion = self._libres.get_nowait()
+                except queue.Empty:
+                    return self._conectar()
+                # Una conexión ociosa puede haber sido cerrada por el servidor
+                try:
+                    if conexion.noop()[0] == 250:
+                        return conexion
+                except OSError:
+                    pass
+                self._cerrar_conexion(conexion)
+        except BaseException:
+            self._cupos.release()
+            raise
+
+    def _devolver(self, conexion, reutilizable):
+        if reutilizable:
+            self._libres.put(conexion)
+        else:
+            self._cerrar_conexion(conexion)
+        self._cupos.release()
+
+    @staticmethod
+    def _cerrar_conexion(conexion):
+        try:
+            conexion.quit()
+        except OSError:
+            conexion.close()
+
+    def enviar(self, notificaciones):
+        errores = {}
+        try:
+            conexion = self._obtener()
+        except OSError as e:
+            return {n.id: f'{type(e).__name__}: {e}' for n in notificaciones}
+        reutilizable = True
+        for posicion, notificacion in enumerate(notificaciones):
+            try:
+                conexion.sendmail(
+                    self.direccion_remitente, [notificacion.destinatario], construir_mensaje(notificacion, self.remitente)
+                )
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # El servidor rechazó este mensaje (smtplib ya hizo RSET); la sesión sigue usable
+                errores[notificacion.id] = f'{type(e).__name__}: {e}'
+            except OSError as e:
+                # SMTPException hereda de OSError: conexión perdida o respuesta inesperada.
+                # El resto del lote se reintenta más tarde con otra conexión
+                reutilizable = False
+                for pendiente in notificaciones[posicion:]:
+                    errores[pendiente.id] = f'{type(e).__name__}: {e}'
+                break
+        self._devolver(conexion, reutilizable)
+        return errores
+
+    def cerrar(self):
+        while True:
+            try:
+                self._cerrar_conexion(self._libres.get_nowait())
+            except queue.Empty:
+                return
+
+
+def crear_transporte():
+    """Transporte según NOTIFICACIONES_TRANSPORTE; None si está desactivado"""
+    tipo = app.config['NOTIFICACIONES_TRANSPORTE']
+    remitente = app.config['NOTIFICACIONES_REMITENTE']
+    if tipo == 'smtp':
+        return TransporteSMTP(
+            app.config['SMTP_HOST'],
+            app.config['SMTP_PORT'],
+            remitente,
+            usuario=app.config['SMTP_USUARIO'],
+            clave=app.config['SMTP_CLAVE'],
+            starttls=app.config['SMTP_STARTTLS'],
+            conexiones=app.config['SMTP_CONEXIONES'],
+        )
+    if tipo == 'archivo':
+        return TransporteArchivo(app.config['NOTIFICACIONES_DIR'], remitente)
+    if tipo:
+        raise ValueError(f"NOTIFICACIONES_TRANSPORTE desconocido: {tipo}")
+    return None
+
+
+def _disponible(ahora):
+    return and_(
+        _tabla.c.enviada == false(),
+        _tabla.c.intentos < app.config['NOTIFICACIONES_MAX_INTENTOS'],
+        or_(_tabla.c.proximo_intento.is_(None), _tabla.c.proximo_intento <= ahora),
+        or_(_tabla.c.bloqueado_hasta.is_(None), _tabla.c.bloqueado_hasta < ahora),
+    )
+
+
+def reclamar_notificaciones(limite):
+    """Toma hasta `limite` notificaciones pendientes con un lease. Devuelve sus filas"""
+    ahora = datetime.utcnow()
+    candidatas = (
+        select(_tabla.c.id).where(_disponible(ahora)).order_by(_tabla.c.fecha_creacion).limit(limite)
+    )
+    with db.engine.begin() as conn:
+        # Un solo UPDATE condicional: otro worker no puede tomar las mismas filas
+        return conn.execute(
+            update(_tabla)
+            .where(_tabla.c.id.in_(candidatas), _disponible(ahora))
+            .values(intentos=_tabla.c.intentos + 1, bloqueado_hasta=ahora + timedelta(seconds=LEASE_SEGUNDOS))
+            .returning(
+                _tabla.c.id, _tabla.c.tipo, _tabla.c.destinatario, _tabla.c.asunto,
+                _tabla.c.mensaje, _tabla.c.fecha_creacion, _tabla.c.intentos,
+            )
+        ).all()
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial: base, 2*base, 4*base... con tope"""
+    base = app.config['NOTIFICACIONES_REINTENTO_BASE']
+    return min(base * 2 ** max(intentos - 1, 0), REINTENTO_MAXIMO_SEGUNDOS)
+
+
+def registrar_resultados(notificaciones, errores):
+    """Marca enviadas las entregadas y reprograma las fallidas, en una transacción"""
+    ahora = datetime.utcnow()
+    entregadas = [n.id for n in notificaciones if n.id not in errores]
+    fallidas = [
+        {'b_id': n.id, 'error': errores[n.id], 'proximo_intento': ahora + timedelta(seconds=espera_reintento(n.intentos))}
+        for n in notificaciones if n.id in errores
+    ]
+    with db.engine.begin() as conn:
+        if entregadas:
+            conn.execute(
+                update(_tabla)
+                .where(_tabla.c.id.in_(entregadas))
+                .values(enviada=true(), fecha_envio=ahora, bloqueado_hasta=None, error=None)
+            )
+        if fallidas:
+            conn.execute(
+                update(_tabla)
+                .where(_tabla.c.id == bindparam('b_id'))
+                .values(error=bindparam('error'), proximo_intento=bindparam('proximo_intento'), bloqueado_hasta=None),
+                fallidas,
+            )
+    return len(entregadas)
+
+
+def _repartir(filas, partes):
+    tamano = -(-len(filas) // partes)
+    return [filas[i:i + tamano] for i in range(0, len(filas), tamano)]
+
+
+def despachar_lote(transporte, limite=None, ejecutor=None, partes=1):
+    """Reclama un lote, lo entrega en `partes` envíos paralelos y registra. Devuelve (reclamadas, entregadas)"""
+    filas = reclamar_notificaciones(limite or app.config['NOTIFICACIONES_LOTE'])
+    if not filas:
+        return 0, 0
+    errores = {}
+    if ejecutor is None or partes < 2:
+        errores.update(transporte.enviar(filas))
+    else:
+        for parcial in ejecutor.map(transporte.enviar, _repartir(filas, partes)):
+            errores.update(parcial)
+    return len(filas), registrar_resultados(filas, errores)
+
+
+def procesar_pendientes(transporte=None, limite=None):
+    """Entrega en este proceso todo lo disponible ahora (CLI --una-vez y pruebas)"""
+    propio = transporte is None
+    transporte = transporte or crear_transporte()
+    total = 0
+    try:
+        with app.app_context():
+            while True:
+                reclamadas, entregadas = despachar_lote(transporte, limite=limite)
+                total += entregadas
+                if reclamadas < (limite or app.config['NOTIFICACIONES_LOTE']):
+                    return total
+    finally:
+        if propio:
+            transporte.cerrar()
+
+
+class DespachadorNotificaciones:
+    """Hilo que vacía la bandeja de salida repartiendo cada lote entre `hilos` envíos"""
+
+    def __init__(self, transporte, hilos, intervalo=1.0):
+        self.transporte = transporte
+        self.hilos = max(1, hilos)
+        self.intervalo = intervalo
+        self.pid = os.getpid()
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._ejecutor = None
+        self._hilo = None
+
+    def iniciar(self):
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='envio-notificaciones')
+        self._hilo = threading.Thread(target=self._bucle, name='despachador-notificaciones', daemon=True)
+        self._hilo.start()
+        return self
+
+    def despertar(self):
+        self._evento.set()
+
+    def detener(self):
+        self._detener.set()
+        self._evento.set()
+        if self._hilo:
+            self._hilo.join(timeout=10)
+        if self._ejecutor:
+            self._ejecutor.shutdown(wait=True)
+        self.transporte.cerrar()
+
+    def _bucle(self):
+        lote = app.config['NOTIFICACIONES_LOTE']
+        while not self._detener.is_set():
+            try:
+                with app.app_context():
+                    reclamadas, _ = despachar_lote(self.transporte, lote, self._ejecutor, self.hilos)
+            except Exception as e:
+                app.logger.warning('Despachador de notificaciones: %s', e)
+                reclamadas = 0
+            if reclamadas < lote:
+                # Bandeja vacía: esperar nuevas o el próximo reintento
+                self._evento.wait(self.intervalo)
+                self._evento.clear()
+
+
+_despachador = None
+_despachador_lock = threading.Lock()
+
+
+def iniciar_despachador():
+    """Despachador del proceso actual si NOTIFICACIONES_DESPACHADOR=proceso; se crea de nuevo tras un fork"""
+    global _despachador
+    if app.config['NOTIFICACIONES_DESPACHADOR'] != 'proceso':
+        return None
+    with _despachador_lock:
+        if _despachador is None or _despachador.pid != os.getpid():
+            transporte = crear_transporte()
+            if transporte is None:
+                return None
+            _despachador = DespachadorNotificaciones(transporte, app.config['NOTIFICACIONES_HILOS']).iniciar()
+            atexit.register(_despachador.detener)
+    return _despachador
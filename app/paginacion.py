@@ -0,0 +1,54 @@
+"""
+Paginación por cursor (keyset) sobre (fecha_creacion, id)
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from . import app
+
+
+def tamano_pagina(valor):
+    """Tamaño de página solicitado, acotado a PROPUESTAS_POR_PAGINA_MAX"""
+    try:
+        por_pagina = int(valor)
+    except (TypeError, ValueError):
+        return app.config['PROPUESTAS_POR_PAGINA']
+    return max(1, min(por_pagina, app.config['PROPUESTAS_POR_PAGINA_MAX']))
+
+
+def codificar_cursor(fecha, registro_id):
+    """Cursor opaco para la URL a partir de la última fila de la página"""
+    crudo = f"{fecha.isoformat()}|{registro_id}".encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, id) o None si el cursor falta o es inválido"""
+    if not cursor:
+        return None
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        fecha, registro_id = crudo.split('|', 1)
+        return datetime.fromisoformat(fecha), registro_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def paginar_keyset(query, col_fecha, col_id, cursor, por_pagina):
+    """Aplica orden descendente y posición del cursor; devuelve (filas, cursor_siguiente)"""
+    if cursor:
+        fecha, registro_id = cursor
+        query = query.filter(or_(
+            col_fecha < fecha,
+            and_(col_fecha == fecha, col_id < registro_id),
+        ))
+    # Se pide una fila extra para saber si existe página siguiente
+    filas = query.order_by(col_fecha.desc(), col_id.desc()).limit(por_pagina + 1).all()
+    if len(filas) <= por_pagina:
+        return filas, None
+    filas = filas[:por_pagina]
+    ultima = filas[-1]
+    return filas, codificar_cursor(getattr(ultima, col_fecha.key), getattr(ultima, col_id.key))
@@ -0,0 +1,96 @@
+"""
+Soporte para servir la aplicación en producción (servidor.py).
+
+- nucleos_disponibles() cuenta los núcleos que el proceso puede usar de
+  verdad: afinidad de CPU y cuota de cgroup (contenedores), no solo
+  os.cpu_count().
+- recomendar_workers() propone procesos e hilos según el servidor y la
+  base: con SQLite las escrituras se serializan en un único archivo, así
+  que más procesos solo agregan contención.
+- preparar_worker() se ejecuta en cada proceso hijo después del fork:
+  descarta las conexiones heredadas del proceso maestro (la aplicación se
+  importa una vez antes del fork) y arranca los hilos de fondo del
+  proceso (render de documentos, barrido de expiración, envío de
+  notificaciones, seguimiento de los eventos en vivo de los otros workers).
+"""
+import os
+from collections import namedtuple
+
+from . import app, db
+
+Recomendacion = namedtuple('Recomendacion', ['nucleos', 'workers', 'hilos', 'motivo'])
+
+# Con SQLite más procesos no escriben más rápido: esperan el mismo lock
+MAX_WORKERS_SQLITE = 4
+
+
+def _cuota_cgroup():
+    """Núcleos permitidos por la cuota de CPU de cgroup v2/v1, o None si no hay cuota"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as archivo:
+            cuota, periodo = archivo.read().split()
+        if cuota != 'max':
+            return int(cuota) / int(periodo)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as archivo:
+            cuota = int(archivo.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as archivo:
+            periodo = int(archivo.read())
+        if cuota > 0:
+            return cuota / periodo
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def nucleos_disponibles():
+    """Núcleos que este proceso puede usar (afinidad y cuota de contenedor)"""
+    try:
+        nucleos = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Windows y macOS no tienen sched_getaffinity
+        nucleos = os.cpu_count() or 1
+    cuota = _cuota_cgroup()
+    if cuota is not None:
+        nucleos = min(nucleos, max(1, int(cuota + 0.5)))
+    return max(1, nucleos)
+
+
+def recomendar_workers(servidor='gunicorn', nucleos=None, url_base=None):
+    """Procesos e hilos por proceso recomendados para este equipo"""
+    nucleos = nucleos or nucleos_disponibles()
+    url_base = url_base or app.config['SQLALCHEMY_DATABASE_URI']
+    if servidor == 'uvicorn':
+        # Un proceso por núcleo; la concurrencia la da el pool de hilos del adaptador WSGI
+        workers, hilos = nucleos, 1
+        motivo = 'uvicorn: un proceso por núcleo'
+    elif servidor == 'werkzeug':
+        workers, hilos = 1, 1
+        motivo = 'werkzeug: un solo proceso, un hilo por petición'
+    else:
+        # Las vistas esperan base de datos y disco la mayor parte del tiempo
+        workers, hilos = 2 * nucleos + 1, 4
+        motivo = f'gunicorn gthread: 2 x {nucleos} núcleos + 1 procesos, 4 hilos cada uno'
+    if url_base.startswith('sqlite') and workers > MAX_WORKERS_SQLITE:
+        workers = MAX_WORKERS_SQLITE
+        motivo += f'; limitado a {MAX_WORKERS_SQLITE} procesos por SQLite (un solo escritor)'
+    return Recomendacion(nucleos, workers, hilos, motivo)
+
+
+def preparar_worker():
+    """Llamar en cada proceso hijo tras el fork (post_fork de gunicorn)"""
+    from .cola_render import iniciar_despachador_render
+    from .eventos import iniciar_seguidor
+    from .expiracion import iniciar_barredor
+    from .notificaciones import iniciar_despachador
+
+    with app.app_context():
+        # Los sockets del pool del maestro no deben compartirse entre procesos
+        for motor in db.engines.values():
+            motor.dispose(close=False)
+    iniciar_despachador_render()
+    iniciar_barredor()
+    iniciar_despachador()
+    iniciar_seguidor()
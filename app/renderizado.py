@@ -0,0 +1,180 @@
+"""
+Renderizado de documentos de propuesta y contrato.
+
+- Las plantillas pdf/* se compilan una vez y su bytecode queda en
+  PLANTILLAS_CACHE_DIR (FileSystemBytecodeCache), por lo que un reinicio
+  o un proceso nuevo del pool de render no vuelve a compilarlas.
+- Los contextos salen de una proyección única: un SELECT de Propuesta con
+  Cliente (solo las columnas que usan las plantillas) más la
+  configuración leída una vez por lote.
+- render_many(ids) renderiza un lote completo con una consulta por cada
+  bloque de ids en lugar de tres consultas por documento.
+"""
+import os
+from collections import namedtuple
+from datetime import datetime
+
+from jinja2 import FileSystemBytecodeCache
+
+from . import app, db
+from .configuracion import obtener_configuracion
+from .models import Cliente, Propuesta
+
+PLANTILLAS = {
+    'PROPUESTA': 'pdf/propuesta_template.html',
+    'CONTRATO': 'pdf/contrato_template.html',
+}
+# Ids por consulta: bajo el límite de variables de SQLite
+TAMANO_BLOQUE_IDS = 500
+
+# Lo que las plantillas leen de `cliente`
+ClienteDocumento = namedtuple('ClienteDocumento', 'nombre email telefono direccion')
+
+# Columnas de la proyección; el orden define los campos de cada fila
+COLUMNAS_PROPUESTA = (
+    Propuesta.id,
+    Propuesta.numero_propuesta,
+    Propuesta.version,
+    Propuesta.estado,
+    Propuesta.tipo_servicio,
+    Propuesta.origen,
+    Propuesta.destino,
+    Propuesta.distancia_km,
+    Propuesta.tiempo_estimado_horas,
+    Propuesta.peso_kg,
+    Propuesta.volumen_m3,
+    Propuesta.tipo_camion,
+    Propuesta.cantidad_camiones,
+    Propuesta.fecha_salida,
+    Propuesta.fecha_retorno,
+    Propuesta.fecha_expiracion,
+    Propuesta.costo_combustible,
+    Propuesta.costo_peajes,
+    Propuesta.costo_viaticos,
+    Propuesta.costo_hospedaje,
+    Propuesta.tarifa_base,
+    Propuesta.costo_directo,
+    Propuesta.costo_indirecto_aplicado,
+    Propuesta.utilidad_porcentaje,
+    Propuesta.precio_final,
+)
+COLUMNAS_CLIENTE = (Cliente.nombre, Cliente.email, Cliente.telefono, Cliente.direccion)
+
+
+def instalar_cache_bytecode():
+    directorio = app.config['PLANTILLAS_CACHE_DIR']
+    os.makedirs(directorio, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio, pattern='mgcp_%s.cache')
+
+
+def precompilar():
+    """Carga las plantillas de documentos (desde el bytecode si ya existe)"""
+    for nombre in PLANTILLAS.values():
+        app.jinja_env.get_template(nombre)
+
+
+def proyectar(ids):
+    """Filas de Propuesta + Cliente por id, en una consulta por bloque"""
+    ids = list(ids)
+    proyecciones = {}
+    for inicio in range(0, len(ids), TAMANO_BLOQUE_IDS):
+        bloque = ids[inicio:inicio + TAMANO_BLOQUE_IDS]
+        filas = (
+            db.session.query(*COLUMNAS_PROPUESTA, *COLUMNAS_CLIENTE)
+            .join(Cliente, Cliente.id == Propuesta.cliente_id)
+            .filter(Propuesta.id.in_(bloque))
+        )
+        for fila in filas:
+            proyecciones[fila.id] = fila
+    return proyecciones
+
+
+def _fecha(valor):
+    return valor.strftime('%d/%m/%Y') if valor else ''
+
+
+def _cliente(fila):
+    return ClienteDocumento(fila.nombre, fila.email, fila.telefono, fila.direccion)
+
+
+def contexto_propuesta(fila, config, fecha=None):
+    return {
+        'numero_propuesta': fila.numero_propuesta,
+        'version': fila.version,
+        'fecha': (fecha or datetime.now()).strftime('%d/%m/%Y'),
+        'cliente': _cliente(fila),
+        'tipo_servicio': fila.tipo_servicio,
+        'origen': fila.origen,
+        'destino': fila.destino,
+        'distancia_km': fila.distancia_km,
+        'tiempo_horas': fila.tiempo_estimado_horas,
+        'peso_kg': fila.peso_kg,
+        'volumen_m3': fila.volumen_m3,
+        'tipo_camion': fila.tipo_camion,
+        'cantidad_camiones': fila.cantidad_camiones,
+        'fecha_salida': _fecha(fila.fecha_salida),
+        'fecha_retorno': _fecha(fila.fecha_retorno),
+        'costo_combustible': fila.costo_combustible,
+        'costo_peajes': fila.costo_peajes,
+        'costo_viaticos': fila.costo_viaticos,
+        'costo_hospedaje': fila.costo_hospedaje,
+        'tarifa_base': fila.tarifa_base,
+        'costo_directo': fila.costo_directo,
+        'costo_indirecto': fila.costo_indirecto_aplicado,
+        'utilidad_porcentaje': fila.utilidad_porcentaje,
+        'utilidad_monto': fila.costo_directo * (fila.utilidad_porcentaje / 100),
+        'precio_final': fila.precio_final,
+        'vigencia_horas': config.vigencia_propuesta_horas,
+        'fecha_expiracion': fila.fecha_expiracion.strftime('%d/%m/%Y %H:%M') if fila.fecha_expiracion else 'No especificada',
+        'condiciones_pago': config.condiciones_pago,
+        'terminos_condiciones': config.terminos_condiciones,
+    }
+
+
+def contexto_contrato(fila, config, fecha=None, firma_cliente=None):
+    return {
+        'numero_contrato': f"CONT-{fila.numero_propuesta}",
+        'numero_propuesta': fila.numero_propuesta,
+        'fecha': (fecha or datetime.now()).strftime('%d/%m/%Y'),
+        'cliente': _cliente(fila),
+        'tipo_servicio': fila.tipo_servicio,
+        'origen': fila.origen,
+        'destino': fila.destino,
+        'distancia_km': fila.distancia_km,
+        'fecha_salida': _fecha(fila.fecha_salida),
+        'fecha_retorno': _fecha(fila.fecha_retorno),
+        'tipo_camion': fila.tipo_camion,
+        'cantidad_camiones': fila.cantidad_camiones,
+        'precio_final': fila.precio_final,
+        'condiciones_pago': config.condiciones_pago,
+        'terminos_condiciones': config.terminos_condiciones,
+        'firmado': firma_cliente is not None,
+        'firma_cliente': firma_cliente,
+    }
+
+
+CONTEXTOS = {'PROPUESTA': contexto_propuesta, 'CONTRATO': contexto_contrato}
+
+
+def renderizar(tipo, fila, config, **extra):
+    """HTML de un documento a partir de una fila de proyectar()"""
+    contexto = CONTEXTOS[tipo](fila, config, **extra)
+    return app.jinja_env.get_template(PLANTILLAS[tipo]).render(contexto)
+
+
+def render_many(ids, tipo='PROPUESTA', config=None):
+    """Renderiza un lote. Devuelve {propuesta_id: html}; omite ids inexistentes"""
+    if config is None:
+        config = obtener_configuracion()
+    plantilla = app.jinja_env.get_template(PLANTILLAS[tipo])
+    construir = CONTEXTOS[tipo]
+    fecha = datetime.now()
+    ids = list(ids)
+    filas = proyectar(ids)
+    return {
+        propuesta_id: plantilla.render(construir(filas[propuesta_id], config, fecha=fecha))
+        for propuesta_id in ids if propuesta_id in filas
+    }
+
+
+instalar_cache_bytecode()
@@ -2,11 +2,13 @@
 Rutas actualizadas para portal de revisión de propuestas pregeneradas
 """
 import os
-import hashlib
-from datetime import datetime, timedelta
+import json
+import mimetypes
+from datetime import datetime, timedelta, timezone
 import secrets
 
-from flask import render_template, request, jsonify, url_for, send_file, session, redirect
+from flask import render_template, request, jsonify, url_for, session, redirect, Response, stream_with_context
+from sqlalchemy.orm import joinedload, load_only
 
 from . import app, db
 from .__init__ import login_required
@@ -18,26 +20,71 @@ from .models import (
     Notificacion,
     CostoIndirecto,
     DocumentoGenerado,
-    ConfiguracionCostos,
+    TrabajoRender,
 )
+from .auditoria import auditar, consultar_auditoria
+from .base_datos import solo_lectura
+from .almacen_documentos import SUFIJOS, guardar_documento, iterar_documento, ruta_objeto, variantes
+from .cache_portal import clave_pagina, metricas_portal, obtener_pagina, registrar_no_modificada
+from .cache_tokens import invalidar_propuestas, metricas_tokens, resolver_token
+from .cola_render import encolar_render, notificar_encolado
+from .envio_masivo import ENVIABLES, enviar_masivo, seleccionar_enviables
+from .eventos import cancelar, conexiones, registrar_cambio, suscribir, transmitir, ultimo_cambio
+from .configuracion import obtener_configuracion
+from .costos_indirectos import consultar_ventana, costo_indirecto_promedio
+from .importacion_costos import detectar_formato, importar_costos, leer_filas
+from .estadisticas import ESTADOS, obtener_estadisticas, invalidar_estadisticas
+from .expiracion import propuesta_vencida
+from .paginacion import decodificar_cursor, paginar_keyset, tamano_pagina
+from .renderizado import proyectar, renderizar
+from .transmision import enviar_archivo
+from .unidad_trabajo import unidad_de_trabajo
 
 # Directorio base del proyecto
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# Auditoría simple de acciones administrativas
-def log_admin_action(propuesta_id, action, detail):
-    try:
-        nota = Notificacion(
-            propuesta_id=propuesta_id,
-            tipo='AUDIT',
-            destinatario='auditoria@acmetrans.cl',
-            asunto=f'AUDIT {action}: {propuesta_id}',
-            mensaje=detail,
-            enviada=False,
-        )
-        db.session.add(nota)
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+
+# Columnas que usa propuestas_listado.html (sin descripcion_servicio)
+COLUMNAS_LISTADO = (
+    Propuesta.id,
+    Propuesta.cliente_id,
+    Propuesta.numero_propuesta,
+    Propuesta.costo_directo,
+    Propuesta.utilidad_porcentaje,
+    Propuesta.precio_final,
+    Propuesta.estado,
+    Propuesta.version,
+    Propuesta.fecha_creacion,
+)
+# Columnas que usa portal_cliente.html (sin descripcion_servicio)
+COLUMNAS_PORTAL = (
+    Propuesta.id,
+    Propuesta.cliente_id,
+    Propuesta.numero_propuesta,
+    Propuesta.tipo_servicio,
+    Propuesta.origen,
+    Propuesta.destino,
+    Propuesta.distancia_km,
+    Propuesta.tiempo_estimado_horas,
+    Propuesta.peso_kg,
+    Propuesta.volumen_m3,
+    Propuesta.tipo_camion,
+    Propuesta.cantidad_camiones,
+    Propuesta.fecha_salida,
+    Propuesta.fecha_retorno,
+    Propuesta.costo_combustible,
+    Propuesta.costo_peajes,
+    Propuesta.costo_viaticos,
+    Propuesta.costo_hospedaje,
+    Propuesta.tarifa_base,
+    Propuesta.costo_directo,
+    Propuesta.costo_indirecto_aplicado,
+    Propuesta.utilidad_porcentaje,
+    Propuesta.precio_final,
+    Propuesta.estado,
+    Propuesta.version,
+    Propuesta.token_acceso,
+    Propuesta.fecha_expiracion,
+)
 
 
 # ============================================
@@ -81,148 +128,56 @@ def estado_badge(estado):
     return badges.get(estado, 'secondary')
 
 
-# ============================================
-# FUNCIONES AUXILIARES
-# ============================================
-
-def obtener_configuracion():
-    config = ConfiguracionCostos.query.first()
-    if not config:
-        config = ConfiguracionCostos(
-            utilidad_minima=25.0,
-            utilidad_maxima=35.0,
-            vigencia_propuesta_horas=24,
-            terminos_condiciones="""1. Esta propuesta es válida solo para el servicio descrito.
-2. Los precios están sujetos a cambios en caso de modificación del servicio.
-3. ACME TRANS se reserva el derecho de rechazar carga peligrosa sin previo aviso.
-4. El cliente debe proporcionar toda la documentación necesaria para el transporte.
-5. Los tiempos de entrega son estimados y pueden variar según condiciones climáticas y de tráfico.""",
-            condiciones_pago="50% al inicio del servicio, 50% al completar la entrega",
-            usuario_actualizacion="Sistema",
-        )
-        db.session.add(config)
-        db.session.commit()
-    return config
-
-
 # ============================================
 # FUNCIONES PARA GENERACIÓN DE DOCUMENTOS HTML
 # ============================================
 
 def generar_propuesta_html(propuesta_id):
     """Genera documento HTML de propuesta"""
-    propuesta = Propuesta.query.get(propuesta_id)
-    if not propuesta:
+    fila = proyectar([propuesta_id]).get(propuesta_id)
+    if not fila:
         raise ValueError("Propuesta no encontrada")
 
-    config = obtener_configuracion()
-    utilidad_monto = propuesta.costo_directo * (propuesta.utilidad_porcentaje / 100)
-
-    contexto = {
-        'numero_propuesta': propuesta.numero_propuesta,
-        'version': propuesta.version,
-        'fecha': datetime.now().strftime('%d/%m/%Y'),
-        'cliente': propuesta.cliente,
-        'tipo_servicio': propuesta.tipo_servicio,
-        'origen': propuesta.origen,
-        'destino': propuesta.destino,
-        'distancia_km': propuesta.distancia_km,
-        'tiempo_horas': propuesta.tiempo_estimado_horas,
-        'peso_kg': propuesta.peso_kg,
-        'volumen_m3': propuesta.volumen_m3,
-        'tipo_camion': propuesta.tipo_camion,
-        'cantidad_camiones': propuesta.cantidad_camiones,
-        'fecha_salida': propuesta.fecha_salida.strftime('%d/%m/%Y'),
-        'fecha_retorno': propuesta.fecha_retorno.strftime('%d/%m/%Y'),
-        'costo_combustible': propuesta.costo_combustible,
-        'costo_peajes': propuesta.costo_peajes,
-        'costo_viaticos': propuesta.costo_viaticos,
-        'costo_hospedaje': propuesta.costo_hospedaje,
-        'tarifa_base': propuesta.tarifa_base,
-        'costo_directo': propuesta.costo_directo,
-        'costo_indirecto': propuesta.costo_indirecto_aplicado,
-        'utilidad_porcentaje': propuesta.utilidad_porcentaje,
-        'utilidad_monto': utilidad_monto,
-        'precio_final': propuesta.precio_final,
-        'vigencia_horas': config.vigencia_propuesta_horas,
-        'fecha_expiracion': propuesta.fecha_expiracion.strftime('%d/%m/%Y %H:%M') if propuesta.fecha_expiracion else 'No especificada',
-        'condiciones_pago': config.condiciones_pago,
-        'terminos_condiciones': config.terminos_condiciones,
-    }
-
-    html_content = render_template('pdf/propuesta_template.html', **contexto)
-    html_filename = f"propuesta_{propuesta.numero_propuesta}_v{propuesta.version}.html"
-    html_path = os.path.join(BASE_DIR, 'documentos_generados', html_filename)
-    os.makedirs(os.path.dirname(html_path), exist_ok=True)
-    
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    file_hash = hashlib.sha256(html_content.encode()).hexdigest()
-    
-    documento = DocumentoGenerado(
-        propuesta_id=propuesta_id,
-        tipo='PROPUESTA',
-        version=propuesta.version,
-        archivo_path=html_path,
-        hash_documento=file_hash,
-    )
-    db.session.add(documento)
-    db.session.commit()
+    html_content = renderizar('PROPUESTA', fila, obtener_configuracion())
+    # Confirma solo si no hay una unidad abierta (p. ej. la de enviar_propuesta)
+    with unidad_de_trabajo() as unidad:
+        # Renders idénticos comparten el mismo objeto en el almacén
+        file_hash, html_path = guardar_documento(html_content, creados=unidad.archivos)
+        
+        documento = DocumentoGenerado(
+            propuesta_id=propuesta_id,
+            tipo='PROPUESTA',
+            version=fila.version,
+            archivo_path=html_path,
+            hash_documento=file_hash,
+        )
+        db.session.add(documento)
+        db.session.flush()
     return html_path, documento.id
 
 
 def generar_contrato_html(propuesta_id):
     """Genera documento HTML de contrato"""
-    propuesta = Propuesta.query.get(propuesta_id)
-    if not propuesta:
+    fila = proyectar([propuesta_id]).get(propuesta_id)
+    if not fila:
         raise ValueError("Propuesta no encontrada")
-    if propuesta.estado != 'ACEPTADA':
+    if fila.estado != 'ACEPTADA':
         raise ValueError("Solo se puede generar contrato para propuestas aceptadas")
 
-    config = obtener_configuracion()
-    utilidad_monto = propuesta.costo_directo * (propuesta.utilidad_porcentaje / 100)
-
-    contexto = {
-        'numero_contrato': f"CONT-{propuesta.numero_propuesta}",
-        'numero_propuesta': propuesta.numero_propuesta,
-        'fecha': datetime.now().strftime('%d/%m/%Y'),
-        'cliente': propuesta.cliente,
-        'tipo_servicio': propuesta.tipo_servicio,
-        'origen': propuesta.origen,
-        'destino': propuesta.destino,
-        'distancia_km': propuesta.distancia_km,
-        'fecha_salida': propuesta.fecha_salida.strftime('%d/%m/%Y'),
-        'fecha_retorno': propuesta.fecha_retorno.strftime('%d/%m/%Y'),
-        'tipo_camion': propuesta.tipo_camion,
-        'cantidad_camiones': propuesta.cantidad_camiones,
-        'precio_final': propuesta.precio_final,
-        'condiciones_pago': config.condiciones_pago,
-        'terminos_condiciones': config.terminos_condiciones,
-            'firmado': False,
-            'firma_cliente': None,
-    }
-
-    html_content = render_template('pdf/contrato_template.html', **contexto)
-    html_filename = f"contrato_{propuesta.numero_propuesta}.html"
-    html_path = os.path.join(BASE_DIR, 'documentos_generados', html_filename)
-    os.makedirs(os.path.dirname(html_path), exist_ok=True)
-    
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    file_hash = hashlib.sha256(html_content.encode()).hexdigest()
-    
-    documento = DocumentoGenerado(
-        propuesta_id=propuesta_id,
-        tipo='CONTRATO',
-        version=propuesta.version,
-        archivo_path=html_path,
-        hash_documento=file_hash,
+    html_content = renderizar('CONTRATO', fila, obtener_configuracion())
+    with unidad_de_trabajo() as unidad:
+        file_hash, html_path = guardar_documento(html_content, creados=unidad.archivos)
+        
+        documento = DocumentoGenerado(
+            propuesta_id=propuesta_id,
+            tipo='CONTRATO',
+            version=fila.version,
+            archivo_path=html_path,
+            hash_documento=file_hash,
             firmado=False,
-    )
-    db.session.add(documento)
-    db.session.commit()
+        )
+        db.session.add(documento)
+        db.session.flush()
     return html_path, documento.id
 
 
@@ -232,22 +187,12 @@ def generar_contrato_html(propuesta_id):
 
 @app.route('/')
 @login_required
+@solo_lectura
 def index():
     """Dashboard principal para el director"""
-    propuestas_pregeneradas = Propuesta.query.filter_by(estado='PREGENERADA').count()
-    propuestas_enviadas = Propuesta.query.filter_by(estado='ENVIADA').count()
-    propuestas_aceptadas = Propuesta.query.filter_by(estado='ACEPTADA').count()
-    propuestas_revision = Propuesta.query.filter_by(estado='REVISION').count()
     propuestas_recientes = Propuesta.query.order_by(Propuesta.fecha_creacion.desc()).limit(10).all()
-    
-    stats = {
-        'pregeneradas': propuestas_pregeneradas,
-        'enviadas': propuestas_enviadas,
-        'aceptadas': propuestas_aceptadas,
-        'revision': propuestas_revision,
-        'total': Propuesta.query.count(),
-    }
-    return render_template('dashboard.html', stats=stats, propuestas=propuestas_recientes)
+    stats = obtener_estadisticas()
+    return render_template('dashboard.html', stats=stats, propuestas=propuestas_recientes, estados=ESTADOS)
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -270,26 +215,44 @@ def logout():
 
 @app.route('/propuestas')
 @login_required
+@solo_lectura
 def listar_propuestas():
-    """Lista todas las propuestas con filtros"""
+    """Lista propuestas con filtros, paginadas por cursor sobre (fecha_creacion, id)"""
     estado = request.args.get('estado', None)
     cliente_id = request.args.get('cliente_id', None)
+    cursor = decodificar_cursor(request.args.get('cursor'))
+    por_pagina = tamano_pagina(request.args.get('por_pagina'))
     
-    query = Propuesta.query
+    # Solo columnas del listado y el cliente en el mismo SELECT (evita N+1)
+    query = Propuesta.query.options(
+        load_only(*COLUMNAS_LISTADO),
+        joinedload(Propuesta.cliente).load_only(Cliente.id, Cliente.nombre),
+    )
     
     if estado:
         query = query.filter_by(estado=estado)
     if cliente_id:
         query = query.filter_by(cliente_id=cliente_id)
     
-    propuestas = query.order_by(Propuesta.fecha_creacion.desc()).all()
-    clientes = Cliente.query.all()
-    
-    return render_template('propuestas_listado.html', propuestas=propuestas, clientes=clientes)
+    propuestas, siguiente = paginar_keyset(query, Propuesta.fecha_creacion, Propuesta.id, cursor, por_pagina)
+    # Para el filtro basta con id y nombre
+    clientes = db.session.query(Cliente.id, Cliente.nombre).order_by(Cliente.nombre).all()
+    
+    return render_template(
+        'propuestas_listado.html',
+        propuestas=propuestas,
+        clientes=clientes,
+        estado=estado,
+        cliente_id=cliente_id,
+        por_pagina=por_pagina,
+        cursor_siguiente=siguiente,
+        es_primera_pagina=cursor is None,
+    )
 
 
 @app.route('/propuestas/<propuesta_id>')
 @login_required
+@solo_lectura
 def ver_propuesta(propuesta_id):
     """Detalle de una propuesta específica"""
     propuesta = Propuesta.query.get(propuesta_id)
@@ -304,7 +267,8 @@ def ver_propuesta(propuesta_id):
                          propuesta=propuesta, 
                          versiones=versiones, 
                          respuestas_cliente=respuestas,
-                         documentos=documentos)
+                         documentos=documentos,
+                         ultimo_cambio=ultimo_cambio())
 
 
 @app.route('/propuestas/<propuesta_id>/enviar', methods=['POST'])
@@ -319,41 +283,114 @@ def enviar_propuesta(propuesta_id):
         return jsonify({'error': 'Esta propuesta ya fue enviada'}), 400
     
     try:
-        # Generar documento HTML
-        html_path, documento_id = generar_propuesta_html(propuesta_id)
-        
-        # Actualizar estado
-        propuesta.estado = 'ENVIADA'
-        propuesta.fecha_envio = datetime.utcnow()
-        propuesta.fecha_expiracion = datetime.utcnow() + timedelta(hours=24)
-        
-        # Crear notificación
-        notificacion = Notificacion(
-            propuesta_id=propuesta_id,
-            tipo='ENVIO',
-            destinatario=propuesta.cliente.email,
-            asunto=f'Propuesta de Transporte: {propuesta.numero_propuesta}',
-            mensaje=f'Su propuesta {propuesta.numero_propuesta} está disponible. Válida por 24 horas.',
-            enviada=False,
-        )
-        db.session.add(notificacion)
-        db.session.commit()
-        # Audit: envío de propuesta
-        log_admin_action(propuesta_id, 'ENVIO_PROPUESTA', f'Enlace: {enlace_cliente}')
-        
-        enlace_cliente = url_for('portal_cliente', token=propuesta.token_acceso, _external=True)
+        trabajo = None
+        documento_id = None
+        # Documento, estado, notificación y auditoría en un solo commit
+        with unidad_de_trabajo() as unidad:
+            if app.config['RENDER_ASINCRONO']:
+                # El documento se genera en segundo plano; se persiste con el commit
+                trabajo = encolar_render(propuesta_id)
+                unidad.al_confirmar(notificar_encolado)
+            else:
+                # Generar documento HTML
+                html_path, documento_id = generar_propuesta_html(propuesta_id)
+            
+            # Actualizar estado
+            propuesta.estado = 'ENVIADA'
+            propuesta.fecha_envio = datetime.utcnow()
+            propuesta.fecha_expiracion = datetime.utcnow() + timedelta(hours=24)
+            
+            # Crear notificación
+            notificacion = Notificacion(
+                propuesta_id=propuesta_id,
+                tipo='ENVIO',
+                destinatario=propuesta.cliente.email,
+                asunto=f'Propuesta de Transporte: {propuesta.numero_propuesta}',
+                mensaje=f'Su propuesta {propuesta.numero_propuesta} está disponible. Válida por 24 horas.',
+                enviada=False,
+            )
+            db.session.add(notificacion)
+            
+            enlace_cliente = url_for('portal_cliente', token=propuesta.token_acceso, _external=True)
+            unidad.auditar('ENVIO_PROPUESTA', propuesta_id, f'Enlace: {enlace_cliente}')
+            unidad.al_confirmar(invalidar_estadisticas)
+            unidad.al_confirmar(invalidar_propuestas, propuesta_id)
         
-        return jsonify({
+        respuesta = {
             'success': True,
             'enlace': enlace_cliente,
             'fecha_expiracion': propuesta.fecha_expiracion.isoformat(),
             'documento_id': documento_id,
-        })
+        }
+        if trabajo:
+            respuesta['trabajo_id'] = trabajo.id
+            respuesta['url_estado'] = url_for('estado_trabajo', trabajo_id=trabajo.id)
+            return jsonify(respuesta), 202
+        return jsonify(respuesta)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/propuestas/enviar-lote', methods=['POST'])
+@login_required
+def enviar_lote():
+    """Envía varias propuestas: {"ids": [...]} o {"filtro": {"estado": ..., "cliente_id": ...}}.
+    
+    Responde una línea JSON por propuesta (application/x-ndjson) a medida que
+    cada lote queda confirmado.
+    """
+    datos = request.get_json(silent=True) or {}
+    maximo = app.config['ENVIO_MASIVO_MAX']
+    if 'ids' in datos:
+        ids = datos['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            return jsonify({'error': 'ids debe ser una lista de ids de propuesta'}), 400
+    elif isinstance(datos.get('filtro'), dict):
+        filtro = datos['filtro']
+        if filtro.get('estado') and filtro['estado'] not in ENVIABLES:
+            return jsonify({'error': f'Solo se envían propuestas {" o ".join(ENVIABLES)}'}), 400
+        ids = seleccionar_enviables(filtro.get('estado'), filtro.get('cliente_id'), limite=maximo)
+    else:
+        return jsonify({'error': 'Indique ids o filtro'}), 400
+    if not ids:
+        return jsonify({'error': 'No hay propuestas para enviar'}), 400
+    if len(ids) > maximo:
+        return jsonify({'error': f'Máximo {maximo} propuestas por envío'}), 400
+    
+    lineas = (json.dumps(evento, ensure_ascii=False) + '\n' for evento in enviar_masivo(ids))
+    respuesta = Response(stream_with_context(lineas), mimetype='application/x-ndjson')
+    # Que nginx no acumule el avance hasta el final
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+@app.route('/api/trabajos/<trabajo_id>')
+@login_required
+@solo_lectura
+def estado_trabajo(trabajo_id):
+    """Estado de un trabajo de renderizado en segundo plano"""
+    trabajo = TrabajoRender.query.get(trabajo_id)
+    if not trabajo:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    resultado = {
+        'id': trabajo.id,
+        'propuesta_id': trabajo.propuesta_id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'intentos': trabajo.intentos,
+        'max_intentos': trabajo.max_intentos,
+        'proximo_intento': trabajo.proximo_intento.isoformat() if trabajo.estado == 'PENDIENTE' else None,
+        'documento_id': trabajo.documento_id,
+        'error': trabajo.error,
+    }
+    if trabajo.documento_id:
+        resultado['url_ver'] = url_for('ver_documento', documento_id=trabajo.documento_id, _external=True)
+    return jsonify(resultado)
+
+
 @app.route('/propuestas/<propuesta_id>/modificar', methods=['POST'])
 @login_required
 def modificar_propuesta(propuesta_id):
@@ -403,8 +440,9 @@ def modificar_propuesta(propuesta_id):
         )
         db.session.add(nueva_version)
         db.session.commit()
-        # Audit: modificación de propuesta
-        log_admin_action(propuesta_id, 'MODIFICACION_PROPUESTA', '; '.join(cambios_realizados))
+        invalidar_estadisticas()
+        invalidar_propuestas(propuesta_id)
+        auditar('MODIFICACION_PROPUESTA', propuesta_id, '; '.join(cambios_realizados), usuario=nueva_version.usuario)
         
         return jsonify({
             'success': True,
@@ -422,26 +460,49 @@ def modificar_propuesta(propuesta_id):
 # ============================================
 
 @app.route('/cliente/propuesta/<token>')
+@solo_lectura
 def portal_cliente(token):
     """Portal del cliente para ver y responder propuesta"""
-    propuesta = Propuesta.query.filter_by(token_acceso=token).first()
-    if not propuesta:
+    entrada = resolver_token(token)
+    if not entrada:
         return 'Propuesta no encontrada o enlace inválido', 404
     
-    if propuesta.fecha_expiracion and datetime.utcnow() > propuesta.fecha_expiracion:
-        if propuesta.estado == 'ENVIADA':
-            propuesta.estado = 'PREGENERADA'  # Volver a estado inicial
-            db.session.commit()
-        return render_template('propuesta_expirada.html', propuesta=propuesta)
-    
-    return render_template('portal_cliente.html', propuesta=propuesta)
+    # Solo lectura: el cambio de estado lo hace el barrido de expiración
+    if propuesta_vencida(entrada):
+        return render_template('propuesta_expirada.html', propuesta=entrada)
+    
+    # La página solo cambia con la versión o el estado: se sirve cacheada y con ETag
+    clave = clave_pagina(entrada.id, entrada.version, entrada.estado)
+    if request.if_none_match.contains(clave):
+        registrar_no_modificada()
+        respuesta = Response(status=304)
+    else:
+        def generar():
+            propuesta = Propuesta.query.options(
+                load_only(*COLUMNAS_PORTAL),
+                joinedload(Propuesta.cliente).load_only(Cliente.nombre, Cliente.email, Cliente.telefono),
+            ).filter_by(id=entrada.id).first()
+            return render_template('portal_cliente.html', propuesta=propuesta) if propuesta else None
+        
+        pagina = obtener_pagina(clave, generar)
+        if pagina is None:
+            invalidar_propuestas(entrada.id)
+            return 'Propuesta no encontrada o enlace inválido', 404
+        respuesta = Response(pagina, mimetype='text/html')
+    respuesta.set_etag(clave)
+    # El navegador revalida en cada visita: un cambio de estado se ve de inmediato
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
 
 
 @app.route('/cliente/respuesta/<token>', methods=['POST'])
 def respuesta_cliente(token):
     """Procesa la respuesta del cliente"""
-    propuesta = Propuesta.query.filter_by(token_acceso=token).first()
+    entrada = resolver_token(token)
+    propuesta = db.session.get(Propuesta, entrada.id) if entrada else None
     if not propuesta:
+        if entrada:
+            invalidar_propuestas(entrada.id)
         return jsonify({'error': 'Propuesta no encontrada'}), 404
     
     datos = request.get_json()
@@ -450,52 +511,62 @@ def respuesta_cliente(token):
     if tipo_respuesta not in ['ACEPTADA', 'RECHAZADA', 'REVISION']:
         return jsonify({'error': 'Tipo de respuesta inválida'}), 400
     
+    # Vencida: pendiente de barrido (ENVIADA) o ya devuelta a PREGENERADA con la fecha pasada
+    if propuesta_vencida(propuesta):
+        return jsonify({'error': 'La propuesta expiró'}), 400
+    
     try:
-        # Registrar respuesta
-        respuesta = RespuestaCliente(
-            propuesta_id=propuesta.id,
-            tipo_respuesta=tipo_respuesta,
-            comentarios=datos.get('comentarios', ''),
-        )
-        db.session.add(respuesta)
+        # El contrato abre su propia unidad: anidada en esta, si falla no deshace
+        # la respuesta ni el cambio de estado
+        with unidad_de_trabajo() as unidad:
+            # Registrar respuesta
+            respuesta = RespuestaCliente(
+                propuesta_id=propuesta.id,
+                tipo_respuesta=tipo_respuesta,
+                comentarios=datos.get('comentarios', ''),
+            )
+            db.session.add(respuesta)
         
-        propuesta.estado = tipo_respuesta
-        propuesta.fecha_respuesta = datetime.utcnow()
+            anterior = propuesta.estado
+            propuesta.estado = tipo_respuesta
+            propuesta.fecha_respuesta = datetime.utcnow()
+            # Se confirma con el cambio y llega en vivo al dashboard (app/eventos.py)
+            registrar_cambio(propuesta, anterior)
         
-        resultado = {'success': True, 'mensaje': f'Respuesta registrada como {tipo_respuesta}'}
+            resultado = {'success': True, 'mensaje': f'Respuesta registrada como {tipo_respuesta}'}
         
-        # Si acepta, generar contrato
-        if tipo_respuesta == 'ACEPTADA':
-            try:
-                html_path, documento_id = generar_contrato_html(propuesta.id)
-                resultado['contrato_generado'] = True
-                resultado['contrato_id'] = documento_id
+            # Si acepta, generar contrato
+            if tipo_respuesta == 'ACEPTADA':
+                try:
+                    html_path, documento_id = generar_contrato_html(propuesta.id)
+                    resultado['contrato_generado'] = True
+                    resultado['contrato_id'] = documento_id
                 
-                # Notificar a operaciones
+                    # Notificar a operaciones
+                    notificacion = Notificacion(
+                        propuesta_id=propuesta.id,
+                        tipo='ACEPTACION',
+                        destinatario='operaciones@acmetrans.cl',
+                        asunto=f'PROPUESTA ACEPTADA: {propuesta.numero_propuesta}',
+                        mensaje=f'Cliente {propuesta.cliente.nombre} aceptó la propuesta. Reservar recursos inmediatamente.',
+                    )
+                    db.session.add(notificacion)
+                except Exception as e:
+                    print(f"Error generando contrato: {e}")
+                    resultado['error_contrato'] = str(e)
+        
+            # Si pide revisión, notificar al director
+            elif tipo_respuesta == 'REVISION':
                 notificacion = Notificacion(
                     propuesta_id=propuesta.id,
-                    tipo='ACEPTACION',
-                    destinatario='operaciones@acmetrans.cl',
-                    asunto=f'PROPUESTA ACEPTADA: {propuesta.numero_propuesta}',
-                    mensaje=f'Cliente {propuesta.cliente.nombre} aceptó la propuesta. Reservar recursos inmediatamente.',
+                    tipo='REVISION',
+                    destinatario='director@acmetrans.cl',
+                    asunto=f'Solicitud de revisión: {propuesta.numero_propuesta}',
+                    mensaje=f'Cliente solicita revisión: {datos.get("comentarios", "Sin comentarios")}',
                 )
                 db.session.add(notificacion)
-            except Exception as e:
-                print(f"Error generando contrato: {e}")
-                resultado['error_contrato'] = str(e)
         
-        # Si pide revisión, notificar al director
-        elif tipo_respuesta == 'REVISION':
-            notificacion = Notificacion(
-                propuesta_id=propuesta.id,
-                tipo='REVISION',
-                destinatario='director@acmetrans.cl',
-                asunto=f'Solicitud de revisión: {propuesta.numero_propuesta}',
-                mensaje=f'Cliente solicita revisión: {datos.get("comentarios", "Sin comentarios")}',
-            )
-            db.session.add(notificacion)
-        
-        db.session.commit()
+            unidad.al_confirmar(invalidar_propuestas, propuesta.id)
         return jsonify(resultado)
         
     except Exception as e:
@@ -503,72 +574,66 @@ def respuesta_cliente(token):
         return jsonify({'error': str(e)}), 500
 
 
+def respuesta_firma(documento, mensaje):
+    return jsonify({
+        'success': True,
+        'mensaje': mensaje,
+        'fecha_firma': documento.fecha_firma.isoformat() if documento.fecha_firma else None,
+        'contrato_id': documento.id,
+        'url_ver': url_for('ver_documento', documento_id=documento.id, _external=True),
+        'url_descarga': url_for('descargar_documento', documento_id=documento.id, _external=True)
+    })
+
+
 @app.route('/cliente/firmar/<token>/<documento_id>', methods=['POST'])
 def firmar_contrato(token, documento_id):
     """Firma digital simulada del contrato"""
-    propuesta = Propuesta.query.filter_by(token_acceso=token).first()
-    if not propuesta:
+    entrada = resolver_token(token)
+    if not entrada:
         return jsonify({'error': 'Propuesta no encontrada'}), 404
     
     documento = DocumentoGenerado.query.get(documento_id)
-    if not documento or documento.propuesta_id != propuesta.id:
+    if not documento or documento.propuesta_id != entrada.id:
         return jsonify({'error': 'Documento no encontrado'}), 404
     
     if documento.tipo != 'CONTRATO':
         return jsonify({'error': 'Solo se pueden firmar contratos'}), 400
     
+    # Reintento (doble clic, red): sin volver a notificar ni contar otra firma
+    if documento.firmado:
+        return respuesta_firma(documento, 'El contrato ya estaba firmado')
+    
     try:
-        datos = request.get_json()
-        # regenerar contrato con ambas firmas visibles
-        firma_cliente = datos.get('firma', 'Cliente')
-
-        # Renderizar nuevamente el contrato con indicadores de firma
-        config = obtener_configuracion()
-        contexto = {
-            'numero_contrato': f"CONT-{propuesta.numero_propuesta}",
-            'numero_propuesta': propuesta.numero_propuesta,
-            'fecha': datetime.now().strftime('%d/%m/%Y'),
-            'cliente': propuesta.cliente,
-            'tipo_servicio': propuesta.tipo_servicio,
-            'origen': propuesta.origen,
-            'destino': propuesta.destino,
-            'distancia_km': propuesta.distancia_km,
-            'fecha_salida': propuesta.fecha_salida.strftime('%d/%m/%Y') if propuesta.fecha_salida else '',
-            'fecha_retorno': propuesta.fecha_retorno.strftime('%d/%m/%Y') if propuesta.fecha_retorno else '',
-            'tipo_camion': propuesta.tipo_camion,
-            'cantidad_camiones': propuesta.cantidad_camiones,
-            'precio_final': propuesta.precio_final,
-            'condiciones_pago': config.condiciones_pago,
-            'terminos_condiciones': config.terminos_condiciones,
-            'firmado': True,
-            'firma_cliente': firma_cliente,
-        }
-        html_content = render_template('pdf/contrato_template.html', **contexto)
-        # sobrescribir archivo existente para que ambas partes vean el contrato firmado
-        with open(documento.archivo_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        documento.firmado = True
-        documento.fecha_firma = datetime.utcnow()
-        
-        # Notificar firma
-        notificacion = Notificacion(
-            propuesta_id=propuesta.id,
-            tipo='FIRMA',
-            destinatario='operaciones@acmetrans.cl',
-            asunto=f'Contrato firmado: {propuesta.numero_propuesta}',
-            mensaje=f'Contrato firmado por {propuesta.cliente.nombre}. Firma simulada: {datos.get("firma", "Digital")}',
-        )
-        db.session.add(notificacion)
-        db.session.commit()
+        with unidad_de_trabajo() as unidad:
+            propuesta = db.session.get(Propuesta, entrada.id)
+            datos = request.get_json()
+            # regenerar contrato con ambas firmas visibles
+            firma_cliente = datos.get('firma', 'Cliente')
+
+            # Renderizar nuevamente el contrato con indicadores de firma
+            fila = proyectar([propuesta.id])[propuesta.id]
+            html_content = renderizar('CONTRATO', fila, obtener_configuracion(), firma_cliente=firma_cliente)
+            # El objeto sin firmar puede estar compartido: se guarda uno nuevo y se
+            # reapunta el documento para que ambas partes vean el contrato firmado
+            documento.hash_documento, documento.archivo_path = guardar_documento(
+                html_content, creados=unidad.archivos
+            )
+            documento.firmado = True
+            documento.fecha_firma = datetime.utcnow()
         
-        return jsonify({
-            'success': True,
-            'mensaje': 'Contrato firmado exitosamente',
-            'fecha_firma': documento.fecha_firma.isoformat(),
-            'contrato_id': documento.id,
-            'url_ver': url_for('ver_documento', documento_id=documento.id, _external=True),
-            'url_descarga': url_for('descargar_documento', documento_id=documento.id, _external=True)
-        })
+            # Notificar firma
+            notificacion = Notificacion(
+                propuesta_id=propuesta.id,
+                tipo='FIRMA',
+                destinatario='operaciones@acmetrans.cl',
+                asunto=f'Contrato firmado: {propuesta.numero_propuesta}',
+                mensaje=f'Contrato firmado por {propuesta.cliente.nombre}. Firma simulada: {datos.get("firma", "Digital")}',
+            )
+            db.session.add(notificacion)
+            # contratos_firmados del dashboard se ajusta al publicar la firma
+            registrar_cambio(propuesta, propuesta.estado, tipo='FIRMA')
+
+        return respuesta_firma(documento, 'Contrato firmado exitosamente')
         
     except Exception as e:
         db.session.rollback()
@@ -579,51 +644,140 @@ def firmar_contrato(token, documento_id):
 # RUTAS - DESCARGA DE DOCUMENTOS
 # ============================================
 
+def nombre_descarga(documento):
+    """Nombre legible del archivo (en disco el objeto se llama por su hash)"""
+    numero = db.session.query(Propuesta.numero_propuesta).filter_by(id=documento.propuesta_id).scalar()
+    extension = os.path.splitext(documento.archivo_path)[1] or '.html'
+    if documento.tipo == 'CONTRATO':
+        return f"contrato_{numero}{extension}"
+    return f"propuesta_{numero}_v{documento.version}{extension}"
+
+
+def etag_documento(documento, codificacion='identity'):
+    """ETag fuerte: el hash del contenido, distinto por cada Content-Encoding"""
+    extension = os.path.splitext(documento.archivo_path)[1]
+    # Archivos planos anteriores al almacén: el hash puede no reflejar el archivo
+    if not documento.hash_documento or documento.archivo_path != ruta_objeto(documento.hash_documento, extension):
+        return None
+    if codificacion == 'identity':
+        return documento.hash_documento
+    return f"{documento.hash_documento}-{codificacion}"
+
+
+def _cabeceras_cache(respuesta, documento):
+    if documento.tipo == 'PROPUESTA':
+        # Cada versión es un objeto nuevo con su propio id: el contenido nunca cambia
+        respuesta.cache_control.private = True
+        respuesta.cache_control.max_age = 31536000
+        respuesta.cache_control.immutable = True
+    else:
+        # El contrato cambia al firmarse: revalidar siempre (su ETag cambia con la firma)
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+    respuesta.last_modified = documento.fecha_firma or documento.fecha_generacion
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+def no_modificado(documento):
+    """Respuesta 304 si el cliente ya tiene esta versión; se decide sin tocar el disco"""
+    if etag_documento(documento) is None:
+        return None
+    if request.if_none_match:
+        for codificacion in SUFIJOS:
+            etag = etag_documento(documento, codificacion)
+            if request.if_none_match.contains(etag):
+                break
+        else:
+            return None
+    elif request.if_modified_since:
+        modificado = (documento.fecha_firma or documento.fecha_generacion).replace(microsecond=0, tzinfo=timezone.utc)
+        if modificado > request.if_modified_since:
+            return None
+        etag = etag_documento(documento)
+    else:
+        return None
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag)
+    return _cabeceras_cache(respuesta, documento)
+
+
+def servir_documento(documento, presentes, adjunto=False):
+    """Entrega la variante comprimida que el cliente acepte; si no acepta ninguna, descomprime por bloques"""
+    nombre = nombre_descarga(documento) if adjunto else None
+    tipo_mime = mimetypes.guess_type(documento.archivo_path)[0] or 'text/html'
+    for codificacion, ruta in presentes.items():
+        if codificacion == 'identity' or request.accept_encodings[codificacion] > 0:
+            # sendfile/mmap sin copiar el archivo a memoria, con soporte de Range
+            respuesta = enviar_archivo(
+                ruta, mimetype=tipo_mime, as_attachment=adjunto, download_name=nombre,
+                etag=etag_documento(documento, codificacion) or True,
+            )
+            # Werkzeug solo lo indica en las respuestas 206; se anuncia siempre
+            respuesta.accept_ranges = 'bytes'
+            if codificacion != 'identity':
+                respuesta.headers['Content-Encoding'] = codificacion
+            break
+    else:
+        codificacion = next(iter(presentes))
+        respuesta = Response(iterar_documento(documento.archivo_path, codificacion), mimetype=tipo_mime)
+        if etag_documento(documento):
+            respuesta.set_etag(etag_documento(documento))
+        if adjunto:
+            respuesta.headers.set('Content-Disposition', 'attachment', filename=nombre)
+    return _cabeceras_cache(respuesta, documento)
+
+
 @app.route('/documentos/ver/<documento_id>')
+@solo_lectura
 def ver_documento(documento_id):
     """Visualiza un documento HTML"""
     documento = DocumentoGenerado.query.get(documento_id)
     if not documento:
         return "Documento no encontrado", 404
     
-    if not os.path.exists(documento.archivo_path):
-        return "Archivo no encontrado en el servidor", 404
+    respuesta = no_modificado(documento)
+    if respuesta:
+        return respuesta
     
-    with open(documento.archivo_path, 'r', encoding='utf-8') as f:
-        contenido = f.read()
+    presentes = variantes(documento.archivo_path)
+    if not presentes:
+        return "Archivo no encontrado en el servidor", 404
     
-    return contenido
+    return servir_documento(documento, presentes)
 
 
 @app.route('/documentos/descargar/<documento_id>')
+@solo_lectura
 def descargar_documento(documento_id):
     """Descarga un documento"""
     documento = DocumentoGenerado.query.get(documento_id)
     if not documento:
         return "Documento no encontrado", 404
     
-    if not os.path.exists(documento.archivo_path):
+    respuesta = no_modificado(documento)
+    if respuesta:
+        return respuesta
+    
+    presentes = variantes(documento.archivo_path)
+    if not presentes:
         return "Archivo no encontrado", 404
     
-    return send_file(
-        documento.archivo_path,
-        as_attachment=True,
-        download_name=os.path.basename(documento.archivo_path),
-        mimetype='text/html',
-    )
+    return servir_documento(documento, presentes, adjunto=True)
 
 
 @app.route('/cliente/documentos/<token>')
+@solo_lectura
 def documentos_cliente(token):
     """Lista documentos disponibles para el cliente"""
-    propuesta = Propuesta.query.filter_by(token_acceso=token).first()
-    if not propuesta:
+    entrada = resolver_token(token)
+    if not entrada:
         return jsonify({'error': 'Propuesta no encontrada'}), 404
     
-    documentos = DocumentoGenerado.query.filter_by(propuesta_id=propuesta.id).order_by(DocumentoGenerado.fecha_generacion.desc()).all()
+    documentos = DocumentoGenerado.query.filter_by(propuesta_id=entrada.id).order_by(DocumentoGenerado.fecha_generacion.desc()).all()
     
     return jsonify({
-        'propuesta_numero': propuesta.numero_propuesta,
+        'propuesta_numero': entrada.numero_propuesta,
         'documentos': [
             {
                 'id': doc.id,
@@ -640,11 +794,187 @@ def documentos_cliente(token):
     })
 
 
+# ============================================
+# RUTAS - GESTIÓN DE COSTOS INDIRECTOS
+# ============================================
+
+@app.route('/costos-indirectos')
+@login_required
+@solo_lectura
+def listar_costos():
+    """Listar costos indirectos"""
+    costos = CostoIndirecto.query.order_by(CostoIndirecto.año.desc(), CostoIndirecto.mes.desc()).all()
+    return render_template('costos_indirectos.html', costos=costos, promedio=costo_indirecto_promedio())
+
+
+@app.route('/costos-indirectos/agregar', methods=['POST'])
+@login_required
+def agregar_costo():
+    """Agregar nuevo costo indirecto (los agregados se actualizan en la misma transacción)"""
+    datos = request.get_json()
+    
+    try:
+        costo = CostoIndirecto(
+            mes=int(datos['mes']),
+            año=int(datos['año']),
+            monto=float(datos['monto']),
+            descripcion=datos.get('descripcion', ''),
+            usuario=datos.get('usuario', 'Admin')
+        )
+        
+        db.session.add(costo)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'costo_id': costo.id})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# Rechazos incluidos en la respuesta; el total va en el resumen
+MAX_RECHAZOS_RESPUESTA = 100
+
+
+@app.route('/costos-indirectos/importar', methods=['POST'])
+@login_required
+def importar_costos_indirectos():
+    """Importación masiva desde CSV o JSON Lines (campo `archivo` o cuerpo crudo con ?formato=csv|jsonl)"""
+    archivo = request.files.get('archivo')
+    try:
+        if archivo is not None:
+            formato = request.form.get('formato') or detectar_formato(archivo.filename)
+            flujo = archivo.stream
+        else:
+            formato = request.args.get('formato', 'csv')
+            flujo = request.stream
+        filas = leer_filas(flujo, formato)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rechazos = []
+    
+    def al_rechazar(linea, fila, motivo):
+        if len(rechazos) < MAX_RECHAZOS_RESPUESTA:
+            rechazos.append({'linea': linea, 'motivo': motivo})
+    
+    try:
+        resumen = importar_costos(filas, usuario=request.form.get('usuario', 'Admin'), al_rechazar=al_rechazar)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'El archivo debe estar codificado en UTF-8'}), 400
+    
+    return jsonify({'success': True, **resumen, 'rechazos': rechazos})
+
+
+@app.route('/api/costos-indirectos/ventana')
+@login_required
+@solo_lectura
+def api_ventana_costos():
+    """Suma, cantidad y promedio de costos indirectos entre dos meses (?desde=YYYY-MM&hasta=YYYY-MM)"""
+    try:
+        desde = datetime.strptime(request.args['desde'], '%Y-%m')
+        hasta = datetime.strptime(request.args['hasta'], '%Y-%m')
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Parámetros desde/hasta requeridos con formato YYYY-MM'}), 400
+    
+    ventana = consultar_ventana(desde, hasta)
+    return jsonify({
+        'desde': desde.strftime('%Y-%m'),
+        'hasta': hasta.strftime('%Y-%m'),
+        'suma': ventana.suma,
+        'cantidad': ventana.cantidad,
+        'promedio': ventana.promedio,
+    })
+
+
+@app.route('/api/cache-tokens')
+@login_required
+def api_cache_tokens():
+    """Aciertos, fallos y tamaño de la caché de tokens del portal (este proceso)"""
+    return jsonify(metricas_tokens())
+
+
+@app.route('/api/cache-portal')
+@login_required
+def api_cache_portal():
+    """Aciertos por nivel, renders y respuestas 304 de la caché de páginas del portal (este proceso)"""
+    return jsonify(metricas_portal())
+
+
+@app.route('/eventos')
+@login_required
+def eventos():
+    """Cambios de estado en vivo (text/event-stream). ?propuesta_id= limita a una propuesta;
+    ?desde= (o la cabecera Last-Event-ID al reconectar) repite los cambios posteriores a ese id
+    """
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    try:
+        desde = int(desde) if desde else None
+    except ValueError:
+        return jsonify({'error': 'desde debe ser un id de evento'}), 400
+    
+    # Se suscribe antes de leer los perdidos: lo que se confirme entre medio no se pierde
+    suscripcion = suscribir(request.args.get('propuesta_id'))
+    if suscripcion is None:
+        respuesta = jsonify({'error': 'Demasiadas conexiones de eventos', 'conexiones': conexiones()})
+        respuesta.status_code = 503
+        respuesta.headers['Retry-After'] = '30'
+        return respuesta
+    
+    respuesta = Response(stream_with_context(transmitir(suscripcion, desde)), mimetype='text/event-stream')
+    # También si la respuesta se cierra sin llegar a transmitir
+    respuesta.call_on_close(lambda: cancelar(suscripcion))
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+@app.route('/api/auditoria')
+@login_required
+@solo_lectura
+def api_auditoria():
+    """Eventos de auditoría (?propuesta_id=&accion=&desde=&hasta=&cursor=), más recientes primero"""
+    try:
+        desde = datetime.fromisoformat(request.args['desde']) if request.args.get('desde') else None
+        hasta = datetime.fromisoformat(request.args['hasta']) if request.args.get('hasta') else None
+    except ValueError:
+        return jsonify({'error': 'desde/hasta deben tener formato ISO (YYYY-MM-DD o YYYY-MM-DDTHH:MM)'}), 400
+    cursor = decodificar_cursor(request.args.get('cursor'))
+    # Los ids de auditoría son enteros: un cursor del listado de propuestas (UUID) no sirve aquí
+    if request.args.get('cursor') and (cursor is None or not cursor[1].isdigit()):
+        return jsonify({'error': 'cursor inválido'}), 400
+    
+    eventos, siguiente = consultar_auditoria(
+        propuesta_id=request.args.get('propuesta_id'),
+        accion=request.args.get('accion'),
+        desde=desde,
+        hasta=hasta,
+        cursor=cursor,
+        limite=tamano_pagina(request.args.get('por_pagina')),
+    )
+    return jsonify({
+        'eventos': [
+            {
+                'id': e.id,
+                'fecha': e.fecha.isoformat(),
+                'accion': e.accion,
+                'propuesta_id': e.propuesta_id,
+                'usuario': e.usuario,
+                'ip': e.ip,
+                'detalle': e.detalle,
+            }
+            for e in eventos
+        ],
+        'cursor_siguiente': siguiente,
+    })
+
+
 # ============================================
 # RUTAS - API REST
 # ============================================
 
 @app.route('/api/clientes')
+@solo_lectura
 def api_clientes():
     """API para obtener lista de clientes"""
     clientes = Cliente.query.all()
@@ -660,18 +990,10 @@ def api_clientes():
 
 
 @app.route('/api/propuestas/estadisticas')
+@solo_lectura
 def api_estadisticas():
     """API con estadísticas del sistema"""
-    stats = {
-        'total': Propuesta.query.count(),
-        'pregeneradas': Propuesta.query.filter_by(estado='PREGENERADA').count(),
-        'enviadas': Propuesta.query.filter_by(estado='ENVIADA').count(),
-        'aceptadas': Propuesta.query.filter_by(estado='ACEPTADA').count(),
-        'rechazadas': Propuesta.query.filter_by(estado='RECHAZADA').count(),
-        'revision': Propuesta.query.filter_by(estado='REVISION').count(),
-    }
-    
-    # Contratos firmados
-    stats['contratos_firmados'] = DocumentoGenerado.query.filter_by(tipo='CONTRATO', firmado=True).count()
+    # Conteos por estado y contratos firmados (cacheados con TTL corto)
+    stats = obtener_estadisticas()
     
     return jsonify(stats)
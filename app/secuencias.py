@@ -0,0 +1,92 @@
+"""
+Asignación de numero_propuesta con contador por período (YYYYMM).
+
+Reemplaza Propuesta.query.count() + 1: cada reserva es un UPDATE sobre una
+sola fila de secuencias_propuesta, por lo que no recorre la tabla de
+propuestas y dos creadores concurrentes nunca obtienen el mismo número.
+Se pueden reservar bloques de N números en una transacción.
+"""
+from datetime import datetime
+
+from sqlalchemy import Integer, cast, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Propuesta, SecuenciaPropuesta
+
+_tabla = SecuenciaPropuesta.__table__
+
+
+def prefijo_periodo(periodo):
+    return f"PROP-{periodo}-"
+
+
+def formatear_numero(periodo, valor):
+    return f"{prefijo_periodo(periodo)}{valor:04d}"
+
+
+def _crear_contador(conn, periodo):
+    """Crea el contador del período partiendo del mayor número ya usado"""
+    prefijo = prefijo_periodo(periodo)
+    existente = select(
+        func.coalesce(func.max(cast(func.substr(Propuesta.numero_propuesta, len(prefijo) + 1), Integer)), 0)
+    ).where(Propuesta.numero_propuesta.like(prefijo + '%')).scalar_subquery()
+    valores = {'periodo': periodo, 'ultimo': existente}
+
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        if conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        conn.execute(insert_dialecto(_tabla).values(**valores).on_conflict_do_nothing())
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(_tabla).values(**valores))
+    except IntegrityError:
+        pass  # otro proceso lo creó primero
+
+
+def _incrementar(conn, periodo, cantidad):
+    resultado = conn.execute(
+        update(_tabla).where(_tabla.c.periodo == periodo).values(ultimo=_tabla.c.ultimo + cantidad)
+    )
+    if resultado.rowcount == 0:
+        return None
+    # La fila queda bloqueada por el UPDATE hasta el commit
+    return conn.execute(select(_tabla.c.ultimo).where(_tabla.c.periodo == periodo)).scalar_one()
+
+
+def reservar_numeros(cantidad=1, fecha=None, conexion=None):
+    """Reserva `cantidad` números consecutivos del período de `fecha` (hoy por defecto).
+
+    Sin `conexion` usa una transacción propia que se confirma de inmediato
+    (como una secuencia: si la creación posterior falla queda un hueco);
+    debe llamarse antes de escribir en la sesión para no esperar su propio
+    bloqueo en SQLite. Con `conexion` la reserva forma parte de la
+    transacción del llamador y se revierte con ella.
+    """
+    if cantidad < 1:
+        return []
+    periodo = (fecha or datetime.now()).strftime('%Y%m')
+
+    def _reservar(conn):
+        # El UPDATE va primero: en SQLite la transacción arranca escribiendo
+        # y espera el busy_timeout en lugar de fallar por interbloqueo
+        ultimo = _incrementar(conn, periodo, cantidad)
+        if ultimo is None:
+            _crear_contador(conn, periodo)
+            ultimo = _incrementar(conn, periodo, cantidad)
+        return ultimo
+
+    if conexion is not None:
+        ultimo = _reservar(conexion)
+    else:
+        with db.engine.begin() as conn:
+            ultimo = _reservar(conn)
+    return [formatear_numero(periodo, valor) for valor in range(ultimo - cantidad + 1, ultimo + 1)]
+
+
+def reservar_numero(fecha=None, conexion=None):
+    """Atajo para reservar un único numero_propuesta"""
+    return reservar_numeros(1, fecha=fecha, conexion=conexion)[0]
@@ -56,6 +56,22 @@ function mostrarNotificacion(mensaje, tipo = 'info', duracion = 3000) {
     }, duracion);
 }
 
+/**
+ * Escuchar los cambios de estado en vivo (/eventos, Server-Sent Events).
+ * manejadores: {estado, firma, resincronizar}. Al cortarse la conexión el
+ * navegador reconecta solo y retoma desde el último evento recibido.
+ */
+function escucharEventos(parametros, manejadores) {
+    if (!window.EventSource) {
+        return null;
+    }
+    const fuente = new EventSource('/eventos?' + new URLSearchParams(parametros));
+    for (const [tipo, manejador] of Object.entries(manejadores)) {
+        fuente.addEventListener(tipo, evento => manejador(JSON.parse(evento.data)));
+    }
+    return fuente;
+}
+
 /**
  * Enviar propuesta al cliente
  */
@@ -0,0 +1,75 @@
+"""
+Envío de archivos sin copiarlos a memoria.
+
+enviar_archivo() delega en send_file de Flask, que ya resuelve Range,
+If-Range y las cabeceras condicionales. Lo que cambia es el envoltorio
+del archivo:
+
+- Si el servidor WSGI ofrece wsgi.file_wrapper (gunicorn, uWSGI) se usa
+  el suyo, que transmite con sendfile() sin pasar por Python.
+- Si no lo ofrece, o si la petición trae Range (el envoltorio del
+  servidor no admite seek y obligaría a leer desde el inicio), se usa
+  ArchivoMapeado: un mmap del archivo recorrido por bloques, de modo que
+  los datos salen de la caché de páginas del sistema y cada vista
+  retiene a lo sumo un bloque en memoria.
+
+Con USE_X_SENDFILE, Flask delega el envío completo al proxy (nginx/Apache).
+"""
+import os
+import mmap
+
+from flask import request, send_file
+
+# Bytes entregados por iteración al servidor WSGI
+TAMANO_BLOQUE = 256 * 1024
+
+
+class ArchivoMapeado:
+    """wsgi.file_wrapper basado en mmap, con seek para servir rangos"""
+
+    def __init__(self, archivo, tamano_bloque=TAMANO_BLOQUE):
+        self.archivo = archivo
+        self.tamano_bloque = max(tamano_bloque, TAMANO_BLOQUE)
+        self.tamano = os.fstat(archivo.fileno()).st_size
+        # mmap no admite archivos vacíos
+        self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) if self.tamano else None
+        if self._mapa is not None and hasattr(self._mapa, 'madvise'):
+            self._mapa.madvise(mmap.MADV_SEQUENTIAL)
+        self._posicion = 0
+
+    def seekable(self):
+        return True
+
+    def seek(self, posicion, desde=os.SEEK_SET):
+        if desde == os.SEEK_CUR:
+            posicion += self._posicion
+        elif desde == os.SEEK_END:
+            posicion += self.tamano
+        self._posicion = min(max(posicion, 0), self.tamano)
+
+    def tell(self):
+        return self._posicion
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._posicion >= self.tamano:
+            raise StopIteration()
+        fin = min(self._posicion + self.tamano_bloque, self.tamano)
+        bloque = self._mapa[self._posicion:fin]
+        self._posicion = fin
+        return bloque
+
+    def close(self):
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self.archivo.close()
+
+
+def enviar_archivo(ruta, **kwargs):
+    """send_file con sendfile del servidor o mmap por bloques; admite Range"""
+    if 'wsgi.file_wrapper' not in request.environ or request.range:
+        request.environ['wsgi.file_wrapper'] = ArchivoMapeado
+    return send_file(ruta, **kwargs)
@@ -0,0 +1,111 @@
+"""
+Unidad de trabajo: varias escrituras de una acción en un solo commit.
+
+enviar_propuesta hacía tres commits (el documento en
+generar_propuesta_html, el cambio de estado con la notificación y la
+auditoría): tres fsync por envío y, si algo fallaba a la mitad, un
+documento sin envío o un envío sin auditoría. Dentro de
+`with unidad_de_trabajo() as unidad:`:
+- las filas se agregan a db.session y se confirman juntas al salir del
+  bloque, con un único commit;
+- unidad.auditar() inserta el evento en esa misma transacción (no pasa
+  por el buffer del hilo escritor);
+- los archivos que el almacén publica para la unidad ya tienen fsync; antes
+  del commit se sincronizan también sus directorios, para que ninguna fila
+  confirmada apunte a un archivo que un corte de luz pueda perder;
+- si el bloque o el commit fallan se hace rollback y se borran los archivos
+  creados que ninguna fila confirmada referencia;
+- unidad.al_confirmar() deja acciones (invalidar cachés, despertar
+  despachadores) para después del commit: no corren si se deshace.
+Las unidades se anidan: generar_propuesta_html abre la suya y, llamada
+desde enviar_propuesta, se suma a la de la ruta en vez de confirmar.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import insert, select
+
+from . import db
+from .auditoria import evento_auditoria
+from .models import DocumentoGenerado, EventoAuditoria
+
+_auditoria = EventoAuditoria.__table__
+_actual = threading.local()
+
+
+def _sincronizar_directorio(directorio):
+    """fsync de la entrada del directorio: hace durable el os.replace del archivo"""
+    if os.name == 'nt':
+        # Windows no abre directorios; NTFS registra el renombrado en su journal
+        return
+    fd = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class UnidadDeTrabajo:
+    def __init__(self):
+        self.archivos = []
+        self.eventos = []
+        self._pendientes = []
+
+    def auditar(self, accion, propuesta_id=None, detalle=None, usuario=None):
+        """Evento de auditoría que se confirma junto con la unidad"""
+        self.eventos.append(evento_auditoria(accion, propuesta_id, detalle, usuario))
+
+    def al_confirmar(self, funcion, *args):
+        """Ejecutar funcion(*args) solo si la unidad se confirma"""
+        self._pendientes.append((funcion, args))
+
+    def _confirmar(self):
+        for directorio in sorted({os.path.dirname(ruta) for ruta in self.archivos}):
+            _sincronizar_directorio(directorio)
+        if self.eventos:
+            db.session.execute(insert(_auditoria), self.eventos)
+        db.session.commit()
+
+    def _deshacer(self):
+        db.session.rollback()
+        if not self.archivos:
+            return
+        # El almacén comparte objetos por hash: otro envío pudo confirmar el mismo contenido
+        hashes = {os.path.basename(ruta).split('.', 1)[0] for ruta in self.archivos}
+        referenciados = set(db.session.execute(
+            select(DocumentoGenerado.hash_documento).where(DocumentoGenerado.hash_documento.in_(hashes))
+        ).scalars())
+        for ruta in self.archivos:
+            if os.path.basename(ruta).split('.', 1)[0] in referenciados:
+                continue
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+    def _ejecutar_pendientes(self):
+        for funcion, args in self._pendientes:
+            funcion(*args)
+
+
+@contextmanager
+def unidad_de_trabajo():
+    """Abre una unidad, o se suma a la que ya está abierta en este hilo"""
+    actual = getattr(_actual, 'unidad', None)
+    if actual is not None:
+        # Anidada: la unidad exterior confirma o deshace todo
+        yield actual
+        return
+
+    unidad = UnidadDeTrabajo()
+    _actual.unidad = unidad
+    try:
+        yield unidad
+        unidad._confirmar()
+    except BaseException:
+        unidad._deshacer()
+        raise
+    finally:
+        _actual.unidad = None
+    unidad._ejecutar_pendientes()
@@ -0,0 +1,27 @@
+"""
+Punto de entrada ASGI: la aplicación Flask (WSGI) envuelta para uvicorn.
+Ejecutar con: python servidor.py --servidor uvicorn
+
+Usa asgiref.wsgi.WsgiToAsgi si está instalado y, si no, el adaptador WSGI
+que trae uvicorn. Las vistas siguen siendo síncronas: corren en el pool de
+hilos del adaptador.
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.produccion import preparar_worker
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    from uvicorn.middleware.wsgi import WSGIMiddleware as WsgiToAsgi
+
+application = WsgiToAsgi(app)
+
+# uvicorn --workers importa este módulo en cada proceso (spawn, sin fork)
+if os.environ.get('MGCP_WORKER_UVICORN') == '1':
+    preparar_worker()
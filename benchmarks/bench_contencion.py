@@ -0,0 +1,153 @@
+"""
+Contención en SQLite: escritores y lectores concurrentes con las opciones
+por defecto del motor (rollback journal, sin busy_timeout) contra la
+configuración de app/base_datos.py (WAL, busy_timeout, synchronous=NORMAL,
+mmap y pool).
+
+Cada variante usa su propio archivo temporal con el esquema de la
+aplicación. N hilos escritores actualizan propuestas y registran eventos
+de auditoría en transacciones cortas; M hilos lectores listan propuestas
+como el panel. Informa escrituras/s, lecturas/s, errores
+"database is locked" y p99 de cada operación.
+
+Ejecutar con: python benchmarks/bench_contencion.py [--escritores 4] [--lectores 8] [--segundos 5]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'app.db').replace('\\', '/')
+
+from app import app, db  # noqa: E402
+from app.base_datos import instalar_pragmas, opciones_motor  # noqa: E402
+from app.models import Cliente, EventoAuditoria, Propuesta  # noqa: E402
+
+PROPUESTAS = 500
+_propuestas = Propuesta.__table__
+_auditoria = EventoAuditoria.__table__
+
+
+def crear_motor(nombre, ajustado):
+    url = 'sqlite:///' + os.path.join(TMP_DIR, f'{nombre}.db').replace('\\', '/')
+    if not ajustado:
+        # Lo que usaba la aplicación antes: opciones por defecto de SQLAlchemy
+        return create_engine(url, connect_args={'check_same_thread': False})
+    motor = create_engine(url, **opciones_motor(url, app.config))
+    instalar_pragmas(motor, app.config)
+    return motor
+
+
+def sembrar(motor):
+    db.metadata.create_all(motor)
+    with motor.begin() as conn:
+        cliente_id = conn.execute(insert(Cliente.__table__).values(
+            nombre='Compras Contención', email='compras@example.cl')).inserted_primary_key[0]
+        conn.execute(insert(_propuestas), [dict(
+            cliente_id=cliente_id, numero_propuesta=f'PROP-CON-{i:04d}', tipo_servicio='Benchmark',
+            origen='Santiago', destino='Valparaíso', distancia_km=120, tiempo_estimado_horas=2, peso_kg=1000,
+            volumen_m3=10, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1), fecha_retorno=datetime(2025, 12, 2),
+            costo_combustible=50000, costo_peajes=8000, costo_viaticos=10000, costo_hospedaje=0, tarifa_base=200000,
+            costo_directo=268000, costo_indirecto_aplicado=40000, descripcion_servicio='Benchmark',
+            utilidad_porcentaje=30.0, precio_final=390000,
+            estado='PREGENERADA', token_acceso=f'token-con-{i}', fecha_creacion=datetime.utcnow(),
+        ) for i in range(PROPUESTAS)])
+        return conn.execute(select(_propuestas.c.id)).scalars().all()
+
+
+def medir(motor, ids, escritores, lectores, segundos):
+    fin = time.monotonic() + segundos
+    resultados = {'escritura': [], 'lectura': []}
+    bloqueos = [0]
+    lock = threading.Lock()
+
+    def escribir(n):
+        propias = []
+        i = n
+        while time.monotonic() < fin:
+            propuesta_id = ids[i % len(ids)]
+            inicio = time.perf_counter()
+            try:
+                with motor.begin() as conn:
+                    conn.execute(update(_propuestas).where(_propuestas.c.id == propuesta_id)
+                                 .values(utilidad_porcentaje=30.0 + i % 10))
+                    conn.execute(insert(_auditoria).values(
+                        fecha=datetime.utcnow(), accion='BENCH', propuesta_id=propuesta_id, usuario='bench'))
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    bloqueos[0] += 1
+                continue
+            propias.append(time.perf_counter() - inicio)
+            i += escritores
+        with lock:
+            resultados['escritura'].extend(propias)
+
+    def leer(n):
+        propias = []
+        consulta = select(_propuestas.c.id, _propuestas.c.numero_propuesta, _propuestas.c.estado) \
+            .order_by(_propuestas.c.id.desc()).limit(50)
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            try:
+                with motor.connect() as conn:
+                    conn.execute(consulta.offset(n * 50 % PROPUESTAS)).fetchall()
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    bloqueos[0] += 1
+                continue
+            propias.append(time.perf_counter() - inicio)
+        with lock:
+            resultados['lectura'].extend(propias)
+
+    hilos = [threading.Thread(target=escribir, args=(n,)) for n in range(escritores)]
+    hilos += [threading.Thread(target=leer, args=(n,)) for n in range(lectores)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return time.perf_counter() - inicio, resultados, bloqueos[0]
+
+
+def p99(latencias):
+    if not latencias:
+        return float('nan')
+    latencias = sorted(latencias)
+    return latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Contención de SQLite: opciones por defecto vs ajustadas')
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--lectores', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.escritores} escritores, {args.lectores} lectores, {args.segundos:g} s por variante")
+    for nombre, ajustado in (('por defecto', False), ('ajustado', True)):
+        motor = crear_motor(nombre.replace(' ', '_'), ajustado)
+        ids = sembrar(motor)
+        duracion, resultados, bloqueos = medir(motor, ids, args.escritores, args.lectores, args.segundos)
+        motor.dispose()
+        print(f"  {nombre:12} escrituras {len(resultados['escritura']) / duracion:7.0f}/s "
+              f"(p99 {p99(resultados['escritura']):7.1f} ms)   "
+              f"lecturas {len(resultados['lectura']) / duracion:7.0f}/s "
+              f"(p99 {p99(resultados['lectura']):7.1f} ms)   locked {bloqueos}")
+
+
+if __name__ == "__main__":
+    main()
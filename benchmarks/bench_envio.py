@@ -0,0 +1,155 @@
+"""
+Envíos de propuestas por segundo: tres commits por envío (como era antes:
+documento, cambio de estado con notificación y auditoría por separado)
+contra la unidad de trabajo actual de enviar_propuesta (un solo commit),
+y contra el envío masivo (/propuestas/enviar-lote) de todas en una llamada.
+
+Siembra N propuestas PREGENERADA en una base SQLite temporal y las envía
+una por una con el test client de Flask (render síncrono). El flujo
+anterior se registra como una ruta solo para este benchmark. Con
+--synchronous FULL cada commit hace fsync del WAL, como en una base
+configurada para máxima durabilidad.
+
+Ejecutar con: python benchmarks/bench_envio.py [--propuestas 500] [--synchronous NORMAL|FULL]
+                  [--variantes antes,unidad,masivo] [--workers N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+parser = argparse.ArgumentParser(description='Envíos/s con tres commits vs unidad de trabajo')
+parser.add_argument('--propuestas', type=int, default=500)
+parser.add_argument('--synchronous', default='NORMAL', choices=('OFF', 'NORMAL', 'FULL'))
+parser.add_argument('--variantes', default='antes,unidad,masivo')
+parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Procesos de render del envío masivo')
+ARGS = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/'),
+    'DOCUMENTOS_DIR': os.path.join(TMP_DIR, 'documentos'),
+    'SQLITE_SYNCHRONOUS': ARGS.synchronous,
+    'RENDER_ASINCRONO': '0',
+    'ENVIO_MASIVO_WORKERS': str(ARGS.workers),
+    'EXPIRACION_BARREDOR': 'externo',
+    'NOTIFICACIONES_DESPACHADOR': 'externo',
+})
+
+from flask import jsonify, url_for  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import app, db  # noqa: E402
+from app.almacen_documentos import guardar_documento  # noqa: E402
+from app.auditoria import evento_auditoria  # noqa: E402
+from app.configuracion import obtener_configuracion, sembrar_configuracion  # noqa: E402
+from app.models import Cliente, DocumentoGenerado, EventoAuditoria, Notificacion, Propuesta  # noqa: E402
+from app.renderizado import proyectar, renderizar  # noqa: E402
+
+
+def enviar_antes(propuesta_id):
+    """enviar_propuesta con un commit por paso, como antes de la unidad de trabajo"""
+    propuesta = db.session.get(Propuesta, propuesta_id)
+    fila = proyectar([propuesta_id]).get(propuesta_id)
+    file_hash, html_path = guardar_documento(renderizar('PROPUESTA', fila, obtener_configuracion()))
+    documento = DocumentoGenerado(propuesta_id=propuesta_id, tipo='PROPUESTA', version=fila.version,
+                                  archivo_path=html_path, hash_documento=file_hash)
+    db.session.add(documento)
+    db.session.commit()
+
+    propuesta.estado = 'ENVIADA'
+    propuesta.fecha_envio = datetime.utcnow()
+    propuesta.fecha_expiracion = datetime.utcnow() + timedelta(hours=24)
+    db.session.add(Notificacion(propuesta_id=propuesta_id, tipo='ENVIO', destinatario=propuesta.cliente.email,
+                                asunto=f'Propuesta de Transporte: {propuesta.numero_propuesta}',
+                                mensaje='Disponible por 24 horas.', enviada=False))
+    db.session.commit()
+
+    enlace = url_for('portal_cliente', token=propuesta.token_acceso, _external=True)
+    db.session.execute(insert(EventoAuditoria.__table__), [evento_auditoria('ENVIO_PROPUESTA', propuesta_id, enlace)])
+    db.session.commit()
+    return jsonify({'success': True, 'documento_id': documento.id})
+
+
+app.add_url_rule('/bench/enviar-antes/<propuesta_id>', 'bench_enviar_antes', enviar_antes, methods=['POST'])
+
+
+def sembrar(prefijo, cantidad):
+    with app.app_context():
+        cliente = Cliente.query.first()
+        if cliente is None:
+            cliente = Cliente(nombre='Compras Benchmark', email='compras@example.cl', telefono='+56 9 0000 0000')
+            db.session.add(cliente)
+            db.session.flush()
+        propuestas = [Propuesta(
+            cliente_id=cliente.id, numero_propuesta=f'PROP-{prefijo}-{i:05d}', tipo_servicio='Benchmark',
+            origen='Santiago', destino='Valparaíso', distancia_km=120, tiempo_estimado_horas=2, peso_kg=1000,
+            volumen_m3=10, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1), fecha_retorno=datetime(2025, 12, 2),
+            costo_combustible=50000, costo_peajes=8000, costo_viaticos=10000, costo_hospedaje=0, tarifa_base=200000,
+            costo_directo=268000, costo_indirecto_aplicado=40000, descripcion_servicio='Benchmark',
+            utilidad_porcentaje=30.0, precio_final=390000, estado='PREGENERADA', token_acceso=f'token-{prefijo}-{i}',
+        ) for i in range(cantidad)]
+        db.session.add_all(propuestas)
+        db.session.commit()
+        return [p.id for p in propuestas]
+
+
+def medir(ruta, ids):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    inicio = time.perf_counter()
+    for propuesta_id in ids:
+        resp = client.post(ruta.format(propuesta_id))
+        if resp.status_code != 200:
+            raise RuntimeError(resp.get_data(as_text=True))
+    return time.perf_counter() - inicio
+
+
+def medir_masivo(ids):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    inicio = time.perf_counter()
+    resp = client.post('/propuestas/enviar-lote', json={'ids': ids})
+    primera = None
+    for linea in resp.response:
+        # Primer resultado visible en el navegador
+        if primera is None and b'"propuesta"' in linea:
+            primera = time.perf_counter() - inicio
+        ultima = linea
+    fin = json.loads(ultima)
+    if fin['enviadas'] != len(ids):
+        raise RuntimeError(fin)
+    return time.perf_counter() - inicio, primera
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        sembrar_configuracion()
+    print(f"{ARGS.propuestas} envíos por variante, synchronous={ARGS.synchronous}")
+    variantes = ARGS.variantes.split(',')
+    for clave, nombre, prefijo, ruta in (('antes', 'tres commits', 'ANT', '/bench/enviar-antes/{}'),
+                                         ('unidad', 'un commit', 'UDT', '/propuestas/{}/enviar')):
+        if clave not in variantes:
+            continue
+        ids = sembrar(prefijo, ARGS.propuestas)
+        duracion = medir(ruta, ids)
+        print(f"  {nombre:14} {ARGS.propuestas / duracion:8.0f} envíos/s   "
+              f"{duracion / ARGS.propuestas * 1000:6.2f} ms por envío")
+    if 'masivo' in variantes:
+        ids = sembrar('MAS', ARGS.propuestas)
+        duracion, primera = medir_masivo(ids)
+        print(f"  {'envío masivo':14} {ARGS.propuestas / duracion:8.0f} envíos/s   "
+              f"{duracion:6.2f} s en total, primer avance a los {primera * 1000:.0f} ms ({ARGS.workers} procesos)")
+
+
+if __name__ == "__main__":
+    main()
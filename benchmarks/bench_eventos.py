@@ -0,0 +1,126 @@
+"""
+Dashboard con recargas contra eventos en vivo.
+
+Antes cada director recargaba index() para ver las respuestas de los
+clientes, y cada respuesta invalidaba los conteos: la recarga siguiente
+volvía a contar todas las propuestas. Ahora el navegador queda conectado a
+/eventos y ajusta sus tarjetas; el proceso ajusta también sus conteos
+cacheados.
+
+Siembra N propuestas ENVIADA en una base SQLite temporal y mide:
+- recarga: ms y sentencias SQL de GET / justo después de una respuesta
+  (conteos invalidados, como antes);
+- eventos: con D navegadores suscritos, ms desde que el cliente responde
+  hasta que el último navegador tiene el evento en su cola, y sentencias
+  SQL de GET / después (conteos ajustados).
+
+Ejecutar con: python benchmarks/bench_eventos.py [--propuestas 100000] [--directores 50] [--respuestas 200]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+parser = argparse.ArgumentParser(description='Recargas del dashboard vs eventos en vivo')
+parser.add_argument('--propuestas', type=int, default=100000)
+parser.add_argument('--directores', type=int, default=50)
+parser.add_argument('--respuestas', type=int, default=200)
+ARGS = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/'),
+    'DOCUMENTOS_DIR': os.path.join(TMP_DIR, 'documentos'),
+    'EVENTOS_MAX_CONEXIONES': str(ARGS.directores),
+    'ESTADISTICAS_TTL': '3600',
+    'EXPIRACION_BARREDOR': 'externo',
+    'NOTIFICACIONES_DESPACHADOR': 'externo',
+})
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import app, db  # noqa: E402
+from app.estadisticas import invalidar_estadisticas, obtener_estadisticas  # noqa: E402
+from app.eventos import cancelar, suscribir  # noqa: E402
+from app.models import Cliente, Propuesta  # noqa: E402
+
+
+def sembrar():
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Benchmark', email='compras@example.cl', telefono='+56 9 0000 0000')
+        db.session.add(cliente)
+        db.session.commit()
+        db.session.execute(insert(Propuesta.__table__), [dict(
+            id=f'bench-{i}', cliente_id=cliente.id, numero_propuesta=f'PROP-EVT-{i:06d}', tipo_servicio='Benchmark',
+            origen='Santiago', destino='Valparaíso', distancia_km=120, tiempo_estimado_horas=2, peso_kg=1000,
+            volumen_m3=10, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1), fecha_retorno=datetime(2025, 12, 2),
+            costo_combustible=50000, costo_peajes=8000, costo_viaticos=10000, costo_hospedaje=0, tarifa_base=200000,
+            costo_directo=268000, costo_indirecto_aplicado=40000, descripcion_servicio='Benchmark',
+            utilidad_porcentaje=30.0, precio_final=390000, estado='ENVIADA', token_acceso=f'token-evt-{i}',
+            version=1, fecha_creacion=datetime.utcnow(),
+        ) for i in range(ARGS.propuestas)])
+        db.session.commit()
+
+
+class Contador:
+    def __init__(self):
+        self.sentencias = 0
+
+    def __call__(self, *args):
+        self.sentencias += 1
+
+
+def medir(indices, recargar):
+    """ms por respuesta y por GET /, sentencias por GET /, ms hasta el último navegador"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    suscripciones = [] if recargar else [suscribir() for _ in range(ARGS.directores)]
+    contador = Contador()
+    respuesta = recarga = entrega = 0.0
+    try:
+        for i in indices:
+            inicio = time.perf_counter()
+            client.post(f'/cliente/respuesta/token-evt-{i}', json={'tipo': 'RECHAZADA'})
+            respuesta += time.perf_counter() - inicio
+            if recargar:
+                # Como antes de los eventos: la respuesta invalidaba los conteos
+                invalidar_estadisticas()
+            else:
+                for suscripcion in suscripciones:
+                    if suscripcion.siguiente(1) is None:
+                        raise RuntimeError('evento perdido')
+                entrega += time.perf_counter() - inicio
+            event.listen(db.engine, 'before_cursor_execute', contador)
+            inicio = time.perf_counter()
+            client.get('/')
+            recarga += time.perf_counter() - inicio
+            event.remove(db.engine, 'before_cursor_execute', contador)
+    finally:
+        for suscripcion in suscripciones:
+            cancelar(suscripcion)
+    n = len(indices)
+    return respuesta / n * 1000, recarga / n * 1000, contador.sentencias / n, entrega / n * 1000
+
+
+def main():
+    sembrar()
+    with app.app_context():
+        obtener_estadisticas()
+        print(f"{ARGS.propuestas} propuestas, {ARGS.respuestas} respuestas, {ARGS.directores} navegadores suscritos")
+        n = ARGS.respuestas
+        for nombre, indices, recargar in (('recarga', range(0, n), True), ('eventos', range(n, 2 * n), False)):
+            respuesta, recarga, sentencias, entrega = medir(list(indices), recargar)
+            detalle = f"   entrega a {ARGS.directores} navegadores {entrega:6.2f} ms" if not recargar else ''
+            print(f"  {nombre:8} respuesta {respuesta:6.2f} ms   GET / {recarga:7.2f} ms "
+                  f"({sentencias:.0f} sentencias SQL){detalle}")
+
+
+if __name__ == "__main__":
+    main()
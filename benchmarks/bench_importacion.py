@@ -0,0 +1,85 @@
+"""
+Benchmark de la importación masiva de costos indirectos.
+
+Escribe un CSV de N filas (una de cada 1000 inválida) en un directorio
+temporal sin tenerlo en memoria, lo importa con importacion_costos y
+muestra filas/s y el pico de memoria anónima (RssAnon), que debe
+mantenerse plano aunque el archivo crezca. Al final compara los
+agregados incrementales con una reconstrucción desde cero.
+
+Ejecutar con: python benchmarks/bench_importacion.py [--filas 1000000] [--lote 5000]
+(--filas 10000000: ~280 MB de CSV, ~5 min y +10 MB de memoria sobre la base)
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/')
+
+from app import app, db  # noqa: E402
+from app.costos_indirectos import consultar_ventana, reconstruir_agregados  # noqa: E402
+from app.importacion_costos import importar_costos, leer_filas  # noqa: E402
+
+
+def anon_mb():
+    """Memoria anónima del proceso en MB (Linux); 0 si no está disponible"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('RssAnon:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def escribir_csv(ruta, filas):
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        f.write('mes,año,monto,descripcion\n')
+        for i in range(filas):
+            mes = 13 if i % 1000 == 999 else i % 12 + 1
+            f.write(f'{mes},{2000 + (i // 12) % 26},{1000000 + i % 5000},Gasto {i}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Filas/s y memoria de la importación masiva de costos')
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--lote', type=int, default=5000)
+    args = parser.parse_args()
+
+    ruta = os.path.join(TMP_DIR, 'costos.csv')
+    escribir_csv(ruta, args.filas)
+    tamano = os.path.getsize(ruta) / 1024 / 1024
+
+    with app.app_context():
+        db.create_all()
+        base = anon_mb()
+        pico = [base]
+
+        def al_avanzar(resumen):
+            pico[0] = max(pico[0], anon_mb())
+
+        inicio = time.perf_counter()
+        with open(ruta, 'rb') as entrada:
+            resumen = importar_costos(leer_filas(entrada, 'csv'), tamano_lote=args.lote, al_avanzar=al_avanzar)
+        duracion = time.perf_counter() - inicio
+
+        incremental = consultar_ventana((2000, 1), (2025, 12))
+        reconstruir_agregados()
+        reconstruido = consultar_ventana((2000, 1), (2025, 12))
+        assert incremental.cantidad == reconstruido.cantidad == resumen['insertadas']
+
+    print(f"{args.filas:,} filas ({tamano:.0f} MB de CSV), lotes de {args.lote}")
+    print(f"  insertadas: {resumen['insertadas']:,}  rechazadas: {resumen['rechazadas']:,}")
+    print(f"  {args.filas / duracion:10,.0f} filas/s  ({duracion:.1f} s)")
+    print(f"  memoria anónima: base {base:.0f} MB, pico {pico[0]:.0f} MB (+{pico[0] - base:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
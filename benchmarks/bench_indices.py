@@ -0,0 +1,158 @@
+"""
+Benchmark de planes de consulta antes y después de los índices compuestos.
+
+Siembra una base SQLite temporal con N propuestas (1.000.000 por defecto) y
+una fila hija por propuesta en versiones, respuestas y documentos; muestra
+EXPLAIN QUERY PLAN y tiempos de las consultas de listar_propuestas,
+ver_propuesta y documentos_cliente sin índices y tras migrar_esquema().
+
+Ejecutar con: python benchmarks/bench_indices.py [--filas 1000000]
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+DB_PATH = os.path.join(TMP_DIR, 'bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + DB_PATH.replace('\\', '/')
+
+from sqlalchemy import text  # noqa: E402
+
+from app import app, db  # noqa: E402
+from app.models import Propuesta, VersionPropuesta, RespuestaCliente, DocumentoGenerado  # noqa: E402
+from app.migraciones import migrar_esquema  # noqa: E402
+
+ESTADOS = ['PREGENERADA', 'ENVIADA', 'ACEPTADA', 'RECHAZADA', 'REVISION']
+LOTE = 50000
+
+
+def sembrar(conn, filas, clientes):
+    """Inserta datos sintéticos con executemany directo (sin ORM)"""
+    random.seed(42)
+    base = datetime(2024, 1, 1)
+    ids_clientes = [str(uuid.uuid4()) for _ in range(clientes)]
+    conn.executemany(
+        'INSERT INTO clientes (id, nombre, email, fecha_registro) VALUES (?, ?, ?, ?)',
+        [(cid, f'Cliente {i}', f'cliente{i}@example.cl', base) for i, cid in enumerate(ids_clientes)],
+    )
+    propuesta_sql = (
+        'INSERT INTO propuestas (id, cliente_id, numero_propuesta, tipo_servicio, origen, destino, '
+        'distancia_km, tiempo_estimado_horas, peso_kg, volumen_m3, tipo_camion, cantidad_camiones, '
+        'fecha_salida, fecha_retorno, costo_combustible, costo_peajes, costo_viaticos, costo_hospedaje, '
+        'tarifa_base, costo_directo, descripcion_servicio, utilidad_porcentaje, costo_indirecto_aplicado, '
+        'precio_final, version, token_acceso, estado, fecha_creacion) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    )
+    for inicio in range(0, filas, LOTE):
+        propuestas, versiones, respuestas, documentos = [], [], [], []
+        for i in range(inicio, min(inicio + LOTE, filas)):
+            pid = str(uuid.uuid4())
+            creada = base + timedelta(seconds=i * 30)
+            propuestas.append((
+                pid, random.choice(ids_clientes), f'PROP-BENCH-{i:07d}', 'Traslado urgente retail',
+                'Santiago', 'Región del Maule', 280.0, 4.5, 1000, 20, 'MC', 1, creada, creada,
+                112000, 14000, 10000, 0, 285000, 421000, 'Servicio sintético', 30.0, 70000, 617000,
+                1, uuid.uuid4().hex, random.choice(ESTADOS), creada,
+            ))
+            versiones.append((str(uuid.uuid4()), pid, 1, creada))
+            respuestas.append((str(uuid.uuid4()), pid, 'ACEPTADA', creada))
+            documentos.append((str(uuid.uuid4()), pid, 'PROPUESTA', 1, f'/tmp/{pid}.html', creada))
+        conn.executemany(propuesta_sql, propuestas)
+        conn.executemany(
+            'INSERT INTO versiones_propuesta (id, propuesta_id, numero_version, fecha_cambio) VALUES (?, ?, ?, ?)',
+            versiones,
+        )
+        conn.executemany(
+            'INSERT INTO respuestas_cliente (id, propuesta_id, tipo_respuesta, fecha_respuesta) VALUES (?, ?, ?, ?)',
+            respuestas,
+        )
+        conn.executemany(
+            'INSERT INTO documentos_generados (id, propuesta_id, tipo, version, archivo_path, fecha_generacion) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            documentos,
+        )
+        conn.commit()
+        print(f'  sembradas {min(inicio + LOTE, filas):,} filas', end='\r')
+    print()
+
+
+def consultas(propuesta_id, cliente_id):
+    """Consultas tal como las emiten las rutas (primera página para los listados)"""
+    return {
+        'listar_propuestas (estado)': Propuesta.query.filter_by(estado='ENVIADA')
+            .order_by(Propuesta.fecha_creacion.desc()).limit(50),
+        'listar_propuestas (cliente)': Propuesta.query.filter_by(cliente_id=cliente_id)
+            .order_by(Propuesta.fecha_creacion.desc()).limit(50),
+        'listar_propuestas (todas)': Propuesta.query.order_by(Propuesta.fecha_creacion.desc()).limit(50),
+        'ver_propuesta (versiones)': VersionPropuesta.query.filter_by(propuesta_id=propuesta_id)
+            .order_by(VersionPropuesta.numero_version),
+        'ver_propuesta (respuestas)': RespuestaCliente.query.filter_by(propuesta_id=propuesta_id)
+            .order_by(RespuestaCliente.fecha_respuesta.desc()),
+        'ver_propuesta / documentos_cliente (documentos)': DocumentoGenerado.query.filter_by(propuesta_id=propuesta_id)
+            .order_by(DocumentoGenerado.fecha_generacion.desc()),
+    }
+
+
+def medir(titulo, raw, propuesta_id, cliente_id, repeticiones):
+    print(f'\n=== {titulo} ===')
+    for nombre, query in consultas(propuesta_id, cliente_id).items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = [fila[3] for fila in raw.execute('EXPLAIN QUERY PLAN ' + sql)]
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            raw.execute(sql).fetchall()
+        ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+        print(f'- {nombre}: {ms:.2f} ms')
+        for paso in plan:
+            print(f'    {paso}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--clientes', type=int, default=5_000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        # Partir del esquema previo: sin los índices compuestos
+        with db.engine.begin() as conn:
+            for tabla in db.metadata.sorted_tables:
+                for indice in tabla.indexes:
+                    indice.drop(conn)
+
+        raw = db.engine.raw_connection()
+        print(f'Sembrando {args.filas:,} propuestas en {DB_PATH}')
+        inicio = time.perf_counter()
+        sembrar(raw, args.filas, args.clientes)
+        print(f'Siembra: {time.perf_counter() - inicio:.1f} s')
+
+        cursor = raw.cursor()
+        propuesta_id, cliente_id = cursor.execute(
+            'SELECT id, cliente_id FROM propuestas ORDER BY random() LIMIT 1'
+        ).fetchone()
+        medir('ANTES (sin índices)', cursor, propuesta_id, cliente_id, args.repeticiones)
+        raw.close()
+
+        inicio = time.perf_counter()
+        cambios = migrar_esquema()
+        print(f'\nmigrar_esquema(): {len(cambios)} cambios en {time.perf_counter() - inicio:.1f} s')
+        for cambio in cambios:
+            print(f'  {cambio}')
+
+        raw = db.engine.raw_connection()
+        medir('DESPUÉS (migrar_esquema)', raw.cursor(), propuesta_id, cliente_id, args.repeticiones)
+        raw.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark del despacho de notificaciones pendientes.
+
+Siembra N notificaciones con enviada=False en una base SQLite temporal y
+mide cuánto tarda el DespachadorNotificaciones en vaciar la bandeja:
+- contra un servidor SMTP local que acepta todo (mide el costo del
+  despachador + smtplib con conexiones reutilizadas);
+- con el TransporteArchivo (.eml por mensaje en un directorio temporal).
+Informa notificaciones/s y cuántas conexiones SMTP se abrieron.
+
+Ejecutar con: python benchmarks/bench_notificaciones.py [--notificaciones 20000] [--hilos 4] [--lote 200]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import socketserver
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/')
+
+from app import app, db  # noqa: E402
+from app.models import Cliente, Notificacion, Propuesta  # noqa: E402
+from app.notificaciones import DespachadorNotificaciones, TransporteArchivo, TransporteSMTP  # noqa: E402
+
+
+class SesionSumidero(socketserver.StreamRequestHandler):
+    """SMTP que responde 250 a todo y descarta los mensajes"""
+
+    def handle(self):
+        self.server.conexiones += 1
+        self.wfile.write(b'220 sumidero\r\n')
+        en_datos = False
+        for linea in self.rfile:
+            if en_datos:
+                if linea == b'.\r\n':
+                    en_datos = False
+                    self.wfile.write(b'250 OK\r\n')
+                continue
+            comando = linea[:4].upper()
+            if comando == b'DATA':
+                en_datos = True
+                self.wfile.write(b'354 fin con .\r\n')
+            elif comando == b'QUIT':
+                self.wfile.write(b'221 adios\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+def sembrar(cantidad):
+    db.session.execute(Notificacion.__table__.delete())
+    if not Cliente.query.first():
+        cliente = Cliente(nombre='Cliente Benchmark', email='bench@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        db.session.add(Propuesta(
+            id='bench-prop', cliente_id=cliente.id, numero_propuesta='PROP-BENCH-0001', tipo_servicio='Benchmark',
+            origen='Santiago', destino='Valparaíso', distancia_km=120, tiempo_estimado_horas=2, peso_kg=1000,
+            volumen_m3=10, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1), fecha_retorno=datetime(2025, 12, 2),
+            costo_combustible=0, costo_peajes=0, costo_viaticos=0, costo_hospedaje=0, tarifa_base=0,
+            costo_directo=0, descripcion_servicio='Benchmark', utilidad_porcentaje=30.0, precio_final=0,
+            token_acceso='bench-token',
+        ))
+    ahora = datetime.utcnow()
+    db.session.execute(Notificacion.__table__.insert(), [
+        {
+            'propuesta_id': 'bench-prop', 'tipo': 'ENVIO', 'destinatario': f'cliente{i}@example.cl',
+            'asunto': f'Propuesta de Transporte: PROP-BENCH-{i:06d}',
+            'mensaje': 'Su propuesta está disponible. Válida por 24 horas.',
+            'enviada': False, 'fecha_creacion': ahora, 'proximo_intento': ahora,
+        }
+        for i in range(cantidad)
+    ])
+    db.session.commit()
+
+
+def vaciar(transporte, cantidad, hilos):
+    despachador = DespachadorNotificaciones(transporte, hilos, intervalo=0.05)
+    inicio = time.perf_counter()
+    despachador.iniciar()
+    while Notificacion.query.filter_by(enviada=True).count() < cantidad:
+        time.sleep(0.05)
+        db.session.rollback()
+    duracion = time.perf_counter() - inicio
+    despachador.detener()
+    return duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notificaciones/s del despachador de la bandeja de salida')
+    parser.add_argument('--notificaciones', type=int, default=20000)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--lote', type=int, default=200)
+    args = parser.parse_args()
+    app.config['NOTIFICACIONES_LOTE'] = args.lote
+
+    servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SesionSumidero)
+    servidor.daemon_threads = True
+    servidor.conexiones = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    remitente = 'MGCP <no-responder@acmetrans.cl>'
+
+    with app.app_context():
+        db.create_all()
+        sembrar(args.notificaciones)
+        smtp = TransporteSMTP('127.0.0.1', servidor.server_address[1], remitente, conexiones=args.hilos)
+        duracion_smtp = vaciar(smtp, args.notificaciones, args.hilos)
+
+        sembrar(args.notificaciones)
+        archivo = TransporteArchivo(os.path.join(TMP_DIR, 'eml'), remitente)
+        duracion_archivo = vaciar(archivo, args.notificaciones, args.hilos)
+    servidor.shutdown()
+
+    print(f"{args.notificaciones} notificaciones, {args.hilos} hilos, lotes de {args.lote}")
+    print(f"  SMTP local:  {args.notificaciones / duracion_smtp:8.0f} notificaciones/s  "
+          f"({servidor.conexiones} conexiones SMTP abiertas)")
+    print(f"  archivo:     {args.notificaciones / duracion_archivo:8.0f} notificaciones/s")
+
+
+if __name__ == "__main__":
+    main()
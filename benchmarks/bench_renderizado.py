@@ -0,0 +1,148 @@
+"""
+Benchmark de renderizado de documentos de propuesta.
+
+Siembra N propuestas en una base SQLite temporal y compara:
+- el camino anterior: por documento, Propuesta.query.get + carga perezosa
+  del cliente + consulta de ConfiguracionCostos + render_template con el
+  contexto armado a mano;
+- renderizado.render_many(ids): una proyección por bloque de ids, la
+  configuración una vez y la plantilla ya compilada.
+Además mide la carga de las plantillas pdf/* en un entorno Jinja nuevo,
+compilando desde cero y desde el bytecode en disco (lo que paga cada
+reinicio o cada proceso nuevo del pool de render).
+
+Ejecutar con: python benchmarks/bench_renderizado.py [--propuestas 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/')
+os.environ['PLANTILLAS_CACHE_DIR'] = os.path.join(TMP_DIR, 'plantillas')
+
+from flask import render_template  # noqa: E402
+from jinja2 import Environment, FileSystemBytecodeCache  # noqa: E402
+
+from app import app, db  # noqa: E402
+from app import renderizado  # noqa: E402
+from app.models import Cliente, ConfiguracionCostos, Propuesta  # noqa: E402
+from app.configuracion import sembrar_configuracion  # noqa: E402
+
+
+def sembrar(cantidad):
+    cliente = Cliente(nombre='Cliente Benchmark', email='bench@example.cl', telefono='+56 9 0000 0000', direccion='Santiago')
+    db.session.add(cliente)
+    db.session.flush()
+    db.session.execute(Propuesta.__table__.insert(), [
+        {
+            'id': f'bench-{i:06d}', 'cliente_id': cliente.id, 'numero_propuesta': f'PROP-BENCH-{i:06d}',
+            'tipo_servicio': 'Mudanza comercial', 'origen': 'Santiago', 'destino': 'Región del Biobío',
+            'distancia_km': 520.0, 'tiempo_estimado_horas': 7.0, 'peso_kg': 1000, 'volumen_m3': 20,
+            'tipo_camion': 'MC', 'cantidad_camiones': 1, 'fecha_salida': datetime(2025, 12, 1),
+            'fecha_retorno': datetime(2025, 12, 3), 'costo_combustible': 208000, 'costo_peajes': 26000,
+            'costo_viaticos': 40000, 'costo_hospedaje': 35000, 'tarifa_base': 285000, 'costo_directo': 594000,
+            'descripcion_servicio': 'Benchmark', 'utilidad_porcentaje': 30.0, 'costo_indirecto_aplicado': 100000,
+            'precio_final': 872000, 'version': 1, 'token_acceso': f'token-{i}', 'estado': 'PREGENERADA',
+        }
+        for i in range(cantidad)
+    ])
+    db.session.commit()
+    sembrar_configuracion()
+    return [f'bench-{i:06d}' for i in range(cantidad)]
+
+
+def render_anterior(propuesta_id):
+    """generar_propuesta_html sin escritura a disco, como era antes del módulo"""
+    propuesta = Propuesta.query.get(propuesta_id)
+    config = ConfiguracionCostos.query.first()
+    contexto = {
+        'numero_propuesta': propuesta.numero_propuesta,
+        'version': propuesta.version,
+        'fecha': datetime.now().strftime('%d/%m/%Y'),
+        'cliente': propuesta.cliente,
+        'tipo_servicio': propuesta.tipo_servicio,
+        'origen': propuesta.origen,
+        'destino': propuesta.destino,
+        'distancia_km': propuesta.distancia_km,
+        'tiempo_horas': propuesta.tiempo_estimado_horas,
+        'peso_kg': propuesta.peso_kg,
+        'volumen_m3': propuesta.volumen_m3,
+        'tipo_camion': propuesta.tipo_camion,
+        'cantidad_camiones': propuesta.cantidad_camiones,
+        'fecha_salida': propuesta.fecha_salida.strftime('%d/%m/%Y'),
+        'fecha_retorno': propuesta.fecha_retorno.strftime('%d/%m/%Y'),
+        'costo_combustible': propuesta.costo_combustible,
+        'costo_peajes': propuesta.costo_peajes,
+        'costo_viaticos': propuesta.costo_viaticos,
+        'costo_hospedaje': propuesta.costo_hospedaje,
+        'tarifa_base': propuesta.tarifa_base,
+        'costo_directo': propuesta.costo_directo,
+        'costo_indirecto': propuesta.costo_indirecto_aplicado,
+        'utilidad_porcentaje': propuesta.utilidad_porcentaje,
+        'utilidad_monto': propuesta.costo_directo * (propuesta.utilidad_porcentaje / 100),
+        'precio_final': propuesta.precio_final,
+        'vigencia_horas': config.vigencia_propuesta_horas,
+        'fecha_expiracion': 'No especificada',
+        'condiciones_pago': config.condiciones_pago,
+        'terminos_condiciones': config.terminos_condiciones,
+    }
+    return render_template('pdf/propuesta_template.html', **contexto)
+
+
+def carga_plantillas(con_bytecode):
+    """Segundos para cargar las plantillas pdf/* en un entorno Jinja nuevo"""
+    entorno = Environment(
+        loader=app.jinja_env.loader,
+        bytecode_cache=FileSystemBytecodeCache(app.config['PLANTILLAS_CACHE_DIR'], pattern='mgcp_%s.cache') if con_bytecode else None,
+    )
+    entorno.filters.update(app.jinja_env.filters)
+    inicio = time.perf_counter()
+    for nombre in renderizado.PLANTILLAS.values():
+        entorno.get_template(nombre)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Renders por segundo antes y después del módulo de renderizado')
+    parser.add_argument('--propuestas', type=int, default=2000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        ids = sembrar(args.propuestas)
+        renderizado.precompilar()
+
+        with app.test_request_context():
+            render_anterior(ids[0])  # plantilla ya compilada en ambos casos
+            db.session.expire_all()
+            inicio = time.perf_counter()
+            for propuesta_id in ids:
+                render_anterior(propuesta_id)
+            anterior = time.perf_counter() - inicio
+
+        db.session.expire_all()
+        inicio = time.perf_counter()
+        html = renderizado.render_many(ids)
+        nuevo = time.perf_counter() - inicio
+        assert len(html) == len(ids)
+
+        sin_cache = min(carga_plantillas(False) for _ in range(3))
+        con_cache = min(carga_plantillas(True) for _ in range(3))
+
+    print(f"{args.propuestas} propuestas")
+    print(f"  por documento (anterior): {args.propuestas / anterior:8.0f} renders/s")
+    print(f"  render_many:              {args.propuestas / nuevo:8.0f} renders/s  ({anterior / nuevo:.1f}x)")
+    print(f"Carga de plantillas en un proceso nuevo")
+    print(f"  compilando:               {sin_cache * 1000:8.1f} ms")
+    print(f"  desde bytecode en disco:  {con_cache * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
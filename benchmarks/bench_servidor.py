@@ -0,0 +1,203 @@
+"""
+Prueba de carga del servidor: peticiones/s del servidor de desarrollo
+(app.run con debug=True, como run.py) contra servidor.py.
+
+Siembra una base SQLite temporal con propuestas ENVIADA, levanta cada
+servidor como subproceso en un puerto libre y lo carga con N clientes
+concurrentes (http.client con keep-alive) sobre el portal del cliente y
+el login. Informa peticiones/s, latencias p50/p99 y errores. Con
+--cliente-prueba mide además la aplicación sola con el test client de
+Flask (sin red), como techo de referencia.
+
+Ejecutar con: python benchmarks/bench_servidor.py [--servidores desarrollo,werkzeug,gunicorn]
+                  [--peticiones 3000] [--concurrencia 16] [--cliente-prueba]
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import importlib.util
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='mgcp_bench_')
+ENTORNO = {
+    'DATABASE_URL': 'sqlite:///' + os.path.join(TMP_DIR, 'bench.db').replace('\\', '/'),
+    'DOCUMENTOS_DIR': os.path.join(TMP_DIR, 'documentos'),
+    'NOTIFICACIONES_DIR': os.path.join(TMP_DIR, 'notificaciones'),
+    # Sin hilos de fondo: solo se mide el servicio de peticiones
+    'EXPIRACION_BARREDOR': 'externo',
+    'NOTIFICACIONES_DESPACHADOR': 'externo',
+}
+os.environ.update(ENTORNO)
+
+from app import app, db  # noqa: E402
+from app.migraciones import migrar_esquema  # noqa: E402
+from app.models import Cliente, Propuesta  # noqa: E402
+
+PROPUESTAS = 50
+
+
+def sembrar():
+    with app.app_context():
+        db.create_all()
+        migrar_esquema()
+        cliente = Cliente(nombre='Compras Benchmark', email='compras@example.cl', telefono='+56 9 0000 0000')
+        db.session.add(cliente)
+        db.session.flush()
+        for i in range(PROPUESTAS):
+            db.session.add(Propuesta(
+                cliente_id=cliente.id, numero_propuesta=f'PROP-SRV-{i:04d}', tipo_servicio='Benchmark',
+                origen='Santiago', destino='Valparaíso', distancia_km=120, tiempo_estimado_horas=2, peso_kg=1000,
+                volumen_m3=10, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1), fecha_retorno=datetime(2025, 12, 2),
+                costo_combustible=50000, costo_peajes=8000, costo_viaticos=10000, costo_hospedaje=0, tarifa_base=200000,
+                costo_directo=268000, costo_indirecto_aplicado=40000, descripcion_servicio='Benchmark ' * 200,
+                utilidad_porcentaje=30.0, precio_final=390000, estado='ENVIADA', token_acceso=f'token-srv-{i}',
+                fecha_expiracion=datetime.utcnow() + timedelta(days=1),
+            ))
+        db.session.commit()
+
+
+def rutas():
+    return [f'/cliente/propuesta/token-srv-{i}' for i in range(PROPUESTAS)] + ['/login']
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(puerto, proceso, limite=60):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'el servidor terminó con código {proceso.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('el servidor no abrió el puerto a tiempo')
+
+
+def comando(servidor, puerto):
+    if servidor == 'desarrollo':
+        return [sys.executable, '-c',
+                f'from app import app; app.run(debug=True, use_reloader=False, port={puerto})']
+    return [sys.executable, os.path.join(ROOT, 'servidor.py'), '--servidor', servidor,
+            '--host', '127.0.0.1', '--puerto', str(puerto), '--sin-inicializar']
+
+
+def cargar(puerto, peticiones, concurrencia):
+    """Reparte `peticiones` entre `concurrencia` hilos. Devuelve (duración, latencias, errores)"""
+    todas = rutas()
+    latencias = []
+    errores = [0]
+    lock = threading.Lock()
+    por_hilo = peticiones // concurrencia
+
+    def cliente(n):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+        propias = []
+        for i in range(por_hilo):
+            ruta = todas[(n * por_hilo + i) % len(todas)]
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', ruta)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status != 200:
+                    raise RuntimeError(respuesta.status)
+                if respuesta.will_close:
+                    conexion.close()
+                    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+            except Exception:
+                with lock:
+                    errores[0] += 1
+                conexion.close()
+                conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+                continue
+            propias.append(time.perf_counter() - inicio)
+        conexion.close()
+        with lock:
+            latencias.extend(propias)
+
+    hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(concurrencia)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return time.perf_counter() - inicio, sorted(latencias), errores[0]
+
+
+def medir_servidor(servidor, peticiones, concurrencia):
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(comando(servidor, puerto), cwd=ROOT, env={**os.environ, **ENTORNO},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar_puerto(puerto, proceso)
+        cargar(puerto, min(200, peticiones), concurrencia)  # calentamiento
+        return cargar(puerto, peticiones, concurrencia)
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        try:
+            proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+def medir_cliente_prueba(peticiones):
+    cliente = app.test_client()
+    todas = rutas()
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(peticiones):
+        t = time.perf_counter()
+        cliente.get(todas[i % len(todas)])
+        latencias.append(time.perf_counter() - t)
+    return time.perf_counter() - inicio, sorted(latencias), 0
+
+
+def informar(nombre, duracion, latencias, errores):
+    if not latencias:
+        print(f"  {nombre:16} sin respuestas ({errores} errores)")
+        return
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+    print(f"  {nombre:16} {len(latencias) / duracion:8.0f} pet/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   "
+          f"errores {errores}")
+
+
+def main():
+    disponibles = ['desarrollo', 'werkzeug'] + [s for s in ('gunicorn', 'uvicorn') if importlib.util.find_spec(s)]
+    parser = argparse.ArgumentParser(description='Peticiones/s del servidor de desarrollo vs servidor.py')
+    parser.add_argument('--servidores', default=','.join(disponibles))
+    parser.add_argument('--peticiones', type=int, default=3000)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--cliente-prueba', action='store_true', help='Medir también con el test client de Flask')
+    args = parser.parse_args()
+
+    sembrar()
+    print(f"{args.peticiones} peticiones, {args.concurrencia} clientes concurrentes, "
+          f"{PROPUESTAS} propuestas del portal + /login")
+    if args.cliente_prueba:
+        informar('test client', *medir_cliente_prueba(args.peticiones))
+    for servidor in args.servidores.split(','):
+        try:
+            informar(servidor, *medir_servidor(servidor, args.peticiones, args.concurrencia))
+        except RuntimeError as e:
+            print(f"  {servidor:16} no se pudo medir: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark de memoria al servir documentos grandes a muchos clientes a la vez.
+
+Guarda un contrato HTML de 20 MB en el almacén y abre 200 vistas
+concurrentes contra un servidor WSGI con hilos. Cada cliente lee el
+primer bloque y espera a que todos hayan empezado antes de terminar, de
+modo que las 200 respuestas están en curso simultáneamente. Se compara
+la lectura completa en memoria del ver_documento anterior (modo legado)
+con el envío por mmap por bloques actual; cada modo corre en un proceso
+aparte y se informa el pico de memoria anónima (RssAnon) sobre la línea
+base. Las páginas del mmap son caché de archivo compartida: VmRSS las
+cuenta una vez por mapeo aunque en RAM existan una sola vez.
+
+Ejecutar con: python benchmarks/bench_transmision.py [--vistas 200] [--mb 20] [--vistas-legado 40]
+(el modo legado necesita ~2 x mb por vista: 200 vistas de 20 MB son ~8 GB)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PRIMER_BLOQUE = 64 * 1024
+
+
+def anon_mb():
+    """Memoria anónima (privada) del proceso en MB (Linux); 0 si no está disponible"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('RssAnon:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def preparar(megas):
+    """Crea la base temporal y un contrato de `megas` MB. Devuelve (app, documento_id)"""
+    tmp = tempfile.mkdtemp(prefix='mgcp_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db').replace('\\', '/')
+    os.environ['DOCUMENTOS_DIR'] = os.path.join(tmp, 'documentos_generados')
+
+    from datetime import datetime
+    from app import app, db
+    from app.almacen_documentos import guardar_documento
+    from app.models import Cliente, DocumentoGenerado, Propuesta
+
+    fila = '<tr><td>Cláusula</td><td>El transportista se obliga a entregar la carga en destino.</td></tr>\n'
+    contenido = '<html><body><table>\n' + fila * (megas * 1024 * 1024 // len(fila.encode())) + '</table></body></html>'
+
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Benchmark', email='bench@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        propuesta = Propuesta(
+            cliente_id=cliente.id, numero_propuesta='PROP-BENCH-0001', tipo_servicio='Mudanza comercial',
+            origen='Santiago', destino='Región del Biobío', distancia_km=520.0, tiempo_estimado_horas=7.0,
+            peso_kg=1000, volumen_m3=20, tipo_camion='MC', fecha_salida=datetime(2025, 12, 1),
+            fecha_retorno=datetime(2025, 12, 3), costo_combustible=0, costo_peajes=0, costo_viaticos=0,
+            costo_hospedaje=0, tarifa_base=0, costo_directo=0, descripcion_servicio='Benchmark',
+            utilidad_porcentaje=30.0, costo_indirecto_aplicado=0, precio_final=0,
+            token_acceso='bench', estado='ACEPTADA',
+        )
+        db.session.add(propuesta)
+        db.session.flush()
+        hash_documento, ruta = guardar_documento(contenido)
+        documento = DocumentoGenerado(
+            propuesta_id=propuesta.id, tipo='CONTRATO', version=1, archivo_path=ruta, hash_documento=hash_documento,
+        )
+        db.session.add(documento)
+        db.session.commit()
+        documento_id = documento.id
+
+    def ver_documento_legado(documento_id):
+        """ver_documento anterior: lee el archivo completo a un str"""
+        documento = db.session.get(DocumentoGenerado, documento_id)
+        with open(documento.archivo_path, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+        return contenido
+
+    app.add_url_rule('/bench/legado/<documento_id>', 'bench_legado', ver_documento_legado)
+    return app, documento_id
+
+
+def medir(modo, vistas, megas):
+    from werkzeug.serving import make_server
+
+    app, documento_id = preparar(megas)
+    ruta = f'/bench/legado/{documento_id}' if modo == 'legado' else f'/documentos/ver/{documento_id}'
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    puerto = servidor.server_port
+
+    base = anon_mb()
+    pico = [base]
+    midiendo = threading.Event()
+    midiendo.set()
+
+    def muestrear():
+        while midiendo.is_set():
+            pico[0] = max(pico[0], anon_mb())
+            time.sleep(0.01)
+
+    barrera = threading.Barrier(vistas, timeout=300)
+    recibidos = []
+    errores = []
+
+    def cliente():
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', puerto, timeout=300)
+            conn.request('GET', ruta, headers={'Accept-Encoding': 'identity'})
+            resp = conn.getresponse()
+            total = len(resp.read(PRIMER_BLOQUE))
+            # Todas las vistas abiertas a la vez antes de terminar de leer
+            barrera.wait()
+            while True:
+                bloque = resp.read(PRIMER_BLOQUE)
+                if not bloque:
+                    break
+                total += len(bloque)
+            conn.close()
+            recibidos.append(total)
+        except Exception as e:  # noqa: BLE001 - se informa al final
+            errores.append(repr(e))
+            barrera.abort()
+
+    muestreador = threading.Thread(target=muestrear, daemon=True)
+    muestreador.start()
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=cliente) for _ in range(vistas)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    midiendo.clear()
+    muestreador.join()
+    servidor.shutdown()
+
+    return {
+        'modo': modo,
+        'vistas': vistas,
+        'completas': sum(1 for total in recibidos if total >= megas * 1024 * 1024 * 0.99),
+        'errores': errores[:3],
+        'segundos': round(duracion, 2),
+        'anon_base_mb': round(base, 1),
+        'anon_pico_extra_mb': round(pico[0] - base, 1),
+        'mb_por_vista': round((pico[0] - base) / vistas, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria al servir vistas concurrentes de un documento grande')
+    parser.add_argument('--vistas', type=int, default=200)
+    parser.add_argument('--vistas-legado', type=int, default=None, help='Vistas para el modo legado (por defecto = --vistas)')
+    parser.add_argument('--mb', type=int, default=20, help='Tamaño del contrato en MB')
+    parser.add_argument('--modo', choices=['legado', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir(args.modo, args.vistas, args.mb)))
+        return
+
+    print(f"Contrato de {args.mb} MB")
+    print(f"{'modo':<10} {'vistas':>6} {'completas':>9} {'seg':>7} {'Anon pico +MB':>14} {'MB/vista':>9}")
+    for modo, vistas in (('legado', args.vistas_legado or args.vistas), ('streaming', args.vistas)):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--modo', modo, '--vistas', str(vistas), '--mb', str(args.mb)],
+            capture_output=True, text=True,
+        )
+        if salida.returncode != 0:
+            print(f"{modo:<10} falló (código {salida.returncode}): {salida.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(f"{r['modo']:<10} {r['vistas']:>6} {r['completas']:>9} {r['segundos']:>7} "
+              f"{r['anon_pico_extra_mb']:>14} {r['mb_por_vista']:>9}")
+        if r['errores']:
+            print(f"  errores: {r['errores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
 from app.models import Cliente
+from app.migraciones import migrar_esquema
+from app.configuracion import sembrar_configuracion
+from app.costos_indirectos import sembrar_agregados
 import inicializar_clientes
 import generar_propuestas
 
@@ -23,6 +26,12 @@ def main():
         # Paso 1: Crear tablas
         print("[*] PASO 1: Creando estructura de base de datos...")
         db.create_all()
+        for cambio in migrar_esquema():
+            print(f"[+] {cambio}")
+        if sembrar_configuracion():
+            print("[+] Configuración de costos por defecto creada")
+        if sembrar_agregados():
+            print("[+] Agregados de costos indirectos reconstruidos")
         print("[OK] Tablas creadas correctamente")
         print()
         
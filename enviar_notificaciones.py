@@ -0,0 +1,53 @@
+"""
+Worker de envío de notificaciones (bandeja de salida en la tabla notificaciones)
+Ejecutar con: python enviar_notificaciones.py [--hilos N] [--una-vez]
+
+Úselo con NOTIFICACIONES_DESPACHADOR=externo. Puede correr más de una
+instancia: cada lote queda reservado con un lease mientras se envía.
+El transporte sale de NOTIFICACIONES_TRANSPORTE (smtp / archivo).
+"""
+import os
+import sys
+import signal
+import argparse
+import threading
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.notificaciones import DespachadorNotificaciones, crear_transporte, procesar_pendientes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envía las notificaciones pendientes')
+    parser.add_argument('--hilos', type=int, default=app.config['NOTIFICACIONES_HILOS'], help='Envíos en paralelo')
+    parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre consultas con la bandeja vacía')
+    parser.add_argument('--una-vez', action='store_true', help='Enviar lo pendiente y salir')
+    args = parser.parse_args()
+
+    transporte = crear_transporte()
+    if transporte is None:
+        print("[!] NOTIFICACIONES_TRANSPORTE está vacío: no hay por dónde enviar")
+        return
+
+    if args.una_vez:
+        enviadas = procesar_pendientes(transporte)
+        transporte.cerrar()
+        print(f"[OK] {enviadas} notificaciones enviadas")
+        return
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    despachador = DespachadorNotificaciones(transporte, args.hilos, intervalo=args.intervalo).iniciar()
+    print(f"[*] Envío de notificaciones por {app.config['NOTIFICACIONES_TRANSPORTE']} con {args.hilos} hilos (Ctrl+C para detener)")
+    detener.wait()
+    print("[*] Deteniendo: se terminan los envíos en curso...")
+    despachador.detener()
+    print("[OK] Worker detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Barrido de propuestas vencidas (sin cron)
+Ejecutar con: python expirar_propuestas.py [--intervalo 60] [--una-vez]
+
+Devuelve a PREGENERADA las propuestas ENVIADA cuya fecha_expiracion pasó
+y registra sus notificaciones EXPIRACION. Úselo con
+EXPIRACION_BARREDOR=externo cuando el servidor web no debe hacerlo.
+"""
+import os
+import sys
+import signal
+import argparse
+import threading
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.expiracion import TAMANO_LOTE, expirar_vencidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expira las propuestas enviadas cuyo plazo venció')
+    parser.add_argument('--intervalo', type=float, default=app.config['EXPIRACION_INTERVALO'],
+                        help='Segundos entre barridos')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Propuestas por transacción')
+    parser.add_argument('--una-vez', action='store_true', help='Hacer un barrido y salir')
+    args = parser.parse_args()
+
+    if args.una_vez:
+        with app.app_context():
+            expiradas = expirar_vencidas(tamano_lote=args.lote)
+        print(f"[OK] {expiradas} propuestas expiradas")
+        return
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    print(f"[*] Barrido de expiración cada {args.intervalo:g} s (Ctrl+C para detener)")
+    while not detener.is_set():
+        try:
+            with app.app_context():
+                expiradas = expirar_vencidas(tamano_lote=args.lote)
+            if expiradas:
+                print(f"[+] {expiradas} propuestas expiradas")
+        except Exception as e:
+            print(f"[!] Error en el barrido: {e}")
+        detener.wait(args.intervalo)
+    print("[OK] Barrido detenido")
+
+
+if __name__ == "__main__":
+    main()
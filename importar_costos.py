@@ -0,0 +1,68 @@
+"""
+Importación masiva de costos indirectos
+Ejecutar con: python importar_costos.py costos.csv [--formato csv|jsonl] [--lote 5000] [--rechazos rechazos.csv]
+
+Lee el archivo por streaming (CSV con encabezado mes,año,monto[,descripcion,usuario,id]
+o JSON Lines con las mismas claves) y lo guarda en transacciones por lote.
+Las filas con `id` existente se actualizan. Las filas rechazadas se
+escriben en el archivo de rechazos con su línea y motivo.
+"""
+import os
+import sys
+import csv
+import time
+import json
+import argparse
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from app.migraciones import migrar_esquema
+from app.importacion_costos import TAMANO_LOTE, detectar_formato, importar_costos, leer_filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importación masiva de costos indirectos desde CSV o JSON Lines')
+    parser.add_argument('archivo', help="Ruta del archivo, o '-' para la entrada estándar")
+    parser.add_argument('--formato', choices=('csv', 'jsonl'), help='Por defecto según la extensión')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por transacción')
+    parser.add_argument('--usuario', default='Importación', help='Usuario para filas sin columna usuario')
+    parser.add_argument('--rechazos', help='CSV de filas rechazadas (por defecto <archivo>.rechazos.csv)')
+    args = parser.parse_args()
+
+    formato = args.formato or ('csv' if args.archivo == '-' else detectar_formato(args.archivo))
+    ruta_rechazos = args.rechazos or ('rechazos.csv' if args.archivo == '-' else args.archivo + '.rechazos.csv')
+    inicio = time.perf_counter()
+
+    with open(ruta_rechazos, 'w', newline='', encoding='utf-8') as salida_rechazos:
+        escritor = csv.writer(salida_rechazos)
+        escritor.writerow(['linea', 'motivo', 'fila'])
+
+        def al_rechazar(linea, fila, motivo):
+            escritor.writerow([linea, motivo, json.dumps(fila, ensure_ascii=False) if fila else ''])
+
+        def al_avanzar(resumen):
+            velocidad = resumen['leidas'] / max(time.perf_counter() - inicio, 1e-9)
+            print(f"\r[*] {resumen['leidas']:,} filas leídas ({velocidad:,.0f}/s)", end='', flush=True)
+
+        with app.app_context():
+            db.create_all()
+            migrar_esquema()
+            if args.archivo == '-':
+                resumen = importar_costos(leer_filas(sys.stdin.buffer, formato), args.usuario, args.lote, al_rechazar, al_avanzar)
+            else:
+                with open(args.archivo, 'rb') as entrada:
+                    resumen = importar_costos(leer_filas(entrada, formato), args.usuario, args.lote, al_rechazar, al_avanzar)
+
+    print()
+    print(f"[OK] {resumen['insertadas']:,} insertadas, {resumen['actualizadas']:,} actualizadas, "
+          f"{resumen['rechazadas']:,} rechazadas en {time.perf_counter() - inicio:.1f} s")
+    if resumen['rechazadas']:
+        print(f"[!] Detalle de rechazos en {ruta_rechazos}")
+    else:
+        os.remove(ruta_rechazos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Mantenimiento del almacén de documentos generados
+Ejecutar con: python limpiar_documentos.py [--importar-legados] [--recomprimir] [--gracia-horas 24] [--simular]
+
+Elimina los objetos de documentos_generados/objetos que ya no referencia
+ningún DocumentoGenerado. Con --importar-legados primero mueve al almacén
+los archivos planos generados por versiones anteriores; con --recomprimir
+lleva los objetos existentes a los formatos de DOCUMENTOS_COMPRESION.
+"""
+import os
+import sys
+import argparse
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.almacen_documentos import GRACIA_SEGUNDOS, importar_legados, recolectar_huerfanos, recomprimir_objetos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recolección de documentos sin referencias')
+    parser.add_argument('--gracia-horas', type=float, default=GRACIA_SEGUNDOS / 3600,
+                        help='No eliminar objetos más recientes que esto')
+    parser.add_argument('--simular', action='store_true', help='Solo informar qué se eliminaría')
+    parser.add_argument('--importar-legados', action='store_true',
+                        help='Mover al almacén los documentos guardados como archivo por versión')
+    parser.add_argument('--recomprimir', action='store_true',
+                        help='Guardar los objetos existentes en los formatos de DOCUMENTOS_COMPRESION')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.importar_legados and not args.simular:
+            legados = importar_legados()
+            print(f"[+] {legados['importados']} documentos importados, "
+                  f"{legados['archivos_eliminados']} archivos planos eliminados, "
+                  f"{legados['faltantes']} sin archivo")
+        if args.recomprimir and not args.simular:
+            compresion = recomprimir_objetos()
+            print(f"[+] {compresion['objetos']} objetos recomprimidos: "
+                  f"{compresion['bytes_antes'] / 1024 / 1024:.1f} MB -> {compresion['bytes_despues'] / 1024 / 1024:.1f} MB")
+        resultado = recolectar_huerfanos(gracia_segundos=args.gracia_horas * 3600, simular=args.simular)
+
+    accion = 'se eliminarían' if args.simular else 'eliminados'
+    print(f"[OK] {resultado['revisados']} objetos revisados, {resultado['eliminados']} {accion} "
+          f"({resultado['bytes_liberados'] / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Script para actualizar en sitio el esquema de la base de datos MGCP
+Ejecutar con: python migrar_base_datos.py [--sin-respaldo]
+"""
+import os
+import sys
+import argparse
+import sqlite3
+from datetime import datetime
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from app.migraciones import migrar_esquema
+from app.costos_indirectos import sembrar_agregados
+from app.auditoria import trasladar_auditoria_antigua
+
+
+def respaldar_sqlite(url):
+    """Copia consistente del archivo SQLite antes de migrar (API de backup)"""
+    ruta = url.replace('sqlite:///', '', 1)
+    if not os.path.exists(ruta):
+        return None
+    destino = f"{ruta}.bak-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    origen = sqlite3.connect(ruta)
+    copia = sqlite3.connect(destino)
+    with copia:
+        origen.backup(copia)
+    copia.close()
+    origen.close()
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migración de esquema MGCP')
+    parser.add_argument('--sin-respaldo', action='store_true', help='No copiar la base SQLite antes de migrar')
+    args = parser.parse_args()
+
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    if url.startswith('sqlite:///') and not args.sin_respaldo:
+        respaldo = respaldar_sqlite(url)
+        if respaldo:
+            print(f"[OK] Respaldo creado en {respaldo}")
+
+    with app.app_context():
+        cambios = migrar_esquema()
+        if sembrar_agregados():
+            cambios.append('agregados de costos indirectos reconstruidos')
+        trasladados = trasladar_auditoria_antigua()
+        if trasladados:
+            cambios.append(f'{trasladados} eventos de auditoría movidos desde notificaciones')
+
+    if not cambios:
+        print("[OK] El esquema ya está actualizado")
+        return
+    for cambio in cambios:
+        print(f"[+] {cambio}")
+    print(f"[OK] {len(cambios)} cambios aplicados")
+
+
+if __name__ == "__main__":
+    main()
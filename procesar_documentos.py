@@ -0,0 +1,46 @@
+"""
+Worker de renderizado de documentos en segundo plano (sin broker externo)
+Ejecutar con: python procesar_documentos.py [--workers N] [--una-vez]
+
+Úselo con RENDER_ASINCRONO=1 y RENDER_DESPACHADOR=externo cuando el
+servidor web corre con varios procesos y solo este debe renderizar.
+"""
+import os
+import sys
+import signal
+import argparse
+import threading
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.cola_render import Despachador, procesar_pendientes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Procesa la cola de renderizado de documentos')
+    parser.add_argument('--workers', type=int, default=app.config['RENDER_WORKERS'], help='Procesos de renderizado')
+    parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre consultas a la cola')
+    parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente en este proceso y salir')
+    args = parser.parse_args()
+
+    if args.una_vez:
+        procesados = procesar_pendientes()
+        print(f"[OK] {procesados} documentos generados")
+        return
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    despachador = Despachador(args.workers, intervalo=args.intervalo).iniciar()
+    print(f"[*] Worker de documentos iniciado con {args.workers} procesos (Ctrl+C para detener)")
+    detener.wait()
+    print("[*] Deteniendo: se esperan los documentos en curso...")
+    despachador.detener(esperar=True)
+    print("[OK] Worker detenido")
+
+
+if __name__ == "__main__":
+    main()
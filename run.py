@@ -18,13 +18,34 @@ DB_DIR.mkdir(exist_ok=True)
 # Importar la aplicación
 from app import app, db
 from app.models import Cliente, CostoIndirecto, Propuesta
+from app.migraciones import migrar_esquema
+from app.renderizado import precompilar
+from app.configuracion import sembrar_configuracion
+from app.costos_indirectos import sembrar_agregados
+from app.auditoria import trasladar_auditoria_antigua
+from app.cola_render import iniciar_despachador_render
+from app.eventos import iniciar_seguidor
+from app.expiracion import iniciar_barredor
+from app.notificaciones import iniciar_despachador
 
 def inicializar_base_datos():
     """Crear tablas si no existen"""
     with app.app_context():
         # Crear todas las tablas
         db.create_all()
+        # Agregar columnas e índices nuevos a tablas existentes
+        for cambio in migrar_esquema():
+            print(f"✓ Migración: {cambio}")
         print("✓ Estructura de base de datos verificada")
+        if sembrar_configuracion():
+            print("✓ Configuración de costos por defecto creada")
+        if sembrar_agregados():
+            print("✓ Agregados de costos indirectos reconstruidos")
+        trasladados = trasladar_auditoria_antigua()
+        if trasladados:
+            print(f"✓ {trasladados} eventos de auditoría movidos desde notificaciones")
+        # Compila (o carga del bytecode en disco) las plantillas de documentos
+        precompilar()
         
         # Mostrar estadísticas
         total_clientes = Cliente.query.count()
@@ -95,6 +116,18 @@ if __name__ == "__main__":
     print("\n🚀 Iniciando servidor Flask...")
     print("   - Panel de Dirección: http://localhost:5000")
     print("   - Portal del Cliente: se genera con cada propuesta")
+    print("   - Servidor de desarrollo (debug); en producción use: python servidor.py")
     print("\n⚠️  Presione Ctrl+C para detener el servidor\n")
     
+    if not os.getenv('NOTIFICACIONES_TRANSPORTE'):
+        # Desarrollo: los mensajes quedan como .eml en NOTIFICACIONES_DIR, no salen por SMTP
+        app.config['NOTIFICACIONES_TRANSPORTE'] = 'archivo'
+    
+    # Con el recargador de Flask solo el proceso hijo atiende peticiones
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_despachador_render()
+        iniciar_barredor()
+        iniciar_despachador()
+        iniciar_seguidor()
+    
     app.run(debug=True, port=5000, host='0.0.0.0')
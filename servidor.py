@@ -0,0 +1,168 @@
+"""
+Servidor de producción de MGCP (varios procesos, sin modo debug)
+Ejecutar con: python servidor.py [--servidor auto|gunicorn|uvicorn|werkzeug] [--workers N] [--hilos N]
+
+- gunicorn (Linux/macOS): workers gthread. La aplicación, las plantillas y
+  los modelos se importan una vez en el proceso maestro antes del fork
+  (preload) y cada worker arranca sus hilos de fondo tras el fork.
+- uvicorn: la aplicación WSGI envuelta como ASGI (asgi.py). Si gunicorn
+  está instalado se usa su UvicornWorker para conservar el preload; si no,
+  uvicorn lanza sus propios procesos.
+- werkzeug: un solo proceso con hilos, para Windows sin uvicorn.
+Sin --workers/--hilos se usa la recomendación por núcleo
+(python servidor.py --recomendar). SIGTERM detiene el servidor sin cortar
+las peticiones en curso. run.py sigue siendo el servidor de desarrollo.
+"""
+import os
+import sys
+import signal
+import argparse
+import threading
+import importlib.util
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from app.produccion import preparar_worker, recomendar_workers
+from run import inicializar_base_datos
+
+SERVIDORES = ('gunicorn', 'uvicorn', 'werkzeug')
+
+
+def _instalado(modulo):
+    return importlib.util.find_spec(modulo) is not None
+
+
+def elegir_servidor(pedido):
+    if pedido != 'auto':
+        return pedido
+    if os.name != 'nt' and _instalado('gunicorn'):
+        return 'gunicorn'
+    if _instalado('uvicorn'):
+        return 'uvicorn'
+    return 'werkzeug'
+
+
+def servir_gunicorn(args, aplicacion, clase_worker):
+    from gunicorn.app.base import BaseApplication
+
+    class AplicacionGunicorn(BaseApplication):
+        def __init__(self, opciones):
+            self.opciones = opciones
+            super().__init__()
+
+        def load_config(self):
+            for clave, valor in self.opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            return aplicacion
+
+    AplicacionGunicorn({
+        'bind': f'{args.host}:{args.puerto}',
+        'workers': args.workers,
+        'threads': args.hilos,
+        'worker_class': clase_worker,
+        'preload_app': True,
+        'timeout': args.timeout,
+        # SIGTERM: deja de aceptar conexiones y espera hasta `gracia` segundos
+        'graceful_timeout': args.gracia,
+        'keepalive': 5,
+        'accesslog': '-' if args.log_accesos else None,
+        'post_fork': lambda arbitro, worker: preparar_worker(),
+    }).run()
+
+
+def servir_uvicorn(args):
+    import asgi
+
+    if os.name != 'nt' and _instalado('gunicorn'):
+        clase = 'uvicorn_worker.UvicornWorker' if _instalado('uvicorn_worker') else 'uvicorn.workers.UvicornWorker'
+        servir_gunicorn(args, asgi.application, clase)
+        return
+    import uvicorn
+
+    # Sin gunicorn no hay fork: cada proceso de uvicorn importa asgi.py y prepara sus hilos
+    os.environ['MGCP_WORKER_UVICORN'] = '1'
+    uvicorn.run(
+        'asgi:application', host=args.host, port=args.puerto, workers=args.workers,
+        timeout_graceful_shutdown=args.gracia, access_log=args.log_accesos,
+    )
+
+
+def servir_werkzeug(args):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class SinLogAccesos(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    manejador = WSGIRequestHandler if args.log_accesos else SinLogAccesos
+    servidor = make_server(args.host, args.puerto, app, threaded=True, request_handler=manejador)
+    # Hilos no daemon: server_close() espera las peticiones en curso
+    servidor.daemon_threads = False
+    preparar_worker()
+
+    def terminar(*_):
+        # shutdown() bloquea hasta que serve_forever() termina: no llamarlo desde su hilo
+        threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, terminar)
+    signal.signal(signal.SIGINT, terminar)
+    servidor.serve_forever()
+    print("[*] Deteniendo: se terminan las peticiones en curso...")
+    servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de producción de MGCP')
+    parser.add_argument('--servidor', choices=('auto',) + SERVIDORES, default='auto')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--puerto', type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument('--workers', type=int, help='Procesos (por defecto, la recomendación)')
+    parser.add_argument('--hilos', type=int, help='Hilos por proceso (gunicorn)')
+    parser.add_argument('--timeout', type=int, default=60, help='Segundos antes de reiniciar un worker colgado')
+    parser.add_argument('--gracia', type=int, default=30, help='Segundos para terminar peticiones al recibir SIGTERM')
+    parser.add_argument('--log-accesos', action='store_true', help='Registrar cada petición en stdout')
+    parser.add_argument('--sin-inicializar', action='store_true', help='No verificar ni migrar la base al iniciar')
+    parser.add_argument('--recomendar', action='store_true', help='Mostrar procesos e hilos recomendados y salir')
+    args = parser.parse_args()
+
+    if args.recomendar:
+        for nombre in SERVIDORES:
+            recomendacion = recomendar_workers(nombre)
+            disponible = '' if nombre == 'werkzeug' or _instalado(nombre) else '  (no instalado)'
+            print(f"{nombre:9} workers={recomendacion.workers} hilos={recomendacion.hilos}  "
+                  f"{recomendacion.motivo}{disponible}")
+        return
+
+    servidor = elegir_servidor(args.servidor)
+    recomendacion = recomendar_workers(servidor)
+    args.workers = args.workers or recomendacion.workers
+    args.hilos = args.hilos or recomendacion.hilos
+    if servidor == 'werkzeug' and args.workers > 1:
+        print("[!] werkzeug atiende en un solo proceso; se ignora --workers")
+        args.workers = 1
+
+    if args.workers > 1 and 'EVENTOS_DIFUSION' not in os.environ:
+        # Un cambio confirmado en un worker debe llegar a los navegadores conectados a los demás
+        os.environ['EVENTOS_DIFUSION'] = app.config['EVENTOS_DIFUSION'] = 'tabla'
+
+    if not args.sin_inicializar:
+        # Una vez, en el proceso maestro, antes de crear los workers
+        inicializar_base_datos()
+
+    concurrencia = 'un hilo por petición' if servidor == 'werkzeug' else f'{args.workers} procesos x {args.hilos} hilos'
+    print(f"[*] {servidor} en http://{args.host}:{args.puerto} con {concurrencia} ({recomendacion.nucleos} núcleos)")
+    if servidor == 'gunicorn':
+        servir_gunicorn(args, app, 'gthread')
+    elif servidor == 'uvicorn':
+        servir_uvicorn(args)
+    else:
+        servir_werkzeug(args)
+    print("[OK] Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import secrets
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# Ensure project root on path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Use a throwaway SQLite file so the suite never touches database/mgcp.db.
+# Must run before `app` is imported (load_dotenv does not override it).
+_TMP_DIR = tempfile.mkdtemp(prefix='mgcp_tests_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_TMP_DIR, 'mgcp_test.db').replace('\\', '/'))
+os.environ.setdefault('DOCUMENTOS_DIR', os.path.join(_TMP_DIR, 'documentos_generados'))
+os.environ.setdefault('PLANTILLAS_CACHE_DIR', os.path.join(_TMP_DIR, 'plantillas'))
+os.environ.setdefault('NOTIFICACIONES_DIR', os.path.join(_TMP_DIR, 'notificaciones'))
+os.environ.setdefault('NOTIFICACIONES_TRANSPORTE', 'archivo')
+
+
+@pytest.fixture(autouse=True)
+def _cache_tokens_limpia():
+    """Cada prueba crea su base: los tokens cacheados de otra no sirven."""
+    from app.cache_tokens import invalidar_tokens
+
+    invalidar_tokens()
+    yield
+
+
+@pytest.fixture
+def crear_propuesta():
+    """Factory for minimal valid Propuesta rows (caller commits)."""
+    from app import db
+    from app.models import Propuesta
+
+    def _crear(cliente, numero, estado='PREGENERADA', **campos):
+        datos = dict(
+            cliente_id=cliente.id,
+            numero_propuesta=numero,
+            tipo_servicio='Traslado urgente retail',
+            origen='Santiago',
+            destino='Región del Maule',
+            distancia_km=280.0,
+            tiempo_estimado_horas=4.5,
+            peso_kg=1000,
+            volumen_m3=20,
+            tipo_camion='MC',
+            fecha_salida=datetime(2025, 12, 1),
+            fecha_retorno=datetime(2025, 12, 3),
+            costo_combustible=112000,
+            costo_peajes=14000,
+            costo_viaticos=10000,
+            costo_hospedaje=0,
+            tarifa_base=285000,
+            costo_directo=421000,
+            descripcion_servicio='Servicio de prueba',
+            utilidad_porcentaje=30.0,
+            costo_indirecto_aplicado=70000,
+            precio_final=617000,
+            token_acceso=secrets.token_urlsafe(32),
+            estado=estado,
+        )
+        datos.update(campos)
+        propuesta = Propuesta(**datos)
+        db.session.add(propuesta)
+        return propuesta
+
+    return _crear
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import almacen_documentos
+from app.almacen_documentos import guardar_documento, recolectar_huerfanos, ruta_objeto
+from app.models import Cliente, DocumentoGenerado, Propuesta
+from app.routes import generar_contrato_html, generar_propuesta_html
+
+
+@pytest.fixture
+def contexto(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Almacén', email='almacen@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-ALM-0001', estado='ACEPTADA')
+        db.session.commit()
+        yield cliente
+        db.session.remove()
+        db.drop_all()
+
+
+def _propuesta():
+    return Propuesta.query.filter_by(numero_propuesta='PROP-ALM-0001').first()
+
+
+def test_objeto_en_directorio_fragmentado(contexto):
+    hash_documento, ruta = guardar_documento('<html>hola</html>')
+    assert ruta == ruta_objeto(hash_documento)
+    partes = os.path.relpath(ruta, almacen_documentos.directorio_objetos()).split(os.sep)
+    assert partes == [hash_documento[:2], hash_documento[2:4], hash_documento + '.html']
+    with open(ruta, encoding='utf-8') as f:
+        assert f.read() == '<html>hola</html>'
+    # Sin temporales abandonados tras publicar
+    assert os.listdir(os.path.dirname(ruta)) == [hash_documento + '.html']
+
+
+def test_renders_identicos_se_guardan_una_vez(contexto):
+    propuesta_id = _propuesta().id
+    ruta_1, id_1 = generar_propuesta_html(propuesta_id)
+    ruta_2, id_2 = generar_propuesta_html(propuesta_id)
+    assert id_1 != id_2
+    assert ruta_1 == ruta_2
+    documentos = DocumentoGenerado.query.all()
+    assert len({d.hash_documento for d in documentos}) == 1
+
+
+def test_firmar_guarda_objeto_nuevo(contexto):
+    propuesta = _propuesta()
+    ruta_original, documento_id = generar_contrato_html(propuesta.id)
+    client = app.test_client()
+    resp = client.post(f'/cliente/firmar/{propuesta.token_acceso}/{documento_id}', json={'firma': 'Ana'})
+    assert resp.status_code == 200
+
+    documento = db.session.get(DocumentoGenerado, documento_id)
+    assert documento.firmado
+    assert documento.archivo_path != ruta_original
+    # El objeto sin firmar no se sobrescribe: queda intacto hasta la recolección
+    assert os.path.exists(ruta_original)
+    with open(documento.archivo_path, 'rb') as f:
+        assert almacen_documentos.calcular_hash(f.read()) == documento.hash_documento
+
+    descarga = client.get(f'/documentos/descargar/{documento_id}')
+    assert 'contrato_PROP-ALM-0001.html' in descarga.headers['Content-Disposition']
+
+
+def test_recolector_respeta_referencias_y_gracia(contexto):
+    ruta_referenciada, _ = generar_propuesta_html(_propuesta().id)
+    _, ruta_huerfana = guardar_documento('<html>sin referencia</html>')
+
+    # Dentro del periodo de gracia no se elimina nada
+    assert recolectar_huerfanos(gracia_segundos=3600)['eliminados'] == 0
+
+    antiguo = time.time() - 7200
+    os.utime(ruta_huerfana, (antiguo, antiguo))
+    os.utime(ruta_referenciada, (antiguo, antiguo))
+    assert recolectar_huerfanos(gracia_segundos=3600, simular=True)['eliminados'] == 1
+    assert os.path.exists(ruta_huerfana)
+
+    resultado = recolectar_huerfanos(gracia_segundos=3600)
+    assert resultado['eliminados'] == 1
+    assert not os.path.exists(ruta_huerfana)
+    assert os.path.exists(ruta_referenciada)
+
+
+def test_guardar_de_nuevo_protege_del_recolector(contexto, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'DOCUMENTOS_DIR', str(tmp_path))
+    contenido = '<html>contrato sin firmar</html>'
+    _, ruta = guardar_documento(contenido)
+    antiguo = time.time() - 7200
+    os.utime(ruta, (antiguo, antiguo))
+
+    # El mismo contenido vuelve a guardarse para un registro nuevo
+    guardar_documento(contenido)
+    assert recolectar_huerfanos(gracia_segundos=3600)['eliminados'] == 0
+    assert os.path.exists(ruta)
+
+    # Ya retirado por el recolector: se publica otra vez
+    os.utime(ruta, (antiguo, antiguo))
+    assert recolectar_huerfanos(gracia_segundos=3600)['eliminados'] == 1
+    _, ruta_nueva = guardar_documento(contenido)
+    assert ruta_nueva == ruta and os.path.exists(ruta)
+
+
+def test_importar_legados(contexto):
+    ruta_plana = os.path.join(app.config['DOCUMENTOS_DIR'], 'propuesta_PROP-ALM-0001_v1.html')
+    os.makedirs(os.path.dirname(ruta_plana), exist_ok=True)
+    with open(ruta_plana, 'w', encoding='utf-8') as f:
+        f.write('<html>legado</html>')
+    for _ in range(2):
+        db.session.add(DocumentoGenerado(propuesta_id=_propuesta().id, tipo='PROPUESTA', version=1, archivo_path=ruta_plana))
+    db.session.commit()
+
+    resultado = almacen_documentos.importar_legados()
+    assert resultado == {'importados': 2, 'faltantes': 0, 'archivos_eliminados': 1}
+    assert not os.path.exists(ruta_plana)
+    for documento in DocumentoGenerado.query.all():
+        assert documento.archivo_path == ruta_objeto(documento.hash_documento)
+        assert os.path.exists(documento.archivo_path)
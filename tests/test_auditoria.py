@@ -0,0 +1,143 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import DatabaseError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import auditoria
+from app.auditoria import auditar, consultar_auditoria, trasladar_auditoria_antigua
+from app.models import Cliente, EventoAuditoria, Notificacion, Propuesta
+from app.paginacion import codificar_cursor, decodificar_cursor
+
+
+@pytest.fixture
+def admin(crear_propuesta):
+    app.config.update(TESTING=True, RENDER_ASINCRONO=True, RENDER_DESPACHADOR='externo')
+    # Escritor sin hilo: las pruebas vacían el buffer explícitamente
+    auditoria.iniciar_escritor().detener()
+    auditoria._escritor = auditoria.EscritorAuditoria(intervalo=3600, lote=500)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Auditoría', email='auditoria@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-AUD-0001')
+        crear_propuesta(cliente, 'PROP-AUD-0002')
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client
+        auditoria.vaciar()
+        db.session.remove()
+        db.drop_all()
+    auditoria._escritor = None
+    app.config['RENDER_ASINCRONO'] = False
+
+
+def test_auditar_no_escribe_en_el_request(admin):
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        for i in range(50):
+            auditar('PRUEBA', f'prop-{i % 5}', f'evento {i}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    assert sentencias == []
+    assert auditoria.pendientes() == 50
+
+    assert auditoria.vaciar() == 50
+    assert auditoria.pendientes() == 0
+    assert EventoAuditoria.query.count() == 50
+
+
+def test_envio_audita_fuera_de_notificaciones(admin):
+    propuesta = Propuesta.query.filter_by(numero_propuesta='PROP-AUD-0001').one()
+    assert admin.post(f'/propuestas/{propuesta.id}/enviar').status_code == 202
+    assert Notificacion.query.filter_by(tipo='AUDIT').count() == 0
+    assert Notificacion.query.filter_by(tipo='ENVIO').count() == 1
+
+    datos = admin.get(f'/api/auditoria?propuesta_id={propuesta.id}').get_json()
+    assert [e['accion'] for e in datos['eventos']] == ['ENVIO_PROPUESTA']
+    assert datos['eventos'][0]['usuario'] == app.config['ADMIN_USER']
+    assert 'Enlace:' in datos['eventos'][0]['detalle']
+
+
+def test_consulta_por_filtros_y_cursor(admin):
+    base = datetime(2025, 11, 1, 9, 0)
+    auditoria._pendientes.extend(
+        {'fecha': base + timedelta(hours=i), 'accion': 'ENVIO_PROPUESTA' if i % 2 else 'MODIFICACION_PROPUESTA',
+         'propuesta_id': 'prop-a' if i < 6 else 'prop-b', 'usuario': 'admin', 'ip': None, 'detalle': str(i)}
+        for i in range(10)
+    )
+    eventos, siguiente = consultar_auditoria(propuesta_id='prop-a', limite=4)
+    assert [e.detalle for e in eventos] == ['5', '4', '3', '2']
+    restantes, fin = consultar_auditoria(propuesta_id='prop-a', cursor=decodificar_cursor(siguiente), limite=4)
+    assert [e.detalle for e in restantes] == ['1', '0'] and fin is None
+
+    eventos, _ = consultar_auditoria(accion='ENVIO_PROPUESTA', desde=base + timedelta(hours=3), hasta=base + timedelta(hours=8))
+    assert [e.detalle for e in eventos] == ['7', '5', '3']
+
+    resp = admin.get('/api/auditoria?accion=MODIFICACION_PROPUESTA&desde=2025-11-01T12:00&por_pagina=2').get_json()
+    assert [e['detalle'] for e in resp['eventos']] == ['8', '6']
+    assert admin.get('/api/auditoria?desde=ayer').status_code == 400
+
+    # Cursor bien formado pero de otro listado (id UUID), o ilegible
+    siguiente_api = admin.get('/api/auditoria?por_pagina=2').get_json()['cursor_siguiente']
+    assert admin.get(f'/api/auditoria?cursor={siguiente_api}').status_code == 200
+    ajeno = codificar_cursor(base, '0b7e6f1e-5d2a-4c3b-9f1e-2a3b4c5d6e7f')
+    assert admin.get(f'/api/auditoria?cursor={ajeno}').status_code == 400
+    assert admin.get('/api/auditoria?cursor=no-es-un-cursor').status_code == 400
+
+
+def test_tabla_append_only(admin):
+    auditar('PRUEBA', 'prop-x', 'inmutable')
+    auditoria.vaciar()
+    with pytest.raises(DatabaseError, match='append-only'):
+        db.session.execute(text("UPDATE auditoria SET detalle = 'otro'"))
+    db.session.rollback()
+    with pytest.raises(DatabaseError, match='append-only'):
+        db.session.execute(text('DELETE FROM auditoria'))
+    db.session.rollback()
+    assert EventoAuditoria.query.one().detalle == 'inmutable'
+
+
+def test_consultas_usan_indices(admin):
+    for filtro, indice in (
+        ("propuesta_id = 'p'", 'ix_auditoria_propuesta_fecha'),
+        ("accion = 'ENVIO_PROPUESTA' AND fecha >= '2025-01-01'", 'ix_auditoria_accion_fecha'),
+        ("fecha >= '2025-01-01' AND fecha < '2025-02-01'", 'ix_auditoria_fecha'),
+    ):
+        plan = db.session.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT * FROM auditoria WHERE {filtro} ORDER BY fecha DESC, id DESC LIMIT 100"
+        )).all()
+        detalle = ' '.join(str(fila[-1]) for fila in plan)
+        assert indice in detalle
+        assert 'TEMP B-TREE' not in detalle
+
+
+def test_traslada_notificaciones_audit(admin):
+    propuesta = Propuesta.query.filter_by(numero_propuesta='PROP-AUD-0002').one()
+    db.session.add(Notificacion(
+        propuesta_id=propuesta.id, tipo='AUDIT', destinatario='auditoria@acmetrans.cl',
+        asunto=f'AUDIT MODIFICACION_PROPUESTA: {propuesta.id}', mensaje='Precio: 1 -> 2',
+        fecha_creacion=datetime(2025, 10, 5, 8, 30),
+    ))
+    db.session.commit()
+
+    assert trasladar_auditoria_antigua() == 1
+    assert trasladar_auditoria_antigua() == 0
+    assert Notificacion.query.filter_by(tipo='AUDIT').count() == 0
+    evento = EventoAuditoria.query.one()
+    assert (evento.accion, evento.propuesta_id, evento.detalle) == ('MODIFICACION_PROPUESTA', propuesta.id, 'Precio: 1 -> 2')
+    assert evento.fecha == datetime(2025, 10, 5, 8, 30)
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.base_datos import es_sqlite_archivo, instalar_pragmas, opciones_motor
+from app.models import Cliente
+
+
+@pytest.fixture
+def base():
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def test_pragmas_en_cada_conexion(base):
+    with db.engine.connect() as conexion:
+        assert conexion.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conexion.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        # 1 = NORMAL
+        assert conexion.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert conexion.execute(text('PRAGMA cache_size')).scalar() == -64 * 1024
+
+
+def test_escrituras_concurrentes_sin_bloqueos(base):
+    errores = []
+
+    def escritor(n):
+        try:
+            with app.app_context():
+                for i in range(20):
+                    db.session.add(Cliente(nombre=f'Concurrente {n}-{i}', email=f'c{n}-{i}@example.cl'))
+                    db.session.commit()
+                    Cliente.query.count()
+                db.session.remove()
+        except Exception as e:  # pragma: no cover - solo si aparece "database is locked"
+            errores.append(e)
+
+    hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+    assert Cliente.query.count() == 160
+
+
+def test_opciones_por_tipo_de_base():
+    config = dict(app.config)
+    archivo = opciones_motor('sqlite:////tmp/mgcp.db', config)
+    assert archivo['pool_size'] == 10 and archivo['connect_args'] == {'timeout': 5.0, 'check_same_thread': False}
+
+    memoria = opciones_motor('sqlite://', config)
+    assert memoria == {'pool_pre_ping': True}
+    assert not es_sqlite_archivo('sqlite:///:memory:')
+
+    postgres = opciones_motor('postgresql://u@localhost/mgcp', config)
+    assert 'connect_args' not in postgres and postgres['max_overflow'] == 20
+
+
+def test_wal_desactivable(tmp_path):
+    config = dict(app.config, SQLITE_WAL=False)
+    url = 'sqlite:///' + str(tmp_path / 'rollback.db')
+    motor = create_engine(url, **opciones_motor(url, config))
+    assert instalar_pragmas(motor, config)
+    with motor.connect() as conexion:
+        assert conexion.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+        assert conexion.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+    motor.dispose()
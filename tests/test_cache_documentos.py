@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import routes
+from app.models import Cliente, DocumentoGenerado, Propuesta
+from app.routes import generar_contrato_html, generar_propuesta_html
+
+
+@pytest.fixture
+def propuesta(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Cache', email='cache@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-CACHE-0001', estado='ACEPTADA')
+        db.session.commit()
+        yield Propuesta.query.filter_by(numero_propuesta='PROP-CACHE-0001').first()
+        db.session.remove()
+        db.drop_all()
+
+
+def _sin_disco(monkeypatch):
+    def falla(ruta):
+        raise AssertionError('no debe tocar el archivo')
+    monkeypatch.setattr(routes, 'variantes', falla)
+
+
+def test_propuesta_inmutable_y_304(propuesta, monkeypatch):
+    _, documento_id = generar_propuesta_html(propuesta.id)
+    documento = db.session.get(DocumentoGenerado, documento_id)
+    client = app.test_client()
+
+    resp = client.get(f'/documentos/ver/{documento_id}')
+    assert resp.status_code == 200
+    ultima_modificacion = resp.headers['Last-Modified']
+    assert resp.headers['ETag'] == f'"{documento.hash_documento}"'
+    assert 'immutable' in resp.headers['Cache-Control']
+
+    _sin_disco(monkeypatch)
+    resp = client.get(f'/documentos/ver/{documento_id}', headers={'If-None-Match': f'"{documento.hash_documento}"'})
+    assert resp.status_code == 304
+    assert resp.data == b''
+    assert resp.headers['ETag'] == f'"{documento.hash_documento}"'
+
+    resp = client.get(f'/documentos/descargar/{documento_id}', headers={'If-Modified-Since': ultima_modificacion})
+    assert resp.status_code == 304
+
+
+def test_etag_por_codificacion(propuesta, monkeypatch):
+    # Contenido distinto al de otras pruebas para no reutilizar un objeto sin comprimir
+    propuesta.version = 7
+    db.session.commit()
+    app.config['DOCUMENTOS_COMPRESION'] = ['gzip']
+    try:
+        _, documento_id = generar_propuesta_html(propuesta.id)
+    finally:
+        app.config['DOCUMENTOS_COMPRESION'] = []
+    documento = db.session.get(DocumentoGenerado, documento_id)
+    client = app.test_client()
+
+    comprimido = client.get(f'/documentos/ver/{documento_id}', headers={'Accept-Encoding': 'gzip'})
+    plano = client.get(f'/documentos/ver/{documento_id}', headers={'Accept-Encoding': 'identity'})
+    assert comprimido.headers['ETag'] == f'"{documento.hash_documento}-gzip"'
+    assert plano.headers['ETag'] == f'"{documento.hash_documento}"'
+
+    _sin_disco(monkeypatch)
+    resp = client.get(f'/documentos/ver/{documento_id}', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': comprimido.headers['ETag'],
+    })
+    assert resp.status_code == 304
+
+
+def test_firma_cambia_etag_del_contrato(propuesta):
+    _, documento_id = generar_contrato_html(propuesta.id)
+    client = app.test_client()
+
+    antes = client.get(f'/documentos/ver/{documento_id}')
+    assert 'no-cache' in antes.headers['Cache-Control']
+    assert 'immutable' not in antes.headers['Cache-Control']
+
+    resp = client.post(f'/cliente/firmar/{propuesta.token_acceso}/{documento_id}', json={'firma': 'Ana'})
+    assert resp.status_code == 200
+
+    despues = client.get(f'/documentos/ver/{documento_id}', headers={'If-None-Match': antes.headers['ETag']})
+    assert despues.status_code == 200
+    assert despues.headers['ETag'] != antes.headers['ETag']
+    assert despues.data != antes.data
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import cache_portal
+from app.cache_portal import invalidar_paginas, metricas_portal, obtener_pagina
+from app.models import Cliente, Propuesta
+
+
+@pytest.fixture
+def portal(crear_propuesta):
+    app.config.update(TESTING=True)
+    invalidar_paginas()
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Ráfaga', email='compras@example.cl', telefono='+56 9 1111 2222', direccion='Rancagua')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-PAG-0001', estado='ENVIADA', token_acceso='token-pagina',
+                        fecha_expiracion=datetime.utcnow() + timedelta(hours=12))
+        db.session.commit()
+        client = app.test_client()
+        yield client
+        db.session.remove()
+        db.drop_all()
+    invalidar_paginas()
+
+
+def test_rafaga_renderiza_una_vez_y_responde_304(portal):
+    primera = portal.get('/cliente/propuesta/token-pagina')
+    assert primera.status_code == 200 and 'PROP-PAG-0001' in primera.get_data(as_text=True)
+    etag = primera.headers['ETag']
+    assert primera.headers['Cache-Control'] == 'private, no-cache'
+    for _ in range(20):
+        resp = portal.get('/cliente/propuesta/token-pagina')
+        assert resp.get_data() == primera.get_data() and resp.headers['ETag'] == etag
+
+    condicional = portal.get('/cliente/propuesta/token-pagina', headers={'If-None-Match': etag})
+    assert condicional.status_code == 304 and condicional.get_data() == b''
+    metricas = metricas_portal()
+    assert (metricas['renders'], metricas['memoria'], metricas['no_modificadas']) == (1, 20, 1)
+
+
+def test_version_y_estado_cambian_la_clave(portal):
+    etag = portal.get('/cliente/propuesta/token-pagina').headers['ETag']
+    with portal.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    propuesta = Propuesta.query.filter_by(token_acceso='token-pagina').one()
+    assert portal.post(f'/propuestas/{propuesta.id}/modificar', json={'utilidad_porcentaje': 32}).status_code == 200
+
+    resp = portal.get('/cliente/propuesta/token-pagina', headers={'If-None-Match': etag})
+    assert resp.status_code == 200 and resp.headers['ETag'] != etag
+    assert 'REVISION' in resp.get_data(as_text=True)
+    assert metricas_portal()['renders'] == 2
+
+
+def test_nivel_en_disco(portal, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'PORTAL_CACHE_DIR', str(tmp_path))
+    cuerpo = portal.get('/cliente/propuesta/token-pagina').get_data()
+    assert len(list(tmp_path.glob('*.html'))) == 1
+
+    # Otro proceso (o un reinicio) parte con la memoria vacía
+    invalidar_paginas()
+    assert portal.get('/cliente/propuesta/token-pagina').get_data() == cuerpo
+    metricas = metricas_portal()
+    assert (metricas['disco'], metricas['renders']) == (1, 0)
+
+    for i in range(5):
+        (tmp_path / f'vieja{i}.html').write_bytes(b'x')
+    assert cache_portal.podar_disco(maximo=2) == 4
+
+
+def test_renders_concurrentes_se_unifican(portal):
+    llamadas = []
+
+    def generar():
+        llamadas.append(1)
+        time.sleep(0.1)
+        return '<html>una vez</html>'
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(obtener_pagina('clave-concurrente', generar)))
+             for _ in range(10)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(llamadas) == 1
+    assert resultados == [b'<html>una vez</html>'] * 10
+
+
+def test_memoria_acotada_en_bytes(portal, monkeypatch):
+    monkeypatch.setitem(app.config, 'PORTAL_CACHE_BYTES', 250)
+    for i in range(5):
+        obtener_pagina(f'clave-{i}', lambda: 'x' * 100)
+    metricas = metricas_portal()
+    assert (metricas['paginas'], metricas['bytes'], metricas['desalojos']) == (2, 200, 3)
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.cache_tokens import metricas_tokens, resolver_token
+from app.expiracion import expirar_vencidas
+from app.models import Cliente, Propuesta
+
+
+@pytest.fixture
+def portal(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Portal', email='portal@example.cl', telefono='+56 9 7777 8888', direccion='Iquique')
+        db.session.add(cliente)
+        db.session.flush()
+        for i in range(3):
+            crear_propuesta(cliente, f'PROP-TOK-{i:04d}', estado='ENVIADA', token_acceso=f'token-portal-{i}',
+                            fecha_expiracion=datetime.utcnow() + timedelta(hours=12))
+        db.session.commit()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def consultas_token():
+    """Cuenta los SELECT que buscan por token_acceso"""
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        if 'token_acceso =' in sentencia:
+            sentencias.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    yield sentencias
+    event.remove(db.engine, 'before_cursor_execute', capturar)
+
+
+def test_portal_reutiliza_token(portal, consultas_token):
+    for _ in range(3):
+        resp = portal.get('/cliente/propuesta/token-portal-0')
+        assert resp.status_code == 200
+        assert 'PROP-TOK-0000' in resp.get_data(as_text=True)
+    assert portal.get('/cliente/documentos/token-portal-0').get_json()['propuesta_numero'] == 'PROP-TOK-0000'
+    assert len(consultas_token) == 1
+    metricas = metricas_tokens()
+    assert (metricas['aciertos'], metricas['fallos']) == (3, 1)
+
+
+def test_token_inexistente_cacheado(portal, consultas_token):
+    for _ in range(5):
+        assert portal.get('/cliente/propuesta/token-que-no-existe').status_code == 404
+    # Lo que no tiene forma de token ni llega a la base
+    assert portal.get('/cliente/documentos/token%20inválido').status_code == 404
+    assert len(consultas_token) == 1
+    metricas = metricas_tokens()
+    assert (metricas['aciertos_negativos'], metricas['rechazados'], metricas['negativos']) == (4, 1, 1)
+
+
+def test_respuesta_y_barrido_invalidan(portal):
+    assert resolver_token('token-portal-1').estado == 'ENVIADA'
+    resp = portal.post('/cliente/respuesta/token-portal-1', json={'tipo': 'RECHAZADA'})
+    assert resp.status_code == 200
+    assert resolver_token('token-portal-1').estado == 'RECHAZADA'
+
+    entrada = resolver_token('token-portal-2')
+    db.session.query(Propuesta).filter_by(id=entrada.id).update(
+        {'fecha_expiracion': datetime.utcnow() - timedelta(minutes=1)}
+    )
+    db.session.commit()
+    assert expirar_vencidas() == 1
+    assert resolver_token('token-portal-2').estado == 'PREGENERADA'
+    assert metricas_tokens()['invalidaciones'] == 2
+
+
+def test_ttl_hasta_la_expiracion(portal):
+    propuesta = Propuesta.query.filter_by(token_acceso='token-portal-0').one()
+    propuesta.fecha_expiracion = datetime.utcnow() + timedelta(seconds=0.3)
+    db.session.commit()
+
+    assert portal.get('/cliente/propuesta/token-portal-0').status_code == 200
+    time.sleep(0.4)
+    # La entrada venció junto con la propuesta: se vuelve a leer y se muestra expirada
+    assert 'ha expirado' in portal.get('/cliente/propuesta/token-portal-0').get_data(as_text=True)
+    assert metricas_tokens()['fallos'] == 2
+
+
+def test_lru_acotado(portal, monkeypatch):
+    monkeypatch.setitem(app.config, 'TOKENS_CACHE_MAX', 2)
+    for i in range(3):
+        resolver_token(f'token-portal-{i}')
+    metricas = metricas_tokens()
+    assert (metricas['entradas'], metricas['desalojos']) == (2, 1)
+    # La más antigua salió: vuelve a la base
+    resolver_token('token-portal-0')
+    assert metricas_tokens()['fallos'] == 4
@@ -0,0 +1,114 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import cola_render
+from app.models import Cliente, DocumentoGenerado, Propuesta, TrabajoRender
+
+
+@pytest.fixture
+def admin(crear_propuesta):
+    """Cliente autenticado con render asíncrono y despachador externo."""
+    app.config.update(TESTING=True, RENDER_ASINCRONO=True, RENDER_DESPACHADOR='externo')
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Cola', email='cola@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-COLA-0001')
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client
+        db.session.remove()
+        db.drop_all()
+    app.config['RENDER_ASINCRONO'] = False
+
+
+def enviar(client):
+    propuesta = Propuesta.query.filter_by(numero_propuesta='PROP-COLA-0001').first()
+    return client.post(f'/propuestas/{propuesta.id}/enviar')
+
+
+def test_enviar_encola_y_responde_202(admin):
+    resp = enviar(admin)
+    assert resp.status_code == 202
+    datos = resp.get_json()
+    assert datos['success'] and datos['documento_id'] is None
+    # El estado cambia en la misma transacción que el encolado
+    assert Propuesta.query.filter_by(numero_propuesta='PROP-COLA-0001').first().estado == 'ENVIADA'
+    assert DocumentoGenerado.query.count() == 0
+
+    estado = admin.get(datos['url_estado']).get_json()
+    assert estado['estado'] == 'PENDIENTE'
+
+    assert cola_render.procesar_pendientes() == 1
+    estado = admin.get(datos['url_estado']).get_json()
+    assert estado['estado'] == 'COMPLETADO'
+    assert estado['intentos'] == 1
+    documento = db.session.get(DocumentoGenerado, estado["documento_id"])
+    assert documento.tipo == 'PROPUESTA' and os.path.exists(documento.archivo_path)
+
+
+def test_reintentos_con_backoff(admin, monkeypatch):
+    def falla(propuesta_id):
+        raise RuntimeError('renderizador caído')
+
+    monkeypatch.setattr(cola_render, '_renderizadores', lambda: {'PROPUESTA': falla})
+    trabajo_id = enviar(admin).get_json()['trabajo_id']
+
+    assert cola_render.procesar_pendientes() == 0
+    db.session.expire_all()
+    trabajo = db.session.get(TrabajoRender, trabajo_id)
+    assert trabajo.estado == 'PENDIENTE'
+    assert trabajo.intentos == 1
+    assert 'renderizador caído' in trabajo.error
+    assert trabajo.proximo_intento > datetime.utcnow()
+    # Aún en espera de backoff: no se vuelve a reclamar
+    assert cola_render.procesar_pendientes() == 0
+    assert db.session.get(TrabajoRender, trabajo_id).intentos == 1
+
+    # Agotados los intentos queda FALLIDO
+    trabajo.intentos = trabajo.max_intentos - 1
+    trabajo.proximo_intento = datetime.utcnow()
+    db.session.commit()
+    cola_render.procesar_pendientes()
+    db.session.expire_all()
+    assert db.session.get(TrabajoRender, trabajo_id).estado == 'FALLIDO'
+
+
+def test_despachador_no_arranca_con_render_sincrono(monkeypatch):
+    arrancados = []
+    monkeypatch.setattr(cola_render, 'obtener_despachador', lambda: arrancados.append(1) or 'despachador')
+    # Configuración por omisión: RENDER_DESPACHADOR=proceso pero sin cola que despachar
+    monkeypatch.setitem(app.config, 'RENDER_ASINCRONO', False)
+    monkeypatch.setitem(app.config, 'RENDER_DESPACHADOR', 'proceso')
+    assert cola_render.iniciar_despachador_render() is None
+    assert arrancados == []
+
+
+def test_despachador_arranca_con_el_servidor(monkeypatch):
+    arrancados = []
+    monkeypatch.setattr(cola_render, 'obtener_despachador', lambda: arrancados.append(1) or 'despachador')
+    monkeypatch.setitem(app.config, 'RENDER_ASINCRONO', True)
+    monkeypatch.setitem(app.config, 'RENDER_DESPACHADOR', 'externo')
+    assert cola_render.iniciar_despachador_render() is None
+    # Con 'proceso' arranca sin esperar a que se encole un trabajo nuevo
+    monkeypatch.setitem(app.config, 'RENDER_DESPACHADOR', 'proceso')
+    assert cola_render.iniciar_despachador_render() == 'despachador'
+    assert arrancados == [1]
+
+
+def test_espera_reintento_exponencial():
+    with app.app_context():
+        base = app.config['RENDER_REINTENTO_BASE']
+        assert cola_render.espera_reintento(1) == base
+        assert cola_render.espera_reintento(3) == base * 4
+        assert cola_render.espera_reintento(50) == cola_render.REINTENTO_MAXIMO_SEGUNDOS
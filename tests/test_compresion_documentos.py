@@ -0,0 +1,87 @@
+import os
+import sys
+import gzip
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import almacen_documentos
+from app.almacen_documentos import guardar_documento, leer_documento, recomprimir_objetos, variantes
+from app.models import Cliente, DocumentoGenerado, Propuesta
+from app.routes import generar_propuesta_html
+
+
+@pytest.fixture
+def documento(crear_propuesta):
+    """Propuesta renderizada con almacenamiento gzip."""
+    app.config.update(TESTING=True, DOCUMENTOS_COMPRESION=['gzip'])
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Compresión', email='gz@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-GZ-0001')
+        db.session.commit()
+        propuesta = Propuesta.query.filter_by(numero_propuesta='PROP-GZ-0001').first()
+        _, documento_id = generar_propuesta_html(propuesta.id)
+        yield db.session.get(DocumentoGenerado, documento_id)
+        db.session.remove()
+        db.drop_all()
+    app.config['DOCUMENTOS_COMPRESION'] = []
+
+
+def test_se_guarda_solo_comprimido(documento):
+    presentes = variantes(documento.archivo_path)
+    assert list(presentes) == ['gzip']
+    contenido = leer_documento(documento.archivo_path)
+    assert almacen_documentos.calcular_hash(contenido) == documento.hash_documento
+    assert os.path.getsize(presentes['gzip']) < len(contenido) / 2
+
+
+def test_passthrough_si_el_cliente_acepta_gzip(documento):
+    resp = app.test_client().get(f'/documentos/ver/{documento.id}', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert gzip.decompress(resp.data) == leer_documento(documento.archivo_path)
+
+
+def test_descomprime_si_el_cliente_no_acepta(documento, monkeypatch):
+    monkeypatch.setattr(almacen_documentos, 'TAMANO_BLOQUE', 512)
+    client = app.test_client()
+    resp = client.get(f'/documentos/ver/{documento.id}', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.is_streamed
+    assert resp.data == leer_documento(documento.archivo_path)
+    assert b'PROP-GZ-0001' in resp.data
+
+    descarga = client.get(f'/documentos/descargar/{documento.id}')
+    assert 'propuesta_PROP-GZ-0001_v1.html' in descarga.headers['Content-Disposition']
+    assert descarga.data == resp.data
+
+
+def test_recomprimir_objetos_existentes(documento):
+    app.config['DOCUMENTOS_COMPRESION'] = []
+    _, ruta = guardar_documento('<html>' + 'sin comprimir ' * 500 + '</html>')
+    assert list(variantes(ruta)) == ['identity']
+
+    app.config['DOCUMENTOS_COMPRESION'] = ['gzip']
+    resultado = recomprimir_objetos()
+    assert resultado['objetos'] >= 1
+    assert resultado['bytes_despues'] < resultado['bytes_antes']
+    assert list(variantes(ruta)) == ['gzip']
+    assert leer_documento(ruta).startswith(b'<html>sin comprimir')
+
+
+def test_brotli_opcional(documento):
+    brotli = pytest.importorskip('brotli')
+    app.config['DOCUMENTOS_COMPRESION'] = ['br', 'gzip']
+    _, ruta = guardar_documento('<html>brotli</html>')
+    assert set(variantes(ruta)) == {'br', 'gzip'}
+    documento.archivo_path = ruta
+    resp = app.test_client().get(f'/documentos/ver/{documento.id}', headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(resp.data) == b'<html>brotli</html>'
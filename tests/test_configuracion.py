@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import configuracion
+from app.configuracion import (
+    actualizar_configuracion,
+    invalidar_configuracion,
+    obtener_configuracion,
+    sembrar_configuracion,
+)
+from app.models import ConfiguracionCostos
+
+
+@pytest.fixture
+def contexto():
+    app.config.update(TESTING=True, CONFIGURACION_VERIFICACION=60)
+    with app.app_context():
+        db.create_all()
+        invalidar_configuracion()
+        yield
+        db.session.remove()
+        db.drop_all()
+    invalidar_configuracion()
+    app.config['CONFIGURACION_VERIFICACION'] = 5
+
+
+def _sentencias(funcion):
+    capturadas = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        capturadas.append(sentencia.lstrip().split()[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    return resultado, capturadas
+
+
+def test_sin_sembrar_no_escribe_en_lectura(contexto):
+    config, sentencias = _sentencias(obtener_configuracion)
+    assert config.vigencia_propuesta_horas == 24
+    assert 'INSERT' not in sentencias
+    assert ConfiguracionCostos.query.count() == 0
+
+    assert sembrar_configuracion() is True
+    assert sembrar_configuracion() is False
+    assert ConfiguracionCostos.query.count() == 1
+
+
+def test_lecturas_desde_cache(contexto):
+    sembrar_configuracion()
+    primera = obtener_configuracion()
+    assert primera.version == 1
+    segunda, sentencias = _sentencias(obtener_configuracion)
+    assert segunda is primera
+    assert sentencias == []
+
+
+def test_otro_proceso_cambia_la_version(contexto):
+    sembrar_configuracion()
+    assert obtener_configuracion().condiciones_pago.startswith('50%')
+
+    # Cambio hecho por otro worker: solo la base lo sabe
+    with db.engine.begin() as conn:
+        conn.execute(text("UPDATE configuracion_costos SET condiciones_pago = 'Contado', version = version + 1"))
+    assert obtener_configuracion().condiciones_pago.startswith('50%')
+
+    # Al vencer el intervalo se compara la versión y se recarga
+    app.config['CONFIGURACION_VERIFICACION'] = 0
+    config = obtener_configuracion()
+    assert config.condiciones_pago == 'Contado'
+    assert config.version == 2
+
+    # Sin cambios, la verificación es solo la lectura de la versión
+    _, sentencias = _sentencias(obtener_configuracion)
+    assert sentencias == ['SELECT']
+
+
+def test_actualizar_incrementa_version(contexto):
+    sembrar_configuracion()
+    config = actualizar_configuracion('director', vigencia_propuesta_horas=48)
+    assert config.vigencia_propuesta_horas == 48
+    assert config.version == 2
+    assert config.usuario_actualizacion == 'director'
+    with pytest.raises(ValueError):
+        actualizar_configuracion('director', no_existe=1)
+    assert configuracion._cache['valor'].version == 2
@@ -0,0 +1,132 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.costos_indirectos import (
+    acumular,
+    consultar_ventana,
+    costo_indirecto_promedio,
+    reconstruir_agregados,
+    sembrar_agregados,
+    ventana_movil,
+)
+from app.models import AgregadoCostoIndirecto, CostoIndirecto
+
+AHORA = datetime(2025, 11, 20, 12, 0)
+
+
+@pytest.fixture
+def contexto():
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def _promedio_anterior(ahora):
+    """obtener_costo_indirecto_promedio() de app.py, con `ahora` fijo"""
+    costos = CostoIndirecto.query.filter(CostoIndirecto.fecha_registro >= ahora - timedelta(days=30)).all()
+    if costos:
+        return sum(c.monto for c in costos) / len(costos)
+    return 0.0
+
+
+def _sembrar():
+    for i in range(12):
+        db.session.add(CostoIndirecto(
+            mes=i + 1, año=2025, monto=4000000 + i * 300000, usuario='Admin',
+            # Fuera del día de corte: la ventana móvil tiene resolución diaria
+            fecha_registro=AHORA - timedelta(days=i * 5 + 1),
+        ))
+    db.session.commit()
+
+
+def test_insert_actualiza_agregados(contexto):
+    _sembrar()
+    meses = AgregadoCostoIndirecto.query.filter_by(granularidad='MES').count()
+    assert meses == 12
+    assert costo_indirecto_promedio(ahora=AHORA) == pytest.approx(_promedio_anterior(AHORA))
+
+    db.session.add(CostoIndirecto(mes=3, año=2025, monto=1000000, fecha_registro=AHORA))
+    db.session.commit()
+    marzo = db.session.get(AgregadoCostoIndirecto, ('MES', date(2025, 3, 1)))
+    assert marzo.cantidad == 2
+    assert marzo.suma == pytest.approx(4600000 + 1000000)
+    assert costo_indirecto_promedio(ahora=AHORA) == pytest.approx(_promedio_anterior(AHORA))
+
+
+def test_rollback_no_deja_agregados(contexto):
+    db.session.add(CostoIndirecto(mes=1, año=2025, monto=5000, fecha_registro=AHORA))
+    db.session.flush()
+    db.session.rollback()
+    assert AgregadoCostoIndirecto.query.count() == 0
+    assert ventana_movil(ahora=AHORA).cantidad == 0
+    assert costo_indirecto_promedio(ahora=AHORA) == 0.0
+
+
+def test_ventana_de_meses(contexto):
+    _sembrar()
+    ventana = consultar_ventana((2025, 2), (2025, 4))
+    assert ventana.cantidad == 3
+    assert ventana.suma == pytest.approx(4300000 + 4600000 + 4900000)
+    assert ventana.promedio == pytest.approx(4600000)
+    assert consultar_ventana(date(2026, 1, 15), date(2026, 6, 1)).cantidad == 0
+
+
+def test_promedio_lee_una_fila_de_agregados(contexto):
+    _sembrar()
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        costo_indirecto_promedio(ahora=AHORA)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    assert len(sentencias) == 1
+    assert 'agregados_costos_indirectos' in sentencias[0]
+    assert 'FROM costos_indirectos' not in sentencias[0]
+
+
+def test_reconstruir_y_carga_masiva(contexto):
+    with db.engine.begin() as conn:
+        filas = [
+            {'id': f'c-{i}', 'mes': 6, 'año': 2025, 'monto': 100.0 * (i + 1), 'fecha_registro': AHORA}
+            for i in range(4)
+        ]
+        conn.execute(CostoIndirecto.__table__.insert(), filas)
+        acumular(conn, [(f['año'], f['mes'], f['monto'], f['fecha_registro']) for f in filas])
+    assert consultar_ventana((2025, 6), (2025, 6)).suma == pytest.approx(1000.0)
+
+    # Sin agregados (base anterior a la tabla): sembrar los reconstruye una vez
+    db.session.query(AgregadoCostoIndirecto).delete()
+    db.session.commit()
+    assert sembrar_agregados() is True
+    assert sembrar_agregados() is False
+    assert consultar_ventana((2025, 6), (2025, 6)).cantidad == 4
+    assert reconstruir_agregados() == 2  # un mes y un día
+
+
+def test_rutas_costos(contexto):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    resp = client.post('/costos-indirectos/agregar', json={'mes': 5, 'año': 2025, 'monto': 250000, 'descripcion': 'Arriendo'})
+    assert resp.get_json()['success'] is True
+    assert client.get('/costos-indirectos').status_code == 200
+
+    resp = client.get('/api/costos-indirectos/ventana?desde=2025-01&hasta=2025-12')
+    assert resp.get_json()['cantidad'] == 1
+    assert resp.get_json()['suma'] == 250000
+    assert client.get('/api/costos-indirectos/ventana?desde=2025').status_code == 400
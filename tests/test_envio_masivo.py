@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import envio_masivo
+from app.models import Cliente, DocumentoGenerado, EventoAuditoria, Notificacion, Propuesta
+
+PROPUESTAS = 30
+
+
+@pytest.fixture
+def lote(crear_propuesta, tmp_path, monkeypatch):
+    app.config.update(TESTING=True)
+    monkeypatch.setitem(app.config, 'DOCUMENTOS_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'ENVIO_MASIVO_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'ENVIO_MASIVO_LOTE', 10)
+    monkeypatch.setitem(app.config, 'ENVIO_MASIVO_BLOQUE', 5)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Lote', email='compras@example.cl', telefono='+56 9 7777 8888')
+        db.session.add(cliente)
+        db.session.flush()
+        propuestas = [crear_propuesta(cliente, f'PROP-LOT-{i:04d}', estado='PREGENERADA') for i in range(PROPUESTAS)]
+        enviada = crear_propuesta(cliente, 'PROP-LOT-ENV', estado='ENVIADA')
+        db.session.commit()
+        ids, ya_enviada = [p.id for p in propuestas], enviada.id
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client, ids, ya_enviada
+        db.session.remove()
+        db.drop_all()
+
+
+def _eventos(resp):
+    assert resp.mimetype == 'application/x-ndjson'
+    return [json.loads(linea) for linea in resp.get_data(as_text=True).splitlines()]
+
+
+def _por_resultado(eventos):
+    resultados = {}
+    for evento in eventos:
+        if evento['evento'] == 'propuesta':
+            resultados.setdefault(evento['resultado'], []).append(evento['id'])
+    return resultados
+
+
+def test_envio_por_ids_con_sentencias_masivas(lote):
+    client, ids, ya_enviada = lote
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement.split()[0:3])
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        eventos = _eventos(client.post('/propuestas/enviar-lote', json={'ids': ids + [ya_enviada, 'no-existe']}))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+
+    assert eventos[0] == {'evento': 'inicio', 'total': 32, 'enviables': 30}
+    resultados = _por_resultado(eventos)
+    assert sorted(resultados['ENVIADA']) == sorted(ids)
+    assert sorted(resultados['OMITIDA']) == sorted([ya_enviada, 'no-existe'])
+    fin = eventos[-1]
+    assert (fin['evento'], fin['enviadas'], fin['omitidas'], fin['errores']) == ('fin', 30, 2, 0)
+
+    # Un UPDATE y un INSERT por tabla en cada lote de 10
+    assert sentencias.count(['UPDATE', 'propuestas', 'SET']) == 3
+    assert sentencias.count(['INSERT', 'INTO', 'notificaciones']) == 3
+    assert sentencias.count(['INSERT', 'INTO', 'documentos_generados']) == 3
+
+    db.session.remove()
+    assert Propuesta.query.filter_by(estado='ENVIADA').count() == 31
+    assert Notificacion.query.filter_by(tipo='ENVIO').count() == 30
+    assert DocumentoGenerado.query.count() == 30
+    assert EventoAuditoria.query.filter_by(accion='ENVIO_PROPUESTA').count() == 30
+    assert all(p.fecha_expiracion for p in Propuesta.query.filter(Propuesta.id.in_(ids)))
+
+
+def test_envio_por_filtro(lote):
+    client, ids, _ = lote
+    eventos = _eventos(client.post('/propuestas/enviar-lote', json={'filtro': {'estado': 'PREGENERADA'}}))
+    assert sorted(_por_resultado(eventos)['ENVIADA']) == sorted(ids)
+    # Nada más que enviar
+    resp = client.post('/propuestas/enviar-lote', json={'filtro': {'estado': 'PREGENERADA'}})
+    assert resp.status_code == 400
+
+
+def test_validaciones(lote, monkeypatch):
+    client, ids, _ = lote
+    assert client.post('/propuestas/enviar-lote', json={}).status_code == 400
+    assert client.post('/propuestas/enviar-lote', json={'ids': 'uno'}).status_code == 400
+    assert client.post('/propuestas/enviar-lote', json={'filtro': {'estado': 'ACEPTADA'}}).status_code == 400
+    monkeypatch.setitem(app.config, 'ENVIO_MASIVO_MAX', 5)
+    assert client.post('/propuestas/enviar-lote', json={'ids': ids}).status_code == 400
+
+
+def test_lote_fallido_se_deshace_y_sigue(lote, tmp_path, monkeypatch):
+    client, ids, _ = lote
+    llamadas = []
+    url_for_original = envio_masivo.url_for
+
+    def url_for_falla_en_segundo_lote(*args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) == 15:
+            raise RuntimeError('sin enlace')
+        return url_for_original(*args, **kwargs)
+
+    monkeypatch.setattr(envio_masivo, 'url_for', url_for_falla_en_segundo_lote)
+    eventos = _eventos(client.post('/propuestas/enviar-lote', json={'ids': ids}))
+    resultados = _por_resultado(eventos)
+    assert resultados['ERROR'] == ids[10:20]
+    assert sorted(resultados['ENVIADA']) == sorted(ids[:10] + ids[20:])
+
+    db.session.remove()
+    assert Propuesta.query.filter_by(estado='PREGENERADA').count() == 10
+    assert Notificacion.query.count() == 20
+    documentos = DocumentoGenerado.query.all()
+    # Solo quedan en disco los documentos de los lotes confirmados
+    en_disco = {nombre for _, _, nombres in os.walk(tmp_path) for nombre in nombres}
+    assert en_disco == {os.path.basename(d.archivo_path) for d in documentos}
+
+
+def test_render_en_pool_de_procesos(lote, monkeypatch):
+    client, ids, _ = lote
+    monkeypatch.setitem(app.config, 'ENVIO_MASIVO_WORKERS', 2)
+    eventos = _eventos(client.post('/propuestas/enviar-lote', json={'ids': ids[:10]}))
+    assert eventos[-1]['enviadas'] == 10
+    db.session.remove()
+    assert all(os.path.exists(d.archivo_path) for d in DocumentoGenerado.query.all())
@@ -0,0 +1,73 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.models import Cliente, Propuesta, DocumentoGenerado
+from app.estadisticas import obtener_estadisticas, invalidar_estadisticas
+
+
+@pytest.fixture
+def datos(crear_propuesta):
+    """Base con propuestas en distintos estados."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        invalidar_estadisticas()
+        cliente = Cliente(nombre='Cliente Stats', email='stats@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        estados = ['PREGENERADA', 'PREGENERADA', 'ENVIADA', 'ACEPTADA', 'RECHAZADA', 'REVISION']
+        for i, estado in enumerate(estados):
+            crear_propuesta(cliente, f'PROP-TEST-{i:04d}', estado)
+        db.session.commit()
+        yield cliente
+        db.session.remove()
+        db.drop_all()
+        invalidar_estadisticas()
+
+
+class TestEstadisticas:
+    """Conteos agregados y caché del dashboard."""
+
+    def test_conteos_por_estado(self, datos):
+        stats = obtener_estadisticas()
+        assert stats['total'] == 6
+        assert stats['pregeneradas'] == 2
+        assert stats['enviadas'] == 1
+        assert stats['aceptadas'] == 1
+        assert stats['rechazadas'] == 1
+        assert stats['revision'] == 1
+        assert stats['contratos_firmados'] == 0
+
+    def test_cache_hasta_invalidar(self, datos, crear_propuesta):
+        assert obtener_estadisticas()['total'] == 6
+        crear_propuesta(datos, 'PROP-TEST-0100', 'ENVIADA')
+        db.session.commit()
+        # Dentro del TTL se sirve el valor cacheado
+        assert obtener_estadisticas()['total'] == 6
+        invalidar_estadisticas()
+        stats = obtener_estadisticas()
+        assert stats['total'] == 7
+        assert stats['enviadas'] == 2
+
+    def test_contratos_firmados(self, datos):
+        propuesta = Propuesta.query.filter_by(estado='ACEPTADA').first()
+        db.session.add(DocumentoGenerado(
+            propuesta_id=propuesta.id,
+            tipo='CONTRATO',
+            version=1,
+            archivo_path='contrato.html',
+            firmado=True,
+        ))
+        db.session.commit()
+        invalidar_estadisticas()
+        assert obtener_estadisticas()['contratos_firmados'] == 1
+
+    def test_api_estadisticas(self, datos):
+        resp = app.test_client().get('/api/propuestas/estadisticas')
+        assert resp.status_code == 200
+        assert resp.get_json()['total'] == 6
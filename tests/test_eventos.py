@@ -0,0 +1,174 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import eventos, routes
+from app.estadisticas import invalidar_estadisticas, obtener_estadisticas
+from app.eventos import RESINCRONIZAR, Seguidor, Suscripcion, conexiones, registrar_cambio, suscribir
+from app.models import CambioEstado, Cliente, DocumentoGenerado, Notificacion, Propuesta, RespuestaCliente
+from app.routes import generar_contrato_html
+
+
+@pytest.fixture
+def enviadas(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Eventos', email='compras@example.cl', telefono='+56 9 3333 4444')
+        db.session.add(cliente)
+        db.session.flush()
+        for i in range(3):
+            crear_propuesta(cliente, f'PROP-EVT-{i:04d}', estado='ENVIADA', token_acceso=f'token-evt-{i}')
+        db.session.commit()
+        invalidar_estadisticas()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client
+        db.session.remove()
+        db.drop_all()
+        invalidar_estadisticas()
+
+
+def _responder(client, i, tipo):
+    resp = client.post(f'/cliente/respuesta/token-evt-{i}', json={'tipo': tipo})
+    assert resp.status_code == 200
+    db.session.remove()
+
+
+def test_respuesta_publica_y_ajusta_conteos(enviadas):
+    suscripcion = suscribir()
+    try:
+        assert obtener_estadisticas()['enviadas'] == 3
+        _responder(enviadas, 0, 'RECHAZADA')
+
+        evento = suscripcion.siguiente(0)
+        assert (evento['evento'], evento['numero_propuesta']) == ('estado', 'PROP-EVT-0000')
+        assert (evento['anterior'], evento['estado']) == ('ENVIADA', 'RECHAZADA')
+        assert CambioEstado.query.one().id == evento['id']
+
+        sentencias = []
+
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            stats = obtener_estadisticas()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+        # El cambio se aplicó sobre los conteos cacheados, sin volver a contar
+        assert sentencias == []
+        assert (stats['enviadas'], stats['rechazadas'], stats['ultimo_cambio']) == (2, 1, evento['id'])
+    finally:
+        eventos.cancelar(suscripcion)
+
+
+def test_firmar_dos_veces_cuenta_una_firma(enviadas, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'DOCUMENTOS_DIR', str(tmp_path))
+    propuesta = Propuesta.query.filter_by(token_acceso='token-evt-2').one()
+    propuesta.estado = 'ACEPTADA'
+    db.session.commit()
+    _, documento_id = generar_contrato_html(propuesta.id)
+    assert obtener_estadisticas()['contratos_firmados'] == 0
+
+    for _ in range(2):
+        resp = enviadas.post(f'/cliente/firmar/token-evt-2/{documento_id}', json={'firma': 'Ana'})
+        assert resp.status_code == 200 and resp.get_json()['success']
+        db.session.remove()
+
+    assert obtener_estadisticas()['contratos_firmados'] == 1
+    assert CambioEstado.query.filter_by(tipo='FIRMA').count() == 1
+    assert Notificacion.query.filter_by(tipo='FIRMA').count() == 1
+
+
+def test_aceptacion_se_guarda_aunque_falle_el_contrato(enviadas, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'DOCUMENTOS_DIR', str(tmp_path))
+
+    def almacen_caido(contenido, creados=None):
+        raise OSError('disco lleno')
+
+    monkeypatch.setattr(routes, 'guardar_documento', almacen_caido)
+    resp = enviadas.post('/cliente/respuesta/token-evt-0', json={'tipo': 'ACEPTADA'})
+    assert resp.status_code == 200
+    assert resp.get_json()['error_contrato'] == 'disco lleno'
+    db.session.remove()
+
+    # La unidad del contrato se sumó a la de la respuesta: solo se perdió el contrato
+    propuesta = Propuesta.query.filter_by(token_acceso='token-evt-0').one()
+    assert propuesta.estado == 'ACEPTADA'
+    assert RespuestaCliente.query.filter_by(propuesta_id=propuesta.id).one().tipo_respuesta == 'ACEPTADA'
+    assert CambioEstado.query.filter_by(propuesta_id=propuesta.id).one().estado == 'ACEPTADA'
+    assert DocumentoGenerado.query.filter_by(propuesta_id=propuesta.id, tipo='CONTRATO').count() == 0
+
+
+def test_cola_acotada_pide_resincronizar():
+    suscripcion = Suscripcion(maximo=2)
+    for i in range(3):
+        suscripcion.entregar({'id': i, 'propuesta_id': 'p'})
+    assert suscripcion.siguiente(0) is RESINCRONIZAR
+    # Los pendientes se descartaron
+    assert suscripcion.siguiente(0) is None
+
+
+def test_rollback_no_publica(enviadas):
+    suscripcion = suscribir()
+    try:
+        propuesta = Propuesta.query.first()
+        propuesta.estado = 'ACEPTADA'
+        registrar_cambio(propuesta, 'ENVIADA')
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert suscripcion.siguiente(0) is None
+        assert CambioEstado.query.count() == 0
+    finally:
+        eventos.cancelar(suscripcion)
+
+
+def test_seguidor_de_la_tabla(enviadas, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTOS_DIFUSION', 'tabla')
+    # Sin hilo: la prueba revisa la tabla a mano
+    monkeypatch.setattr(eventos, 'iniciar_seguidor', lambda: None)
+    seguidor = Seguidor(intervalo=1)
+    suscripcion = suscribir(propuesta_id=None)
+    try:
+        assert seguidor.revisar() == 0
+        _responder(enviadas, 1, 'REVISION')
+        # Como si lo hubiera confirmado otro worker: no se publica al confirmar
+        assert suscripcion.siguiente(0) is None
+        assert seguidor.revisar() == 1
+        assert suscripcion.siguiente(0)['estado'] == 'REVISION'
+        assert seguidor.revisar() == 0
+    finally:
+        eventos.cancelar(suscripcion)
+
+
+def test_transmision_retoma_desde_last_event_id(enviadas, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTOS_DURACION_MAX', 0.2)
+    monkeypatch.setitem(app.config, 'EVENTOS_LATIDO', 0.05)
+    _responder(enviadas, 0, 'RECHAZADA')
+    _responder(enviadas, 1, 'REVISION')
+    primero, segundo = [c.id for c in CambioEstado.query.order_by(CambioEstado.id)]
+
+    resp = enviadas.get('/eventos', headers={'Last-Event-ID': str(primero)})
+    assert resp.mimetype == 'text/event-stream'
+    cuerpo = resp.get_data(as_text=True)
+    assert cuerpo.startswith('retry: ')
+    assert f'id: {segundo}\nevent: estado\n' in cuerpo
+    assert f'id: {primero}\n' not in cuerpo
+    assert ': latido' in cuerpo
+    assert conexiones() == 0
+
+
+def test_limite_de_conexiones(enviadas, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTOS_MAX_CONEXIONES', 0)
+    resp = enviadas.get('/eventos')
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '30'
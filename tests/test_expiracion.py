@@ -0,0 +1,101 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.expiracion import expirar_vencidas
+from app.models import Cliente, DocumentoGenerado, Notificacion, Propuesta
+
+AHORA = datetime(2025, 11, 20, 12, 0)
+
+
+@pytest.fixture
+def propuestas(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Vence', email='vence@example.cl', telefono='+56 9 3333 4444', direccion='Talca')
+        db.session.add(cliente)
+        db.session.flush()
+        for i in range(7):
+            crear_propuesta(cliente, f'PROP-EXP-{i:04d}', estado='ENVIADA', token_acceso=f'token-exp-{i}',
+                            fecha_expiracion=AHORA - timedelta(hours=i + 1))
+        crear_propuesta(cliente, 'PROP-EXP-VIGENTE', estado='ENVIADA', token_acceso='token-vigente',
+                        fecha_expiracion=AHORA + timedelta(hours=3))
+        crear_propuesta(cliente, 'PROP-EXP-ACEPTADA', estado='ACEPTADA', token_acceso='token-aceptada',
+                        fecha_expiracion=AHORA - timedelta(hours=2))
+        db.session.commit()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def _estados():
+    return {p.numero_propuesta: p.estado for p in Propuesta.query}
+
+
+def test_barrido_por_lotes(propuestas):
+    assert expirar_vencidas(ahora=AHORA, tamano_lote=3) == 7
+    estados = _estados()
+    assert sorted(n for n, e in estados.items() if e == 'PREGENERADA') == [f'PROP-EXP-{i:04d}' for i in range(7)]
+    assert estados['PROP-EXP-VIGENTE'] == 'ENVIADA'
+    assert estados['PROP-EXP-ACEPTADA'] == 'ACEPTADA'
+
+    notificaciones = Notificacion.query.filter_by(tipo='EXPIRACION').all()
+    assert len(notificaciones) == 7
+    assert {n.destinatario for n in notificaciones} == {'vence@example.cl'}
+
+    # Idempotente: un segundo barrido no encuentra nada
+    assert expirar_vencidas(ahora=AHORA) == 0
+    assert Notificacion.query.filter_by(tipo='EXPIRACION').count() == 7
+
+
+def test_usa_indice_estado_fecha_expiracion(propuestas):
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM propuestas WHERE estado = 'ENVIADA' "
+        "AND fecha_expiracion < :ahora ORDER BY fecha_expiracion LIMIT 500"
+    ), {'ahora': AHORA}).all()
+    detalle = ' '.join(str(fila[-1]) for fila in plan)
+    assert 'ix_propuestas_estado_fecha_expiracion' in detalle
+    assert 'TEMP B-TREE' not in detalle
+
+
+def test_portal_no_escribe(propuestas):
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia.lstrip().split()[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        resp = app.test_client().get('/cliente/propuesta/token-exp-0')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    assert resp.status_code == 200
+    assert 'ha expirado' in resp.get_data(as_text=True)
+    assert set(sentencias) == {'SELECT'}
+    db.session.expire_all()
+    assert Propuesta.query.filter_by(token_acceso='token-exp-0').one().estado == 'ENVIADA'
+
+
+def test_respuesta_a_vencida_ya_barrida(propuestas):
+    assert expirar_vencidas(AHORA) == 7
+    resp = app.test_client().post('/cliente/respuesta/token-exp-0', json={'tipo': 'ACEPTADA'})
+    assert resp.status_code == 400
+    db.session.expire_all()
+    propuesta = Propuesta.query.filter_by(token_acceso='token-exp-0').one()
+    assert propuesta.estado == 'PREGENERADA'
+    # Sin contrato generado
+    assert DocumentoGenerado.query.filter_by(propuesta_id=propuesta.id).count() == 0
+
+
+def test_respuesta_a_vencida_pendiente_de_barrido(propuestas):
+    resp = app.test_client().post('/cliente/respuesta/token-exp-0', json={'tipo': 'ACEPTADA'})
+    assert resp.status_code == 400
+    assert Propuesta.query.filter_by(token_acceso='token-exp-0').one().estado == 'ENVIADA'
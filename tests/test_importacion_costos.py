@@ -0,0 +1,114 @@
+import io
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import importacion_costos
+from app.costos_indirectos import consultar_ventana, reconstruir_agregados
+from app.importacion_costos import importar_costos, leer_filas, validar_lote
+from app.models import AgregadoCostoIndirecto, CostoIndirecto
+
+
+@pytest.fixture
+def contexto():
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def _agregados():
+    return sorted(
+        (a.granularidad, a.periodo, round(a.suma, 2), a.cantidad)
+        for a in AgregadoCostoIndirecto.query if a.cantidad
+    )
+
+
+def test_validacion_vectorizada():
+    filas = [
+        {'mes': '3', 'año': '2024', 'monto': '1500.5'},
+        {'mes': '13', 'año': '2024', 'monto': '10'},
+        {'mes': '2.5', 'año': '2024', 'monto': '10'},
+        {'mes': '1', 'año': 'dos mil', 'monto': '10'},
+        {'mes': '1', 'año': '2024', 'monto': '-1'},
+        {'mes': '1', 'año': '2024'},
+        None,
+    ]
+    mes, año, monto, motivos = validar_lote(filas)
+    assert motivos == [None, 'mes inválido', 'mes inválido', 'año inválido', 'monto inválido', 'monto inválido', 'fila ilegible']
+    assert (mes[0], año[0], monto[0]) == (3, 2024, 1500.5)
+
+
+def test_csv_por_lotes_con_rechazos(contexto, monkeypatch):
+    monkeypatch.setattr(importacion_costos, 'TAMANO_LOTE', 4)
+    lineas = ['mes;anio;monto;descripcion']
+    lineas += [f'{m};2024;{m * 1000};Gastos {m}' for m in range(1, 13)]
+    lineas.insert(5, '14;2024;100;fuera de rango')
+    archivo = io.BytesIO(('﻿' + '\n'.join(lineas) + '\n').encode('utf-8'))
+
+    rechazos, avances = [], []
+    resumen = importar_costos(
+        leer_filas(archivo, 'csv'),
+        al_rechazar=lambda linea, fila, motivo: rechazos.append((linea, motivo)),
+        al_avanzar=lambda r: avances.append(r['leidas']),
+    )
+    assert resumen == {'leidas': 13, 'insertadas': 12, 'actualizadas': 0, 'rechazadas': 1}
+    assert rechazos == [(6, 'mes inválido')]
+    assert avances == [4, 8, 12, 13]
+    assert consultar_ventana((2024, 1), (2024, 12)).suma == pytest.approx(78000)
+    assert CostoIndirecto.query.filter_by(mes=12).one().descripcion == 'Gastos 12'
+
+
+def test_jsonl_upsert_por_id(contexto):
+    primera = io.BytesIO(
+        b'{"id": "c-1", "mes": 1, "a\\u00f1o": 2024, "monto": 100}\n'
+        b'{"id": "c-2", "mes": 2, "a\\u00f1o": 2024, "monto": 200}\n'
+        b'no es json\n'
+    )
+    resumen = importar_costos(leer_filas(primera, 'jsonl'))
+    assert (resumen['insertadas'], resumen['rechazadas']) == (2, 1)
+
+    # Reimportar con montos corregidos: actualiza y ajusta los agregados
+    segunda = io.BytesIO(
+        b'{"id": "c-1", "mes": 3, "a\\u00f1o": 2024, "monto": 150}\n'
+        b'{"id": "c-1", "mes": 3, "a\\u00f1o": 2024, "monto": 999}\n'
+        b'{"mes": 4, "a\\u00f1o": 2024, "monto": 50}\n'
+    )
+    resumen = importar_costos(leer_filas(segunda, 'jsonl'))
+    assert (resumen['insertadas'], resumen['actualizadas'], resumen['rechazadas']) == (1, 1, 1)
+    assert db.session.get(CostoIndirecto, 'c-1').monto == 150
+    assert consultar_ventana((2024, 1), (2024, 1)).cantidad == 0
+    assert consultar_ventana((2024, 1), (2024, 12)).suma == pytest.approx(400)
+
+    incrementales = _agregados()
+    reconstruir_agregados()
+    db.session.expire_all()
+    assert _agregados() == incrementales
+
+
+def test_endpoint_importar(contexto):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    contenido = 'mes,año,monto\n1,2025,1000\n0,2025,5\n2,2025,3000\n'.encode('utf-8')
+    resp = client.post('/costos-indirectos/importar', data={'archivo': (io.BytesIO(contenido), 'costos.csv')},
+                       content_type='multipart/form-data')
+    datos = resp.get_json()
+    assert (datos['insertadas'], datos['rechazadas']) == (2, 1)
+    assert datos['rechazos'] == [{'linea': 3, 'motivo': 'mes inválido'}]
+
+    resp = client.post('/costos-indirectos/importar?formato=jsonl', data=b'{"mes": 5, "a\\u00f1o": 2025, "monto": 10}\n',
+                       content_type='application/x-ndjson')
+    assert resp.get_json()['insertadas'] == 1
+
+    resp = client.post('/costos-indirectos/importar', data={'archivo': (io.BytesIO(b''), 'costos.xlsx')},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 400
@@ -0,0 +1,49 @@
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.migraciones import migrar_esquema
+
+
+def base_legada(tmp_path):
+    """Base con el esquema anterior: sin índices secundarios ni columna usuario."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legada.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for tabla in db.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.drop(conn)
+        conn.execute(text('ALTER TABLE versiones_propuesta DROP COLUMN usuario'))
+        conn.execute(text(
+            "INSERT INTO clientes (id, nombre, email) VALUES ('c1', 'Cliente Legado', 'legado@example.cl')"
+        ))
+    return engine
+
+
+def test_migracion_agrega_indices_y_columnas(tmp_path):
+    engine = base_legada(tmp_path)
+    with app.app_context():
+        cambios = migrar_esquema(engine)
+
+    assert 'columna versiones_propuesta.usuario agregada' in cambios
+    inspector = inspect(engine)
+    indices = {ix['name'] for ix in inspector.get_indexes('propuestas')}
+    assert 'ix_propuestas_estado_fecha_creacion' in indices
+    assert 'ix_propuestas_cliente_fecha_creacion' in indices
+    assert 'usuario' in {c['name'] for c in inspector.get_columns('versiones_propuesta')}
+
+    # Los datos existentes se conservan
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT nombre FROM clientes')).scalar() == 'Cliente Legado'
+
+
+def test_migracion_idempotente(tmp_path):
+    engine = base_legada(tmp_path)
+    with app.app_context():
+        assert migrar_esquema(engine)
+        assert migrar_esquema(engine) == []
@@ -0,0 +1,105 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.models import Cliente, Propuesta
+from app.motor_precios import EntradasPrecio, calcular_costos, sortear_variables
+import generar_propuestas
+
+
+def costos_escalares(distancia, tiempo, peso, volumen, tipo, duracion,
+                     viatico_diario, viatico_corto, hospedaje_noche, factor, utilidad):
+    """Cálculo fila a fila original de generar_propuestas.py."""
+    cantidad_camiones = 1
+    if volumen > 45 or peso > 10000:
+        cantidad_camiones = 2
+    costo_combustible = distancia * 400 * cantidad_camiones
+    costo_peajes = distancia * 50 * cantidad_camiones
+    if tiempo > 4:
+        costo_viaticos = viatico_diario * duracion
+        costo_hospedaje = hospedaje_noche * (duracion - 1)
+    else:
+        costo_viaticos = viatico_corto
+        costo_hospedaje = 0
+    tarifa_base = 350000 if tipo == "GC" else 285000
+    tarifa_base *= cantidad_camiones
+    costo_directo = costo_combustible + costo_peajes + costo_viaticos + costo_hospedaje + tarifa_base
+    costo_indirecto = costo_directo * factor
+    precio_final = costo_directo + costo_indirecto + (costo_directo * utilidad / 100)
+    precio_final = round(precio_final / 1000) * 1000
+    return {
+        'cantidad_camiones': cantidad_camiones,
+        'costo_combustible': costo_combustible,
+        'costo_peajes': costo_peajes,
+        'costo_viaticos': costo_viaticos,
+        'costo_hospedaje': costo_hospedaje,
+        'tarifa_base': tarifa_base,
+        'costo_directo': costo_directo,
+        'costo_indirecto_aplicado': costo_indirecto,
+        'utilidad_porcentaje': round(utilidad, 2),
+        'precio_final': precio_final,
+    }
+
+
+def test_vectorizado_identico_al_escalar():
+    rng = np.random.default_rng(1234)
+    n = 5000
+    rutas = generar_propuestas.RUTAS
+    cargas = generar_propuestas.TIPOS_CARGA
+    idx_ruta = rng.integers(0, len(rutas), n)
+    idx_carga = rng.integers(0, len(cargas), n)
+    duracion = rng.integers(2, 6, n)
+    variables = sortear_variables(rng, n)
+    entradas = EntradasPrecio(
+        distancia_km=np.array([rutas[i]['distancia'] for i in idx_ruta]),
+        tiempo_horas=np.array([rutas[i]['tiempo'] for i in idx_ruta]),
+        peso_kg=np.array([cargas[i]['peso'] for i in idx_carga]),
+        volumen_m3=np.array([cargas[i]['volumen'] for i in idx_carga]),
+        es_gc=np.array([cargas[i]['tipo'] == 'GC' for i in idx_carga]),
+        duracion_dias=duracion,
+        **variables,
+    )
+    costos = {clave: valores.tolist() for clave, valores in calcular_costos(entradas).items()}
+
+    for i in range(n):
+        ruta, carga = rutas[idx_ruta[i]], cargas[idx_carga[i]]
+        esperado = costos_escalares(
+            ruta['distancia'], ruta['tiempo'], carga['peso'], carga['volumen'], carga['tipo'],
+            int(duracion[i]),
+            int(variables['viatico_diario'][i]),
+            int(variables['viatico_corto'][i]),
+            int(variables['hospedaje_noche'][i]),
+            float(variables['factor_indirecto'][i]),
+            float(variables['utilidad_porcentaje'][i]),
+        )
+        for clave, valor in esperado.items():
+            assert costos[clave][i] == valor, (clave, i)
+
+
+@pytest.fixture
+def con_clientes():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Cliente(nombre=f'Cliente {i}', email=f'lote{i}@example.cl') for i in range(25)])
+        db.session.commit()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def test_generacion_por_lotes(con_clientes):
+    generar_propuestas.generar_propuestas_pregeneradas(batch_size=7, semilla=7)
+    propuestas = Propuesta.query.all()
+    assert 50 <= len(propuestas) <= 100
+    assert len({p.numero_propuesta for p in propuestas}) == len(propuestas)
+    for p in propuestas:
+        assert p.precio_final % 1000 == 0
+        assert p.estado == 'PREGENERADA'
+        assert 25 <= p.utilidad_porcentaje <= 35
@@ -0,0 +1,163 @@
+import os
+import sys
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import notificaciones
+from app.notificaciones import (
+    TransporteArchivo,
+    TransporteSMTP,
+    despachar_lote,
+    procesar_pendientes,
+    reclamar_notificaciones,
+)
+from app.models import Cliente, Notificacion
+
+
+class _SesionSMTP(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo que acepta todo y guarda los mensajes"""
+
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.conexiones += 1
+        self.responder('220 prueba')
+        datos = None
+        for linea in self.rfile:
+            texto = linea.decode().rstrip('\r\n')
+            if datos is not None:
+                if texto == '.':
+                    self.server.mensajes.append('\n'.join(datos))
+                    datos = None
+                    self.responder('250 OK')
+                else:
+                    datos.append(texto)
+                continue
+            comando = texto[:4].upper()
+            if comando == 'EHLO':
+                self.responder('250 prueba')
+            elif comando == 'RCPT' and 'rechazar@' in texto:
+                self.responder('550 buzón inexistente')
+            elif comando == 'DATA':
+                datos = []
+                self.responder('354 fin con .')
+            elif comando == 'QUIT':
+                self.responder('221 adiós')
+                return
+            else:
+                self.responder('250 OK')
+
+
+@pytest.fixture
+def servidor_smtp():
+    servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SesionSMTP)
+    servidor.daemon_threads = True
+    servidor.conexiones = 0
+    servidor.mensajes = []
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def bandeja(crear_propuesta):
+    app.config.update(TESTING=True, NOTIFICACIONES_LOTE=10, NOTIFICACIONES_REINTENTO_BASE=30)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Correo', email='correo@example.cl', telefono='+56 9 5555 6666', direccion='Arica')
+        db.session.add(cliente)
+        db.session.flush()
+        propuesta = crear_propuesta(cliente, 'PROP-NOT-0001')
+        db.session.flush()
+        for i in range(25):
+            db.session.add(Notificacion(
+                propuesta_id=propuesta.id, tipo='ENVIO', destinatario=f'cliente{i}@example.cl',
+                asunto=f'Propuesta {i}', mensaje='Su propuesta está disponible.',
+                fecha_creacion=datetime.utcnow() - timedelta(minutes=25 - i),
+            ))
+        db.session.commit()
+        yield
+        db.session.remove()
+        db.drop_all()
+    app.config['NOTIFICACIONES_LOTE'] = 200
+
+
+def test_lease_evita_doble_reclamo(bandeja):
+    primero = reclamar_notificaciones(10)
+    segundo = reclamar_notificaciones(10)
+    assert len(primero) == len(segundo) == 10
+    assert not {n.id for n in primero} & {n.id for n in segundo}
+    # Lo reclamado no vuelve a estar disponible hasta vencer el lease
+    assert len(reclamar_notificaciones(100)) == 5
+    assert reclamar_notificaciones(100) == []
+
+
+def test_archivo_marca_enviadas(bandeja, tmp_path):
+    transporte = TransporteArchivo(str(tmp_path), 'MGCP <no-responder@acmetrans.cl>')
+    assert procesar_pendientes(transporte) == 25
+    assert len(list(tmp_path.glob('*.eml'))) == 25
+    assert Notificacion.query.filter_by(enviada=True).count() == 25
+    assert all(n.fecha_envio for n in Notificacion.query)
+    primera = Notificacion.query.filter_by(destinatario='cliente0@example.cl').one()
+    assert 'Subject: Propuesta 0' in (tmp_path / f'{primera.id}.eml').read_text()
+
+
+def test_smtp_reutiliza_conexiones_y_reintenta(bandeja, servidor_smtp):
+    rechazada = Notificacion.query.filter_by(destinatario='cliente3@example.cl').one()
+    rechazada.destinatario = 'rechazar@example.cl'
+    db.session.commit()
+
+    transporte = TransporteSMTP('127.0.0.1', servidor_smtp.server_address[1], 'MGCP <no-responder@acmetrans.cl>', conexiones=2)
+    assert procesar_pendientes(transporte) == 24
+    assert len(servidor_smtp.mensajes) == 24
+    # Tres lotes sobre la misma sesión SMTP
+    assert transporte.conexiones_abiertas == servidor_smtp.conexiones == 1
+    transporte.cerrar()
+
+    db.session.refresh(rechazada)
+    assert not rechazada.enviada
+    assert rechazada.intentos == 1
+    assert 'SMTPRecipientsRefused' in rechazada.error
+    assert rechazada.proximo_intento >= datetime.utcnow() + timedelta(seconds=25)
+
+
+def test_backoff_exponencial_y_maximo(bandeja, monkeypatch):
+    class Falla:
+        def enviar(self, filas):
+            return {fila.id: 'caído' for fila in filas}
+
+    app.config['NOTIFICACIONES_MAX_INTENTOS'] = 2
+    try:
+        assert despachar_lote(Falla(), limite=100) == (25, 0)
+        assert notificaciones.espera_reintento(1) == 30
+        assert notificaciones.espera_reintento(3) == 120
+        # Sin esperar el backoff no hay nada disponible
+        assert despachar_lote(Falla(), limite=100) == (0, 0)
+        db.session.query(Notificacion).update({'proximo_intento': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        assert despachar_lote(Falla(), limite=100) == (25, 0)
+        # Alcanzado el máximo de intentos ya no se reclaman
+        db.session.query(Notificacion).update({'proximo_intento': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        assert despachar_lote(Falla(), limite=100) == (0, 0)
+    finally:
+        app.config['NOTIFICACIONES_MAX_INTENTOS'] = 8
+
+
+def test_sin_transporte_no_despacha(monkeypatch):
+    # Por defecto no hay transporte: un despliegue sin SMTP no marca nada como enviado
+    monkeypatch.setitem(app.config, 'NOTIFICACIONES_TRANSPORTE', '')
+    monkeypatch.setitem(app.config, 'NOTIFICACIONES_DESPACHADOR', 'proceso')
+    monkeypatch.setattr(notificaciones, '_despachador', None)
+    assert notificaciones.crear_transporte() is None
+    assert notificaciones.iniciar_despachador() is None
@@ -0,0 +1,85 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.models import Cliente
+from app.paginacion import codificar_cursor, decodificar_cursor
+
+
+@pytest.fixture
+def admin(crear_propuesta):
+    """Cliente HTTP autenticado con 7 propuestas (dos comparten fecha)."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        clientes = [Cliente(nombre=f'Cliente {i}', email=f'pag{i}@example.cl') for i in range(2)]
+        db.session.add_all(clientes)
+        db.session.flush()
+        base = datetime(2025, 12, 1, 10, 0)
+        fechas = [base + timedelta(minutes=i) for i in range(6)] + [base + timedelta(minutes=5)]
+        for i, fecha in enumerate(fechas):
+            crear_propuesta(clientes[i % 2], f'PROP-PAG-{i:04d}', fecha_creacion=fecha)
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+
+def numeros(html):
+    return [linea.strip()[4:-5] for linea in html.splitlines() if 'PROP-PAG-' in linea and '<td>' in linea]
+
+
+def test_cursor_ida_y_vuelta():
+    fecha = datetime(2025, 12, 1, 10, 30, 15, 123456)
+    assert decodificar_cursor(codificar_cursor(fecha, 'abc-123')) == (fecha, 'abc-123')
+    assert decodificar_cursor('no-es-un-cursor') is None
+
+
+def test_recorre_todas_las_paginas_sin_repetir(admin):
+    vistos = []
+    url = '/propuestas?por_pagina=1'
+    while url:
+        resp = admin.get(url)
+        assert resp.status_code == 200
+        html = resp.data.decode()
+        pagina = numeros(html)
+        assert len(pagina) <= 1
+        vistos.extend(pagina)
+        marcador = 'cursor='
+        url = None
+        for linea in html.splitlines():
+            if 'Siguiente' in linea and marcador in linea:
+                url = linea.split('href="', 1)[1].split('"', 1)[0].replace('&amp;', '&')
+    assert len(vistos) == 7
+    assert len(set(vistos)) == 7
+    # Más recientes primero
+    assert vistos[-1] == 'PROP-PAG-0000'
+
+
+def test_listado_sin_n_mas_1_ni_descripcion(admin):
+    sentencias = []
+
+    def capturar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capturar)
+        try:
+            resp = admin.get('/propuestas')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+    assert resp.status_code == 200
+    consultas = [s for s in sentencias if s.lstrip().upper().startswith('SELECT')]
+    # Una consulta para la página (con JOIN a clientes) y otra para el filtro de clientes
+    assert len(consultas) == 2
+    assert 'descripcion_servicio' not in consultas[0]
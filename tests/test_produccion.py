@@ -0,0 +1,21 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.produccion import MAX_WORKERS_SQLITE, nucleos_disponibles, recomendar_workers
+
+
+def test_recomendacion_por_nucleo():
+    assert nucleos_disponibles() >= 1
+    gunicorn = recomendar_workers('gunicorn', nucleos=2, url_base='postgresql://db/mgcp')
+    assert (gunicorn.workers, gunicorn.hilos) == (5, 4)
+    uvicorn = recomendar_workers('uvicorn', nucleos=2, url_base='postgresql://db/mgcp')
+    assert (uvicorn.workers, uvicorn.hilos) == (2, 1)
+
+
+def test_sqlite_limita_procesos():
+    recomendacion = recomendar_workers('gunicorn', nucleos=16, url_base='sqlite:///database/mgcp.db')
+    assert recomendacion.workers == MAX_WORKERS_SQLITE
+    assert 'SQLite' in recomendacion.motivo
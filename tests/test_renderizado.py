@@ -0,0 +1,103 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from flask import render_template
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import renderizado
+from app.models import Cliente, Propuesta
+from app.configuracion import obtener_configuracion, sembrar_configuracion
+
+
+@pytest.fixture
+def propuestas(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Render', email='render@example.cl', telefono='+56 9 1111 2222', direccion='Temuco')
+        db.session.add(cliente)
+        db.session.flush()
+        for i in range(30):
+            crear_propuesta(cliente, f'PROP-REN-{i:04d}', fecha_expiracion=datetime(2025, 11, 30, 18, 0) if i % 2 else None)
+        db.session.commit()
+        sembrar_configuracion()
+        yield [p.id for p in Propuesta.query.order_by(Propuesta.numero_propuesta)]
+        db.session.remove()
+        db.drop_all()
+
+
+def _contexto_anterior(propuesta, config):
+    """Contexto que armaba generar_propuesta_html antes del módulo de renderizado"""
+    return {
+        'numero_propuesta': propuesta.numero_propuesta,
+        'version': propuesta.version,
+        'fecha': datetime.now().strftime('%d/%m/%Y'),
+        'cliente': propuesta.cliente,
+        'tipo_servicio': propuesta.tipo_servicio,
+        'origen': propuesta.origen,
+        'destino': propuesta.destino,
+        'distancia_km': propuesta.distancia_km,
+        'tiempo_horas': propuesta.tiempo_estimado_horas,
+        'peso_kg': propuesta.peso_kg,
+        'volumen_m3': propuesta.volumen_m3,
+        'tipo_camion': propuesta.tipo_camion,
+        'cantidad_camiones': propuesta.cantidad_camiones,
+        'fecha_salida': propuesta.fecha_salida.strftime('%d/%m/%Y'),
+        'fecha_retorno': propuesta.fecha_retorno.strftime('%d/%m/%Y'),
+        'costo_combustible': propuesta.costo_combustible,
+        'costo_peajes': propuesta.costo_peajes,
+        'costo_viaticos': propuesta.costo_viaticos,
+        'costo_hospedaje': propuesta.costo_hospedaje,
+        'tarifa_base': propuesta.tarifa_base,
+        'costo_directo': propuesta.costo_directo,
+        'costo_indirecto': propuesta.costo_indirecto_aplicado,
+        'utilidad_porcentaje': propuesta.utilidad_porcentaje,
+        'utilidad_monto': propuesta.costo_directo * (propuesta.utilidad_porcentaje / 100),
+        'precio_final': propuesta.precio_final,
+        'vigencia_horas': config.vigencia_propuesta_horas,
+        'fecha_expiracion': propuesta.fecha_expiracion.strftime('%d/%m/%Y %H:%M') if propuesta.fecha_expiracion else 'No especificada',
+        'condiciones_pago': config.condiciones_pago,
+        'terminos_condiciones': config.terminos_condiciones,
+    }
+
+
+def test_mismo_html_que_el_contexto_anterior(propuestas):
+    config = obtener_configuracion()
+    html = renderizado.render_many(propuestas[:4], config=config)
+    for propuesta_id in propuestas[:4]:
+        propuesta = db.session.get(Propuesta, propuesta_id)
+        with app.test_request_context():
+            esperado = render_template('pdf/propuesta_template.html', **_contexto_anterior(propuesta, config))
+        assert html[propuesta_id] == esperado
+
+
+def test_render_many_una_consulta_por_lote(propuestas, monkeypatch):
+    config = obtener_configuracion()
+    monkeypatch.setattr(renderizado, 'TAMANO_BLOQUE_IDS', 20)
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        html = renderizado.render_many(propuestas + ['no-existe'], config=config)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    assert list(html) == propuestas
+    assert all('PROP-REN-' in contenido for contenido in html.values())
+    # 30 ids en bloques de 20: dos SELECT en total, sin cargas perezosas de cliente
+    assert len([s for s in sentencias if s.lstrip().upper().startswith('SELECT')]) == 2
+
+
+def test_bytecode_en_disco(propuestas):
+    renderizado.precompilar()
+    archivos = os.listdir(app.config['PLANTILLAS_CACHE_DIR'])
+    assert len([a for a in archivos if a.startswith('mgcp_')]) >= len(renderizado.PLANTILLAS)
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.auditoria import vaciar
+from app.base_datos import REPLICA, instalar_pragmas, opciones_motor
+from app.cache_portal import invalidar_paginas
+from app.models import Cliente, Propuesta
+
+
+class Replica:
+    """Segundo archivo SQLite como réplica; replicar() copia la primaria (la "replicación")"""
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        url = 'sqlite:///' + self.ruta
+        self.motor = create_engine(url, **opciones_motor(url, app.config))
+        instalar_pragmas(self.motor, app.config)
+        self.consultas = 0
+        event.listen(self.motor, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self.consultas += 1
+
+    def replicar(self):
+        db.session.commit()
+        self.motor.dispose()
+        origen = sqlite3.connect(db.engine.url.database)
+        destino = sqlite3.connect(self.ruta)
+        with destino:
+            origen.backup(destino)
+        origen.close()
+        destino.close()
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch, crear_propuesta):
+    app.config.update(TESTING=True)
+    invalidar_paginas()
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Réplica', email='compras@example.cl', telefono='+56 9 3333 4444')
+        db.session.add(cliente)
+        db.session.flush()
+        crear_propuesta(cliente, 'PROP-REP-0001', estado='ENVIADA', token_acceso='token-replica',
+                        fecha_expiracion=datetime.utcnow() + timedelta(hours=12))
+        db.session.commit()
+        copia = Replica(tmp_path / 'replica.db')
+        copia.replicar()
+        monkeypatch.setitem(db.engines, REPLICA, copia.motor)
+        yield copia
+        vaciar()
+        db.session.remove()
+        db.drop_all()
+        copia.motor.dispose()
+    invalidar_paginas()
+
+
+def _get(client, ruta):
+    """GET con sesión de base nueva (las peticiones comparten el app context del fixture)"""
+    texto = client.get(ruta).get_data(as_text=True)
+    db.session.remove()
+    return texto
+
+
+def _admin():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    return client
+
+
+def test_lecturas_van_a_la_replica(replica):
+    db.session.add(Cliente(nombre='Solo en primaria', email='nuevo@example.cl'))
+    db.session.commit()
+    db.session.remove()
+
+    nombres = [c['nombre'] for c in app.test_client().get('/api/clientes').get_json()]
+    assert nombres == ['Compras Réplica'] and replica.consultas > 0
+
+    replica.replicar()
+    nombres = [c['nombre'] for c in app.test_client().get('/api/clientes').get_json()]
+    assert sorted(nombres) == ['Compras Réplica', 'Solo en primaria']
+
+
+def test_escrituras_en_primaria_y_lectura_propia(replica):
+    propuesta_id = Propuesta.query.filter_by(numero_propuesta='PROP-REP-0001').one().id
+    db.session.remove()
+    director = _admin()
+    replica.consultas = 0
+    resp = director.post(f'/propuestas/{propuesta_id}/modificar', json={'utilidad_porcentaje': 32})
+    assert resp.get_json()['nueva_version'] == 2
+    assert replica.consultas == 0
+    db.session.remove()
+
+    # El mismo navegador ve su cambio aunque la réplica no lo tenga
+    assert 'REVISION' in _get(director, f'/propuestas/{propuesta_id}')
+    assert replica.consultas == 0
+
+    # Otro navegador lee de la réplica, todavía atrasada
+    otro = _admin()
+    assert 'REVISION' not in _get(otro, f'/propuestas/{propuesta_id}')
+    assert replica.consultas > 0
+
+    # Pasada la ventana, el autor también vuelve a la réplica
+    with director.session_transaction() as sess:
+        sess['lectura_primaria_hasta'] = 0
+    replica.consultas = 0
+    _get(director, f'/propuestas/{propuesta_id}')
+    assert replica.consultas > 0
+
+
+def test_token_nuevo_no_queda_como_inexistente(replica, crear_propuesta):
+    cliente = Cliente.query.one()
+    crear_propuesta(cliente, 'PROP-REP-0002', estado='ENVIADA', token_acceso='token-recien-enviado',
+                    fecha_expiracion=datetime.utcnow() + timedelta(hours=12))
+    db.session.commit()
+    db.session.remove()
+
+    # La réplica no tiene el enlace: se busca en la primaria en vez de responder 404
+    resp = app.test_client().get('/cliente/propuesta/token-recien-enviado')
+    assert resp.status_code == 200 and 'PROP-REP-0002' in resp.get_data(as_text=True)
+
+
+def test_sin_replica_todo_va_a_la_primaria(replica, monkeypatch):
+    monkeypatch.delitem(db.engines, REPLICA)
+    replica.consultas = 0
+    assert app.test_client().get('/api/clientes').status_code == 200
+    assert replica.consultas == 0
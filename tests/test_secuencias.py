@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import multiprocessing
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.models import Cliente, Propuesta
+from app.secuencias import reservar_numero, reservar_numeros
+
+FECHA = datetime(2031, 7, 15)
+HILOS = 8
+PROCESOS = 4
+POR_TRABAJADOR = 15
+
+
+def crear_propuestas(cliente_id, cantidad):
+    """Crea propuestas como lo haría una ruta: reserva el número y luego inserta."""
+    import secrets
+    with app.app_context():
+        for _ in range(cantidad):
+            numero = reservar_numero(fecha=FECHA)
+            db.session.add(Propuesta(
+                cliente_id=cliente_id,
+                numero_propuesta=numero,
+                tipo_servicio='Concurrencia',
+                origen='Santiago',
+                destino='Valparaíso',
+                distancia_km=159.4,
+                tiempo_estimado_horas=2.9,
+                peso_kg=1000,
+                volumen_m3=20,
+                tipo_camion='MC',
+                fecha_salida=FECHA,
+                fecha_retorno=FECHA,
+                costo_combustible=0,
+                costo_peajes=0,
+                costo_viaticos=0,
+                costo_hospedaje=0,
+                tarifa_base=0,
+                costo_directo=0,
+                descripcion_servicio='',
+                utilidad_porcentaje=30,
+                precio_final=0,
+                token_acceso=secrets.token_urlsafe(32),
+            ))
+            db.session.commit()
+        db.session.remove()
+
+
+@pytest.fixture
+def cliente_id():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Secuencias', email='secuencias@example.cl')
+        db.session.add(cliente)
+        db.session.commit()
+        yield cliente.id
+        db.session.remove()
+        db.drop_all()
+
+
+def test_bloque_consecutivo(cliente_id):
+    with app.app_context():
+        assert reservar_numeros(3, fecha=FECHA) == ['PROP-203107-0001', 'PROP-203107-0002', 'PROP-203107-0003']
+        assert reservar_numero(fecha=FECHA) == 'PROP-203107-0004'
+        # Contador independiente por período
+        assert reservar_numero(fecha=datetime(2031, 8, 1)) == 'PROP-203108-0001'
+
+
+def test_contador_nuevo_continua_numeracion_existente(cliente_id, crear_propuesta):
+    with app.app_context():
+        cliente = db.session.get(Cliente, cliente_id)
+        crear_propuesta(cliente, 'PROP-203109-0041')
+        db.session.commit()
+        assert reservar_numero(fecha=datetime(2031, 9, 2)) == 'PROP-203109-0042'
+
+
+def test_concurrencia_hilos_y_procesos(cliente_id):
+    contexto = multiprocessing.get_context('spawn')
+    procesos = [
+        contexto.Process(target=crear_propuestas, args=(cliente_id, POR_TRABAJADOR))
+        for _ in range(PROCESOS)
+    ]
+    hilos = [
+        threading.Thread(target=crear_propuestas, args=(cliente_id, POR_TRABAJADOR))
+        for _ in range(HILOS)
+    ]
+    for trabajador in procesos + hilos:
+        trabajador.start()
+    for trabajador in procesos + hilos:
+        trabajador.join(timeout=120)
+    assert all(p.exitcode == 0 for p in procesos)
+
+    with app.app_context():
+        numeros = [fila.numero_propuesta for fila in db.session.query(Propuesta.numero_propuesta)]
+    total = (HILOS + PROCESOS) * POR_TRABAJADOR
+    assert len(numeros) == total
+    assert len(set(numeros)) == total  # sin duplicados
+    assert sorted(numeros) == [f'PROP-203107-{n:04d}' for n in range(1, total + 1)]  # sin huecos
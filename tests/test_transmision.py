@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app.almacen_documentos import guardar_documento
+from app.models import Cliente, DocumentoGenerado, Propuesta
+from app.transmision import ArchivoMapeado
+
+CONTENIDO = bytes(range(256)) * 4096  # 1 MiB, no repetitivo dentro de cada bloque
+
+
+@pytest.fixture
+def documento(crear_propuesta):
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Cliente Rangos', email='rangos@example.cl')
+        db.session.add(cliente)
+        db.session.flush()
+        propuesta = crear_propuesta(cliente, 'PROP-RANGO-0001', estado='ACEPTADA')
+        db.session.flush()
+        hash_documento, ruta = guardar_documento(CONTENIDO, '.pdf')
+        documento = DocumentoGenerado(
+            propuesta_id=propuesta.id, tipo='CONTRATO', version=1,
+            archivo_path=ruta, hash_documento=hash_documento,
+        )
+        db.session.add(documento)
+        db.session.commit()
+        yield documento
+        db.session.remove()
+        db.drop_all()
+
+
+def test_archivo_mapeado_por_bloques(tmp_path):
+    ruta = tmp_path / 'doc.bin'
+    ruta.write_bytes(CONTENIDO)
+    envoltorio = ArchivoMapeado(open(ruta, 'rb'), 8192)
+    bloques = list(envoltorio)
+    assert b''.join(bloques) == CONTENIDO
+    assert max(len(b) for b in bloques) == envoltorio.tamano_bloque
+    envoltorio.seek(-10, os.SEEK_END)
+    assert envoltorio.tell() == len(CONTENIDO) - 10
+    assert next(envoltorio) == CONTENIDO[-10:]
+    envoltorio.close()
+
+    vacio = tmp_path / 'vacio.bin'
+    vacio.write_bytes(b'')
+    assert list(ArchivoMapeado(open(vacio, 'rb'))) == []
+
+
+def test_pdf_completo(documento):
+    resp = app.test_client().get(f'/documentos/ver/{documento.id}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/pdf'
+    assert resp.headers['Accept-Ranges'] == 'bytes'
+    assert resp.data == CONTENIDO
+
+    descarga = app.test_client().get(f'/documentos/descargar/{documento.id}')
+    assert 'contrato_PROP-RANGO-0001.pdf' in descarga.headers['Content-Disposition']
+
+
+def test_rangos(documento):
+    client = app.test_client()
+    url = f'/documentos/ver/{documento.id}'
+
+    resp = client.get(url, headers={'Range': 'bytes=300000-300099'})
+    assert resp.status_code == 206
+    assert resp.headers['Content-Range'] == f'bytes 300000-300099/{len(CONTENIDO)}'
+    assert resp.data == CONTENIDO[300000:300100]
+
+    resp = client.get(url, headers={'Range': 'bytes=-512'})
+    assert resp.status_code == 206
+    assert resp.data == CONTENIDO[-512:]
+
+    resp = client.get(url, headers={'Range': f'bytes={len(CONTENIDO)}-'})
+    assert resp.status_code == 416
+
+    # If-Range con un ETag antiguo entrega el documento completo
+    resp = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"version-anterior"'})
+    assert resp.status_code == 200
+    assert resp.data == CONTENIDO
+    resp = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': f'"{documento.hash_documento}"'})
+    assert resp.status_code == 206
+    assert resp.data == CONTENIDO[:10]
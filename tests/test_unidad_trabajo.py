@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db
+from app import routes
+from app.auditoria import pendientes
+from app.models import Cliente, DocumentoGenerado, EventoAuditoria, Notificacion, Propuesta
+from app.routes import generar_propuesta_html
+from app.unidad_trabajo import unidad_de_trabajo
+
+
+@pytest.fixture
+def envio(crear_propuesta, tmp_path, monkeypatch):
+    app.config.update(TESTING=True)
+    monkeypatch.setitem(app.config, 'DOCUMENTOS_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'RENDER_ASINCRONO', False)
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Compras Unidad', email='compras@example.cl', telefono='+56 9 5555 6666')
+        db.session.add(cliente)
+        db.session.flush()
+        propuesta = crear_propuesta(cliente, 'PROP-UDT-0001', estado='PREGENERADA')
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        yield client, propuesta.id
+        db.session.remove()
+        db.drop_all()
+
+
+def _archivos(directorio):
+    return [nombre for _, _, nombres in os.walk(directorio) for nombre in nombres]
+
+
+def test_envio_en_un_solo_commit(envio, tmp_path):
+    client, propuesta_id = envio
+    contador = []
+
+    def contar(conn):
+        contador.append(1)
+
+    event.listen(db.engine, 'commit', contar)
+    try:
+        resp = client.post(f'/propuestas/{propuesta_id}/enviar')
+    finally:
+        event.remove(db.engine, 'commit', contar)
+    assert resp.status_code == 200
+    assert len(contador) == 1
+
+    db.session.remove()
+    assert db.session.get(Propuesta, propuesta_id).estado == 'ENVIADA'
+    assert DocumentoGenerado.query.filter_by(propuesta_id=propuesta_id).count() == 1
+    assert Notificacion.query.filter_by(propuesta_id=propuesta_id, tipo='ENVIO').count() == 1
+    # La auditoría entra en la misma transacción, no en el buffer del escritor
+    evento = EventoAuditoria.query.filter_by(propuesta_id=propuesta_id).one()
+    assert evento.accion == 'ENVIO_PROPUESTA' and evento.usuario == 'admin'
+    assert pendientes() == 0
+    assert len(_archivos(tmp_path)) == 1
+
+
+def test_fallo_a_la_mitad_no_deja_rastro(envio, tmp_path, monkeypatch):
+    client, propuesta_id = envio
+
+    def notificacion_rota(**campos):
+        raise RuntimeError('sin destinatario')
+
+    monkeypatch.setattr(routes, 'Notificacion', notificacion_rota)
+    resp = client.post(f'/propuestas/{propuesta_id}/enviar')
+    assert resp.status_code == 500
+
+    db.session.remove()
+    assert db.session.get(Propuesta, propuesta_id).estado == 'PREGENERADA'
+    assert DocumentoGenerado.query.count() == 0
+    assert EventoAuditoria.query.count() == 0
+    # El HTML ya publicado en el almacén se borra con el rollback
+    assert _archivos(tmp_path) == []
+
+
+def test_rollback_respeta_objetos_confirmados(envio, tmp_path):
+    _, propuesta_id = envio
+    ruta, _ = generar_propuesta_html(propuesta_id)
+    acciones = []
+
+    with pytest.raises(RuntimeError):
+        with unidad_de_trabajo() as unidad:
+            # Mismo contenido: el almacén reutiliza el objeto ya referenciado
+            generar_propuesta_html(propuesta_id)
+            unidad.al_confirmar(acciones.append, 'invalidar')
+            raise RuntimeError('fallo')
+
+    assert os.path.exists(ruta)
+    assert DocumentoGenerado.query.count() == 1
+    assert acciones == []
+
+
+def test_unidad_anidada_confirma_con_la_exterior(envio):
+    _, propuesta_id = envio
+    acciones = []
+    with unidad_de_trabajo() as exterior:
+        with unidad_de_trabajo() as interior:
+            assert interior is exterior
+            interior.al_confirmar(acciones.append, 'interior')
+        # La interior no confirmó: sigue todo en la transacción exterior
+        assert acciones == []
+        generar_propuesta_html(propuesta_id)
+    assert acciones == ['interior']
+    db.session.remove()
+    assert DocumentoGenerado.query.count() == 1